@@ -1,12 +1,10 @@
-import io
-import zipfile
 from urllib.parse import quote
 
 from django.contrib import admin
 from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse, NoReverseMatch, path
-from django.http import HttpResponse, Http404
+from django.http import HttpResponse, Http404, StreamingHttpResponse
 from django.core.exceptions import PermissionDenied
 from django.utils.text import slugify
 from import_export import resources
@@ -16,10 +14,13 @@ from .models import (
     CardImages,
     PopularResponse,
     Client,
+    ExportJob,
     ResponseCode,
     StructuralSummary,
 )
 
+from .bulk_export import client_zip_chunks
+from .export_jobs import enqueue, worker_running
 from .views.advanced import build_client_xlsx_bytes
 
 class SearchReferenceResource(resources.ModelResource):
@@ -175,10 +176,12 @@ class StructuralSummaryAdmin(ImportExportModelAdmin):
 
     @admin.action(description="선택한 항목 재계산")
     def recalculate_selected(self, request, queryset):
-        
-        for ss in queryset:
-            ss.calculate_values()
-            ss.save()
+        # 반응/나이/엔진 버전이 바뀐 항목만 다시 계산
+        recomputed = 0
+        for ss in queryset.select_related('client'):
+            if ss.refresh_if_stale():
+                recomputed += 1
+        self.message_user(request, f"{queryset.count()}건 중 {recomputed}건 재계산되었습니다.")
 
 
 @admin.register(CardImages)
@@ -330,33 +333,51 @@ class ClientAdmin(admin.ModelAdmin):
             )
             return resp
 
-        mem = io.BytesIO()
-        used_names = set()
-        with zipfile.ZipFile(mem, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for c in clients:
-                if not self.has_view_or_change_permission(request, c):
-                    continue
-                fname, data = build_client_xlsx_bytes(c, include_info_sheet=True)
-
-                base = fname
-                i = 1
-                while fname in used_names:
-                    stem, dot, ext = base.rpartition(".")
-                    suffix = f" ({i})"
-                    if dot:
-                        fname = f"{stem}{suffix}.{ext}"
-                    else:
-                        fname = f"{base}{suffix}"
-                    i += 1
-                used_names.add(fname)
-
-                zf.writestr(fname, data)
-
-        mem.seek(0)
-        ts = timezone.now().strftime("%Y%m%d_%H%M%S")
-        zip_name = f"clients_{ts}.zip"
-        resp = HttpResponse(mem.getvalue(), content_type="application/zip")
-        resp["Content-Disposition"] = (
-            f'attachment; filename="{zip_name}"; filename*=UTF-8\'\'{quote(zip_name)}'
+        allowed = [c for c in clients if self.has_view_or_change_permission(request, c)]
+        if not allowed:
+            raise PermissionDenied("권한이 없습니다.")
+        if not worker_running():
+            # run_export_worker 가 떠 있지 않으면 작업이 처리되지 않으므로 요청 안에서 만들며 보낸다.
+            # 실패한 수검자는 ZIP 의 errors.txt 에 적힌다 (응답을 보내기 시작한 뒤라 메시지로는 알릴 수 없다)
+            zip_name = f"clients_{timezone.now():%Y%m%d_%H%M%S}.zip"
+            resp = StreamingHttpResponse(
+                client_zip_chunks(allowed, include_info_sheet=True),
+                content_type="application/zip",
+            )
+            resp["Content-Disposition"] = (
+                f'attachment; filename="{zip_name}"; filename*=UTF-8\'\'{quote(zip_name)}'
+            )
+            return resp
+        # worker 가 있으면 요청 안에서 만들지 않고 내보내기 작업으로 넘긴다
+        job = enqueue(request.user, allowed, include_info_sheet=True)
+        url = reverse("admin:scoring_exportjob_changelist")
+        self.message_user(
+            request,
+            format_html(
+                '내보내기 작업 #{} 을 등록했습니다 (수검자 {}명). <a href="{}">내보내기 작업</a>에서 진행 상황을 보고 내려받으세요.',
+                job.pk, job.total, url,
+            ),
         )
-        return resp
\ No newline at end of file
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "requested_by", "status", "progress", "created_at", "finished_at", "download_link")
+    list_filter = ("status",)
+    list_select_related = ("requested_by",)
+    ordering = ("-id",)
+    readonly_fields = tuple(f.name for f in ExportJob._meta.fields)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="진행")
+    def progress(self, obj):
+        return f"{obj.done}/{obj.total}"
+
+    @admin.display(description="결과")
+    def download_link(self, obj):
+        if obj.status != ExportJob.DONE:
+            return "-"
+        url = reverse("scoring:download_export_job", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.file_name)
@@ -0,0 +1,175 @@
+import logging
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from django.conf import settings
+
+from .models import Client
+from .process_pool import process_pool
+from .projection import load_resources
+
+# 여러 수검자의 고급 내보내기(xlsx) 일괄 작성 (관리자 ZIP 다운로드)
+#
+# 수검자마다 구조요약 재계산, 형태소 분석, 통합 문서 작성을 하므로 수백 명을 요청 안에서 차례로 만들면
+# 시간 제한에 걸린다. 프로세스 풀(process_pool, spawn)의 worker 가 수검자 id 만 받아 스스로 DB 에서 읽어
+# 만들고, 끝나는 순서대로 결과를 돌려준다. 투사 참조 자료는 worker 를 시작할 때 한 번 불러 둔다.
+# 한 수검자가 실패해도 나머지는 계속 만들고, 실패는 그 수검자의 오류 메시지로 보고한다.
+# ZIP 은 통합 문서가 끝나는 대로 압축해 조각으로 내보내므로 (client_zip_chunks) 응답을 스트리밍할 수 있다.
+
+EXPORT_WORKERS = getattr(settings, 'SCORING_EXPORT_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def build_client_files(clients, *, include_info_sheet=False, workers=EXPORT_WORKERS):
+    """
+    clients 의 (client, 파일 이름, xlsx bytes, 오류 메시지) 를 끝나는 순서대로 낸다.
+    성공하면 오류 메시지가 None, 실패하면 파일 이름과 bytes 가 None.
+    workers 가 1 이하이거나 수검자가 1명이면 이 프로세스에서 차례로 만든다.
+    """
+    clients = list(clients)
+    if workers <= 1 or len(clients) <= 1:
+        for client in clients:
+            yield (client, *_build(client, include_info_sheet))
+        return
+
+    broken = []
+    for client, name, data, error in _run_pool(clients, include_info_sheet, workers):
+        if error is BROKEN:
+            broken.append(client)
+        else:
+            yield client, name, data, error
+    # worker 하나가 죽으면 (메모리 부족 등) 같은 풀의 남은 작업도 모두 실패하므로,
+    # 그 수검자들은 하나씩 새 프로세스에서 다시 만든다 (다시 죽는 수검자만 실패로 남는다)
+    for client in broken:
+        for client, name, data, error in _run_pool([client], include_info_sheet, 1):
+            yield client, name, data, ("작업 프로세스가 비정상 종료했습니다." if error is BROKEN else error)
+
+
+BROKEN = object()
+
+
+def _run_pool(clients, include_info_sheet, workers):
+    pool = process_pool(min(workers, len(clients)), 'scoring.bulk_export._init_worker')
+    todo = iter(clients)
+    running = {}
+    try:
+        while True:
+            # 받는 쪽이 느려도 끝난 결과가 쌓이지 않게 worker 수의 두 배까지만 맡긴다
+            for client in islice(todo, 2 * workers - len(running)):
+                try:
+                    running[pool.submit(_build_by_id, client.pk, include_info_sheet)] = client
+                except BrokenProcessPool:
+                    yield client, None, None, BROKEN
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                client = running.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    result = None, None, BROKEN
+                yield (client, *result)
+    finally:
+        # 받는 쪽이 중간에 멈추면 (다운로드 취소 등) 남은 작업은 버린다
+        pool.shutdown(cancel_futures=True)
+
+
+def client_zip_chunks(clients, *, include_info_sheet=False, workers=EXPORT_WORKERS, progress=None):
+    """
+    clients 의 내보내기를 담은 ZIP 을 조각(bytes)으로 낸다. 수검자 통합 문서는 만들어지는 대로 압축해 내보내고
+    버리므로, 메모리 사용은 수검자 수와 상관없다. 실패한 수검자는 마지막에 errors.txt 로 적는다.
+    progress 를 주면 수검자 하나가 끝날 때마다 progress(client, 오류 메시지 또는 None) 를 부른다.
+    """
+    used, failures = set(), []
+
+    def entries():
+        for client, name, data, error in build_client_files(
+                clients, include_info_sheet=include_info_sheet, workers=workers):
+            if progress is not None:
+                progress(client, error)
+            if error:
+                failures.append(f"{client.name} (id={client.pk}): {error}\n")
+                continue
+            yield unique_name(name, used), data
+        if failures:
+            yield "errors.txt", "".join(failures).encode('utf-8')
+
+    return zip_chunks(entries())
+
+
+def zip_chunks(entries):
+    """(이름, bytes) 들을 ZIP 으로 압축하며 조각(bytes)을 낸다. 한 번에 한 항목만 메모리에 둔다."""
+    buf = _ChunkBuffer()
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+            yield buf.take()
+    yield buf.take()  # 중앙 디렉터리
+
+
+class _ChunkBuffer:
+    """
+    zipfile 이 쓰는 bytes 를 take() 할 때까지만 모아 두는 쓰기 전용 파일 객체.
+    seek 이 없으므로 zipfile 은 크기를 각 항목 뒤(data descriptor)에 적는다.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def unique_name(name, used):
+    """ZIP 안에서 겹치지 않는 파일 이름 ('이름 (1).xlsx' ...). used 에 추가한다."""
+    base, candidate, i = name, name, 1
+    while candidate in used:
+        stem, dot, ext = base.rpartition(".")
+        candidate = f"{stem} ({i}).{ext}" if dot else f"{base} ({i})"
+        i += 1
+    used.add(candidate)
+    return candidate
+
+
+def _init_worker():
+    # 수검자마다 읽지 않도록 미리 불러 둔다. 실패하면 투사지표 없이 내보내므로 worker 는 계속 띄운다
+    try:
+        load_resources()
+    except Exception:
+        logging.exception("투사 참조 자료를 불러오지 못했습니다.")
+
+
+def _build(client, include_info_sheet):
+    from .views.advanced import build_client_xlsx_bytes  # views 가 export_jobs 를 거쳐 이 모듈을 부른다
+
+    try:
+        name, data = build_client_xlsx_bytes(client, include_info_sheet=include_info_sheet)
+    except Exception as e:
+        logging.exception("내보내기 실패: client_id=%s", client.pk)
+        return None, None, f"{type(e).__name__}: {e}"
+    return name, data, None
+
+
+def _build_by_id(client_id, include_info_sheet):
+    try:
+        client = Client.objects.select_related('tester').get(pk=client_id)
+    except Client.DoesNotExist:
+        return None, None, "수검자를 찾을 수 없습니다."
+    return _build(client, include_info_sheet)
@@ -0,0 +1,230 @@
+import numpy as np
+
+from .engine import (
+    CARD_ROMANS, CONTENT_FIELDS, QUAL_KEYS, ROW_FIELDS, SINGLE_DET_FIELDS, SPECIAL_FIELDS,
+    Z_EST_TABLE, blend_order, ordered_blends, score_row,
+)
+from .indices import evaluate_bulk as evaluate_indices_bulk
+
+# 코호트(다수 수검자) 일괄 채점
+#
+# 반응마다 score_row 의 기여분을 (키, 값) 희소 배열로 만들고, 수검자별로 한 번에 합산한 뒤
+# 구조요약의 모든 변수를 NumPy 배열 연산으로, 지표(PTI/DEPI/CDI/S-CON/HVI/OBS)는 indices.evaluate_bulk 로 계산한다.
+# 같은 코딩의 반응은 한 번만 파싱한다. 결과는 수검자별 engine.summarize 와 같다.
+
+_SCORED_FIELDS = tuple(f for f in ROW_FIELDS if f != 'response_num')
+_Z_EST_LUT = np.array([Z_EST_TABLE.get(i, 0) for i in range(51)], dtype=float)
+
+
+class _Tally:
+    """수검자 × tally 키 합계 행렬. 없는 키는 0 열."""
+
+    def __init__(self, matrix, keys):
+        self.matrix = matrix
+        self.index = {k: i for i, k in enumerate(keys)}
+        self.zeros = np.zeros(matrix.shape[0], dtype=np.int64)
+
+    def __getitem__(self, key):
+        i = self.index.get(key)
+        if i is None:
+            return self.zeros
+        col = self.matrix[:, i]
+        return col if key == 'Zsum' else col.astype(np.int64)
+
+    def sum(self, kind, *names):
+        return sum((self[(kind, n)] for n in names), self.zeros)
+
+
+def _divide(num, den, default):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / np.where(den != 0, den, 1), default)
+
+
+def score_cohort(protocols, norms='default'):
+    """
+    protocols: (client_id, 나이, 레코드 목록) 목록. 레코드는 채점 순서대로 정렬된 dict.
+    나이가 없는 수검자는 기준을 정할 수 없어 제외한다.
+    반환: (client_id 목록, {필드: 값 목록}) — 값 순서는 client_id 목록과 같다.
+    """
+    protocols = [p for p in protocols if p[1] is not None]
+    n = len(protocols)
+
+    # 1. 반응 → 고유 코딩 번호, 고유 코딩별 희소 기여분
+    unique = {}
+    u_keys, u_vals, u_len, u_card, u_blend = [], [], [], [], []
+    key_index = {}
+    uidx, cidx = [], []
+    blends = [[] for _ in range(n)]
+    approach = [{} for _ in range(n)]
+    for ci, (_cid, _age, rows) in enumerate(protocols):
+        for row in rows:
+            sig = tuple(row.get(f) for f in _SCORED_FIELDS)
+            ui = unique.get(sig)
+            if ui is None:
+                ui = unique[sig] = len(u_len)
+                tally, blend, card, _special = score_row(row)
+                for key, value in tally.items():
+                    u_keys.append(key_index.setdefault(key, len(key_index)))
+                    u_vals.append(value)
+                u_len.append(len(tally))
+                u_card.append(card)
+                u_blend.append(blend)
+            uidx.append(ui)
+            cidx.append(ci)
+            if u_blend[ui] is not None:
+                blends[ci].append((blend_order(u_card[ui], row.get('response_num')), u_blend[ui]))
+            approach[ci].setdefault(u_card[ui], []).append(row.get('location') or '')
+
+    # 2. 수검자별 합산 (희소 항목을 펼쳐 bincount 한 번)
+    K = max(len(key_index), 1)
+    u_len = np.array(u_len, dtype=np.int64)
+    u_ptr = np.concatenate([[0], np.cumsum(u_len)[:-1]]) if len(u_len) else u_len
+    uidx = np.array(uidx, dtype=np.int64)
+    cidx = np.array(cidx, dtype=np.int64)
+    lens = u_len[uidx] if len(uidx) else np.zeros(0, dtype=np.int64)
+    entry_row = np.repeat(np.arange(len(uidx)), lens)
+    offset = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens)
+    entry = u_ptr[uidx][entry_row] + offset
+    flat = cidx[entry_row] * K + np.array(u_keys, dtype=np.int64)[entry]
+    matrix = np.bincount(flat, weights=np.array(u_vals, dtype=float)[entry], minlength=n * K).reshape(n, K)
+    tally = _Tally(matrix, list(key_index))
+
+    ages = [p[1] for p in protocols]
+    out = summarize_cohort(ages, tally, [ordered_blends(bl) for bl in blends], approach, norms)
+    return [p[0] for p in protocols], out
+
+
+def summarize_cohort(ages, tally, blends, approach, norms='default'):
+    """engine.summarize 의 배열 버전. tally 는 _Tally, blends/approach 는 수검자별 목록."""
+    a = {}
+    R = tally['R']
+    alld = lambda *names: tally.sum('all', *names)
+    single = lambda *names: tally.sum('single', *names)
+
+    # 1. Location Features
+    zf = tally['Zf']
+    a['Zf'] = zf
+    a['Zsum'] = tally['Zsum']
+    a['Zest'] = np.where(zf == 0, 0.0, np.where(zf > 50, 173.0, _Z_EST_LUT[np.minimum(zf, 50)]))
+    a['Zd'] = np.where(a['Zest'] > 0, a['Zsum'] - a['Zest'], 0)
+    for f in ('W', 'D', 'Dd', 'S'):
+        a[f] = tally[f]
+
+    # 2. Dev Qual
+    a['dev_plus'] = tally[('dq', '+')]
+    a['dev_o'] = tally[('dq', 'o')]
+    a['dev_vplus'] = tally[('dq', 'v/+')]
+    a['dev_v'] = tally[('dq', 'v')]
+
+    # 3. Form Quality
+    for kind, prefix in (('fq', 'fqx'), ('mq', 'mq'), ('wd', 'wd')):
+        for k, v in QUAL_KEYS.items():
+            a[f'{prefix}_{k}'] = tally[(kind, v)]
+
+    # 4. Determinants / 5. contents / 7. special scores
+    for f, names in SINGLE_DET_FIELDS.items():
+        a[f] = single(*names)
+    for f, name in CONTENT_FIELDS.items():
+        a[f] = tally[('cont', name)]
+    for f, name in SPECIAL_FIELDS.items():
+        a[f] = tally[('sp', name)]
+    a['sum6'] = (a['sp_dv'] + a['sp_dv2'] + a['sp_dr'] + a['sp_dr2'] + a['sp_inc'] + a['sp_inc2'] +
+                 a['sp_fab'] + a['sp_fab2'] + a['sp_alog'] + a['sp_con'])
+    a['wsum6'] = (1 * a['sp_dv']) + (2 * a['sp_dv2']) + (2 * a['sp_inc']) + (4 * a['sp_inc2']) + \
+                 (3 * a['sp_dr']) + (6 * a['sp_dr2']) + (4 * a['sp_fab']) + (7 * a['sp_fab2']) + \
+                 (5 * a['sp_alog']) + (7 * a['sp_con'])
+
+    # 8. CORE
+    a['R'] = R
+    F = a['F']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a['L'] = np.where((R - F) != 0, F / (R - F), F / (R - F + 0.001))
+    sum_M = alld('Ma', 'Mp', 'Ma-p')
+    sum_fc, sum_cf, sum_c = alld('fc'), alld('cf'), alld('c')
+    wsumc = 0.5 * sum_fc + 1 * sum_cf + 1.5 * sum_c
+    a['EA'] = EA = sum_M + wsumc
+    a['sum_FM'] = alld('fma', 'fmp', 'fma-p')
+    a['sum_m'] = alld('ma', 'mp', 'ma-p')
+    a['sum_Ca'] = alld("c'", "fc'", "c'f")
+    a['sum_V'] = alld('v', 'vf', 'fv')
+    a['sum_T'] = alld('t', 'tf', 'ft')
+    a['sum_Y'] = alld('y', 'yf', 'fy')
+    sumshading = a['sum_Ca'] + a['sum_T'] + a['sum_V'] + a['sum_Y']
+    sumFm_m = a['sum_FM'] + a['sum_m']
+    a['es'] = sumFm_m + sumshading
+    extra_m = np.where(a['sum_m'] > 1, a['sum_m'] - 1, 0)
+    extra_Y = np.where(a['sum_Y'] > 1, a['sum_Y'] - 1, 0)
+    a['adj_es'] = a['es'] - (extra_m + extra_Y)
+    a['D_score'] = np.trunc((EA - a['es']) / 2.5000001).astype(np.int64)
+    a['adj_D'] = np.trunc((EA - a['adj_es']) / 2.5000001).astype(np.int64)
+
+    diff = np.abs(sum_M - wsumc)
+    eb_style = (EA >= 4.0) & (a['L'] < 1.0) & (
+        ((EA >= 4.0) & (EA <= 10.0) & (diff > 2.0)) | ((EA > 10.0) & (diff > 2.5)))
+    lo = np.minimum(sum_M, wsumc)
+    a['EBper'] = np.where(eb_style, _divide(np.maximum(sum_M, wsumc), lo, 0), 0)
+
+    # 9. Affect
+    a['pure_c'] = sum_c
+    a['afr'] = _divide(tally['afr_num'], tally['afr_den'], 1)
+    blends_num = tally['blends']
+
+    # 10. Interpersonal / 11. Ideation
+    sum_a = alld('ma', 'Ma', 'fma', 'ma-p', 'Ma-p', 'fma-p')
+    sum_p = alld('mp', 'Mp', 'fmp', 'ma-p', 'Ma-p', 'fma-p')
+    a['human_cont'] = a['H'] + a['H_paren'] + a['Hd'] + a['Hd_paren']
+    a['Isol'] = _divide(a['Bt'] + 2 * a['Cl'] + a['Ge'] + a['Ls'] + 2 * a['Na'], R, 0)
+    a['Lvl_2'] = a['sp_dv2'] + a['sp_dr2'] + a['sp_inc2'] + a['sp_fab2']
+    a['intel'] = 2 * a['sp_ab'] + a['Art'] + a['Ay']
+
+    # 12. Mediation
+    a['x_minus_per'] = _divide(a['fqx_minus'], R, 0)
+    a['xa_per'] = _divide(a['fqx_plus'] + a['fqx_o'] + a['fqx_u'], R, 0)
+    denom = a['wd_plus'] + a['wd_o'] + a['wd_u'] + a['wd_minus'] + a['wd_none']
+    a['wda_per'] = _divide(a['wd_plus'] + a['wd_o'] + a['wd_u'], denom, 0)
+    a['s_minus'] = tally['s_minus']
+    a['popular'] = tally['popular']
+    a['x_plus_per'] = _divide(a['fqx_plus'] + a['fqx_o'], R, 0)
+    a['xu_per'] = _divide(a['fqx_u'], R, 0)
+
+    # 14. Self-perception
+    r = alld('fr', 'rf')
+    a['ego'] = _divide(3 * r + a['pair'], R, 0)
+    a['fr_rf'] = r
+    a['fdn'] = alld('fd')
+    a['an_xy'] = a['An'] + a['Xy']
+
+    # 15. Indexes
+    hd_ad = a['Hd'] + a['Ad']
+    h_a = a['H'] + a['A']
+    flags = evaluate_indices_bulk(dict(
+        a, col_shd_blends=tally['col_shd_blends'], blends_num=blends_num, sumshading=sumshading,
+        sumFm_m=sumFm_m, wsumc=wsumc, sum_a=sum_a, sum_p=sum_p, sum_fc=sum_fc, sum_cf=sum_cf,
+        sum_c=sum_c, h_a=h_a, hd_ad=hd_ad,
+    ), ages, norms)
+
+    # 배열 → 파이썬 값 (문자열 필드는 engine.summarize 와 같은 형식)
+    out = {f: v.tolist() for f, v in a.items()}
+    out.update(flags)
+    out['blends'] = [''.join(b + ',' for b in bl) for bl in blends]
+    for arab, rom in zip([str(i) for i in range(1, 11)], CARD_ROMANS):
+        out[f'app_{rom}'] = ['.'.join(ap.get(arab, [])) for ap in approach]
+
+    L = lambda v: v.tolist()
+    M, W, Ca, ws = L(sum_M), L(a['W']), L(a['sum_Ca']), L(wsumc)
+    H = L(a['H'])
+    out['ErleBnistypus'] = [f"{m}:{w}" for m, w in zip(M, ws)]
+    out['eb'] = [f"{x}:{y}" for x, y in zip(L(sumFm_m), L(sumshading))]
+    out['f_c_prop'] = [f"{x}:{y}" for x, y in zip(L(sum_fc), L(sum_cf + sum_c))]
+    out['ca_c_prop'] = [f"{x}:{y}" for x, y in zip(Ca, ws)]
+    out['blends_r'] = [f"{x}:{y}" for x, y in zip(L(blends_num), L(R))]
+    out['GHR_PHR'] = [f"{x}:{y}" for x, y in zip(L(a['sp_ghr']), L(a['sp_phr']))]
+    out['a_p'] = [f"{x}:{y}" for x, y in zip(L(sum_a), L(sum_p))]
+    out['Ma_Mp'] = [f"{x}:{y}" for x, y in zip(L(alld('Ma', 'Ma-p')), L(alld('Mp', 'Ma-p')))]
+    out['W_D_Dd'] = [f"{x}:{y}:{z}" for x, y, z in zip(W, L(a['D']), L(a['Dd']))]
+    out['W_M'] = [f"{x}:{y}" for x, y in zip(W, M)]
+    out['h_prop'] = [f"{x}:{y}" for x, y in zip(H, L(a['H_paren'] + a['Hd'] + a['Hd_paren']))]
+    out['HVI_except'] = [
+        '' if d else f"{x}:{d}" for x, d in zip(L(h_a), L(hd_ad))
+    ]
+    return out
@@ -0,0 +1,587 @@
+from collections import Counter
+import hashlib
+import json
+import re
+
+from .indices import evaluate as evaluate_indices, evaluate_norms
+
+# 구조요약 채점 엔진 (DB 비의존)
+#
+# score_protocol(age, rows) 는 수검자 나이와 반응 레코드(dict) 목록만으로
+# StructuralSummary 의 모든 필드 값을 한 번의 순회로 계산한다.
+# 각 레코드는 ROW_FIELDS 의 키를 가진다.
+#
+# 채점 규칙이 바뀌면 ENGINE_VERSION 을 올려 저장된 요약이 모두 재계산되도록 한다.
+
+ENGINE_VERSION = 6
+
+ROW_FIELDS = (
+    'card', 'response_num', 'location', 'dev_qual', 'determinants', 'pair',
+    'form_qual', 'content', 'popular', 'Z', 'special',
+)
+
+ROMAN_TO_ARABIC = {
+    'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
+    'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10'
+}
+CARD_ROMANS = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+UNICODE_ROMAN = {
+    'Ⅰ': 'I', 'Ⅱ': 'II', 'Ⅲ': 'III', 'Ⅳ': 'IV', 'Ⅴ': 'V',
+    'Ⅵ': 'VI', 'Ⅶ': 'VII', 'Ⅷ': 'VIII', 'Ⅸ': 'IX', 'Ⅹ': 'X'
+}
+
+Z_CODES = ('ZD', 'ZW', 'ZS', 'ZA')
+Z_SUM_TABLE = {
+    '1': {'ZW': 1, 'ZA': 4, 'ZD': 6, 'ZS': 3.5},
+    '2': {'ZW': 4.5, 'ZA': 3, 'ZD': 5.5, 'ZS': 4.5},
+    '3': {'ZW': 5.5, 'ZA': 3, 'ZD': 4, 'ZS': 4.5},
+    '4': {'ZW': 2, 'ZA': 4, 'ZD': 3.5, 'ZS': 5},
+    '5': {'ZW': 1, 'ZA': 2.5, 'ZD': 5, 'ZS': 4},
+    '6': {'ZW': 2.5, 'ZA': 2.5, 'ZD': 6, 'ZS': 6.5},
+    '7': {'ZW': 2.5, 'ZA': 1, 'ZD': 3, 'ZS': 4},
+    '8': {'ZW': 4.5, 'ZA': 3, 'ZD': 3, 'ZS': 4},
+    '9': {'ZW': 5.5, 'ZA': 2.5, 'ZD': 4.5, 'ZS': 5},
+    '10': {'ZW': 5.5, 'ZA': 4, 'ZD': 4.5, 'ZS': 6}
+}
+Z_EST_TABLE = {
+    1: 0, 2: 2.5, 3: 6, 4: 10, 5: 13.5, 6: 17, 7: 20.5, 8: 24, 9: 27.5,
+    10: 31, 11: 34.5, 12: 38, 13: 41.5, 14: 45.5, 15: 49, 16: 51.5, 17: 56,
+    18: 59.5, 19: 63, 20: 66.5, 21: 70, 22: 73.5, 23: 77, 24: 81, 25: 84.5,
+    26: 88, 27: 91.5, 28: 95, 29: 98.5, 30: 102.5, 31: 105.5, 32: 109.5,
+    33: 112.5, 34: 116.5, 35: 120, 36: 123.5, 37: 127, 38: 130.5, 39: 134,
+    40: 137.5, 41: 141, 42: 144, 43: 148, 44: 152, 45: 155.5, 46: 159,
+    47: 162.5, 48: 166, 49: 169.5, 50: 173
+}
+
+SHADING_DETS = ['fy', 'yf', 'y', 'ft', 'tf', 't', 'fv', 'vf', 'v', "c'f", "fc'", "c'"]
+COLOR_DETS = ['c', 'cf', 'fc']
+CASE_KEPT_DETS = ['ma', 'mp', 'Ma', 'Mp', 'Ma-p']
+
+SINGLE_DET_FIELDS = {
+    'M': ('Ma', 'Mp', 'Ma-p'), 'FM': ('fma', 'fmp', 'fma-p'), 'm_l': ('ma', 'mp', 'ma-p'),
+    'FC': ('fc',), 'CF': ('cf',), 'C': ('c',), 'Cn': ('cn',),
+    'FCa': ("fc'",), 'CaF': ("c'f",), 'Ca': ("c'",),
+    'FT': ('ft',), 'TF': ('tf',), 'T': ('t',), 'FV': ('fv',), 'VF': ('vf',), 'V': ('v',),
+    'FY': ('fy',), 'YF': ('yf',), 'Y': ('y',), 'Fr': ('fr',), 'rF': ('rf',), 'FD': ('fd',),
+    'F': ('f',), 'pair': ('2',),
+}
+CONTENT_FIELDS = {
+    'H': 'h', 'H_paren': '(h)', 'Hd': 'hd', 'Hd_paren': '(hd)', 'Hx': 'hx',
+    'A': 'a', 'A_paren': '(a)', 'Ad': 'ad', 'Ad_paren': '(ad)', 'An': 'an',
+    'Art': 'art', 'Ay': 'ay', 'Bl': 'bl', 'Bt': 'bt', 'Cg': 'cg', 'Cl': 'cl',
+    'Ex': 'ex', 'Fd_l': 'fd', 'Fi': 'fi', 'Ge': 'ge', 'Hh': 'hh', 'Ls': 'ls',
+    'Na': 'na', 'Sc': 'sc', 'Sx': 'sx', 'Xy': 'xy', 'Idio': 'id',
+}
+SPECIAL_FIELDS = {
+    'sp_dv': 'DV', 'sp_dv2': 'DV2', 'sp_dr': 'DR', 'sp_dr2': 'DR2',
+    'sp_inc': 'INC', 'sp_inc2': 'INC2', 'sp_fab': 'FAB', 'sp_fab2': 'FAB2',
+    'sp_alog': 'ALOG', 'sp_con': 'CON', 'sp_psv': 'PSV', 'sp_ab': 'AB',
+    'sp_ag': 'AG', 'sp_cop': 'COP', 'sp_mor': 'MOR', 'sp_per': 'PER',
+    'sp_cp': 'CP', 'sp_ghr': 'GHR', 'sp_phr': 'PHR',
+}
+QUAL_KEYS = {'plus': '+', 'o': 'o', 'u': 'u', 'minus': '-', 'none': 'no'}
+
+# 허용 기호 (결정인은 canonical_det 형태, 내용인은 소문자). 순서가 곧 비트 위치이므로 뒤에만 추가할 것.
+DETERMINANT_CODES = [
+    'Ma', 'Mp', 'Ma-p', 'fma', 'fmp', 'fma-p', 'ma', 'mp', 'ma-p',
+    'fc', 'cf', 'c', 'cn', "fc'", "c'f", "c'", 'ft', 'tf', 't',
+    'fv', 'vf', 'v', 'fy', 'yf', 'y', 'fr', 'rf', 'fd', 'f',
+]
+CONTENT_CODES = list(CONTENT_FIELDS.values())
+SPECIAL_CODES = list(SPECIAL_FIELDS.values())
+
+_MQUAL_RE = re.compile(r'(?<!F)M')
+_WD_RE = re.compile(r'\b(W|D|DS|WS)\b')
+
+
+def card_to_arabic(card):
+    return ROMAN_TO_ARABIC.get(card, card)
+
+
+def card_number(card):
+    """카드 표기(로마/유니코드 로마/아라비아 숫자)를 1~10 정수로. 알 수 없으면 None."""
+    if card is None:
+        return None
+    s = str(card).strip()
+    for u, r in UNICODE_ROMAN.items():
+        s = s.replace(u, r)
+    su = s.upper()
+    if su not in ROMAN_TO_ARABIC:
+        su = re.sub(r'[^IVX0-9]', '', su)
+    if su in ROMAN_TO_ARABIC:
+        return int(ROMAN_TO_ARABIC[su])
+    if re.fullmatch(r'([1-9]|10)', su):
+        return int(su)
+    return None
+
+
+def protocol_order(card, response_num):
+    """카드 번호 → 반응 번호 순 정렬 키 (로마/아라비아 표기 혼용 허용)."""
+    card = str(card_to_arabic(card) or '')
+    return (int(card) if card.isdigit() else 99, response_num or 0)
+
+
+def blend_order(card, response_num):
+    """
+    구조요약 blends 의 나열 순서. 기존 계산은 반응을 DB 기본 정렬(card 문자열 → 반응 번호)로 읽어
+    나열했으므로, 내보내기 결과가 바뀌지 않도록 카드를 문자열로 비교한다 ('1', '10', '2', ...).
+    """
+    return (card or '', -1 if response_num is None else response_num)
+
+
+def ordered_blends(keyed):
+    """(blend_order 키, 혼합반응) 목록 → 혼합반응 목록 (키가 같으면 받은 순서)."""
+    return [blend for _key, blend in sorted(keyed, key=lambda item: item[0])]
+
+
+def row_digest(row):
+    """반응 레코드 1개의 내용 해시 (16진 문자열)."""
+    return hashlib.sha1(json.dumps([row.get(f) for f in ROW_FIELDS], ensure_ascii=False).encode()).hexdigest()
+
+
+def _fingerprint_from(age, digest_sum):
+    return hashlib.sha1(json.dumps([age, digest_sum % (1 << 160)]).encode()).hexdigest()
+
+
+def protocol_fingerprint(age, rows):
+    """
+    나이와 반응 레코드들의 내용 해시. 같은 값이면 채점 결과도 같다.
+    반응별 해시의 합으로 만들어 반응 하나가 바뀌어도 전체를 다시 읽지 않고 갱신할 수 있다.
+    """
+    return _fingerprint_from(age, sum(int(row_digest(row), 16) for row in rows))
+
+
+def split_codes(value):
+    return re.split(r'[.,]+', (value or '').replace(' ', ''))
+
+
+def canonical_det(token):
+    return token.lower() if token not in CASE_KEPT_DETS else token
+
+
+def codes_source(determinants, content, special):
+    """parse_codes 입력 문자열의 해시 (parsed_codes['src'])."""
+    return hashlib.sha1(json.dumps([determinants, content, special], ensure_ascii=False).encode()).hexdigest()
+
+
+def parse_codes(determinants, content, special):
+    """
+    결정인/내용인/특수점수 문자열을 한 번만 분해한 표현 (ResponseCode.parsed_codes).
+    det 는 split_codes 결과 그대로(빈 토큰 포함, 혼합반응 문자열에 쓰임), cont/sp 는 빈 토큰 제외.
+    src 는 분해한 문자열의 해시로, current_codes 가 저장된 분해를 그대로 써도 되는지 확인하는 데 쓴다.
+    """
+    return {
+        'det': split_codes(determinants),
+        'cont': [item for item in split_codes(content) if item],
+        'sp': ' '.join(split_codes(special)).split() if special else [],
+        'src': codes_source(determinants, content, special),
+    }
+
+
+def current_codes(parsed, determinants, content, special):
+    """
+    저장된 분해 parsed 가 지금 문자열로 만든 것이면 그대로, 아니면 다시 분해한다.
+    parsed_codes 는 save() 에서만 갱신되므로 QuerySet.update / bulk_update 로 바뀐 반응은 여기서 걸러진다.
+    """
+    if parsed and parsed.get('src') == codes_source(determinants, content, special):
+        return parsed
+    return parse_codes(determinants, content, special)
+
+
+_CODE_BITS = {
+    'det': {code: 1 << i for i, code in enumerate(DETERMINANT_CODES)},
+    'cont': {code: 1 << i for i, code in enumerate(CONTENT_CODES)},
+    'sp': {code: 1 << i for i, code in enumerate(SPECIAL_CODES)},
+}
+_CODE_CANON = {'det': canonical_det, 'cont': str.lower, 'sp': str}
+
+
+def code_mask(kind, tokens):
+    """허용 기호 목록의 비트 OR (kind: 'det' | 'cont' | 'sp'). 모르는 기호는 무시."""
+    bits, canon = _CODE_BITS[kind], _CODE_CANON[kind]
+    mask = 0
+    for token in tokens:
+        mask |= bits.get(canon(token), 0)
+    return mask
+
+
+COLOR_MASK = code_mask('det', COLOR_DETS)
+SHADING_MASK = code_mask('det', SHADING_DETS)
+
+
+def derive_specials(card, form_qual, popular, dets_lower, conts_lower, specials):
+    """기존 특수점수에서 GHR/PHR 을 제외한 목록에 판정 결과를 덧붙여 반환."""
+    specials = [v for v in specials if v not in ["GHR", "PHR"]]
+    if (any(c in conts_lower for c in ['h', '(h)', 'hd', '(hd)', 'hx'])
+            or any(d in dets_lower for d in ['Ma', 'Mp', 'Ma-p'])
+            or (any(d in dets_lower for d in ['fma', 'fmp', 'fma-p'])
+                and any(s in specials for s in ['COP', 'AG']))):
+        if ("h" in conts_lower and form_qual in ["+", "o", "u"]
+                and all(s not in specials for s in ['DV2', 'DR', 'DR2', 'INC', 'INC2', 'FAB', 'FAB2', 'CON', 'ALOG', 'AG', 'MOR'])):
+            specials.append("GHR")
+        elif form_qual in ["-", "no"] or any(s in specials for s in ['DV2', 'DR2', 'INC2', 'FAB2', 'CON', 'ALOG']):
+            specials.append("PHR")
+        elif "COP" in specials and "AG" not in specials:
+            specials.append("GHR")
+        elif "FAB" in specials or "MOR" in specials or "an" in conts_lower:
+            specials.append("PHR")
+        elif popular == "P" and card in ['3', '4', '7', '9']:
+            specials.append("GHR")
+        elif any(s in specials for s in ['AG', 'INC', 'DR']) or "hd" in conts_lower:
+            specials.append("PHR")
+        else:
+            specials.append("GHR")
+    return specials
+
+
+def score_row(row):
+    """반응 1개의 기여분(tally), 혼합반응 문자열, 카드(아라비아), GHR/PHR 포함 특수점수를 반환."""
+    tally = Counter()
+    card = str(row['card_num']) if row.get('card_num') else card_to_arabic(row.get('card'))
+    location = row.get('location') or ''
+    form_qual = row.get('form_qual')
+    z = row.get('Z')
+
+    # 1. Location Features
+    tally['R'] += 1
+    if z in Z_CODES:
+        tally['Zf'] += 1
+    tally['Zsum'] += Z_SUM_TABLE.get(card, {}).get(z, 0)
+    if 'W' in location:
+        tally['W'] += 1
+    if location in ('D', 'DS'):
+        tally['D'] += 1
+    if 'Dd' in location:
+        tally['Dd'] += 1
+    if 'S' in location:
+        tally['S'] += 1
+        if form_qual == '-':
+            tally['s_minus'] += 1
+    if 'P' in (row.get('popular') or ''):
+        tally['popular'] += 1
+    if card in ('8', '9', '10'):
+        tally['afr_num'] += 1
+    elif card in ('1', '2', '3', '4', '5', '6', '7'):
+        tally['afr_den'] += 1
+
+    # 2. Dev Qual / 3. Form Quality
+    if row.get('dev_qual'):
+        tally[('dq', row['dev_qual'])] += 1
+    if form_qual:
+        tally[('fq', form_qual)] += 1
+        if row.get('determinants') is not None and _MQUAL_RE.search(row['determinants']):
+            tally[('mq', form_qual)] += 1
+        if _WD_RE.search(location):
+            tally[('wd', form_qual)] += 1
+
+    # 결정인
+    parsed = current_codes(row.get('parsed'), row.get('determinants'), row.get('content'), row.get('special'))
+    dets = parsed['det']
+    dets_lower = [canonical_det(item) for item in dets]
+    for d in dets_lower:
+        tally[('all', d)] += 1
+
+    blend = None
+    if len(dets) >= 2:
+        blend = '.'.join(dets)
+        tally['blends'] += 1
+        if any(e in dets_lower for e in SHADING_DETS) and any(e in dets_lower for e in COLOR_DETS):
+            tally['col_shd_blends'] += 1
+    else:
+        for d in dets_lower:
+            tally[('single', d)] += 1
+
+    # 쌍반응
+    if row.get('pair'):
+        tally[('single', row['pair'])] += 1
+
+    # 내용
+    conts_lower = [item.lower() for item in parsed['cont']]
+    for c in conts_lower:
+        tally[('cont', c)] += 1
+
+    # 특수점수 + GHR/PHR 판정
+    specials = derive_specials(card, form_qual, row.get('popular'), dets_lower, conts_lower, parsed['sp'])
+    for s in specials:
+        tally[('sp', s)] += 1
+
+    return tally, blend, card, ','.join(specials)
+
+
+def summarize(age, tally, blends, approach, norms='default'):
+    """누적 tally 와 혼합반응/접근방식 목록으로 StructuralSummary 필드 값을 계산."""
+    out, variables = _summary_values(tally, blends, approach)
+    out.update(evaluate_indices(variables, age, norms))
+    return out
+
+
+def _summary_values(tally, blends, approach):
+    """지표 판정 전까지의 필드 값과, 지표 조건식이 참조하는 변수 dict."""
+    out = {}
+    R = tally['R']
+    qual = lambda kind: {k: tally[(kind, v)] for k, v in QUAL_KEYS.items()}
+    single = lambda *names: sum(tally[('single', n)] for n in names)
+    alld = lambda *names: sum(tally[('all', n)] for n in names)
+
+    # 1. Location Features
+    zf = tally['Zf']
+    out['Zf'] = zf
+    out['Zsum'] = tally['Zsum']
+    if zf == 0:
+        out['Zest'] = 0
+    elif zf > 50:
+        out['Zest'] = 173
+    else:
+        out['Zest'] = Z_EST_TABLE.get(zf, 0)
+    out['Zd'] = out['Zsum'] - out['Zest'] if out['Zest'] > 0 else 0
+    for f in ('W', 'D', 'Dd', 'S'):
+        out[f] = tally[f]
+
+    # 2. Dev Qual
+    out['dev_plus'] = tally[('dq', '+')]
+    out['dev_o'] = tally[('dq', 'o')]
+    out['dev_vplus'] = tally[('dq', 'v/+')]
+    out['dev_v'] = tally[('dq', 'v')]
+
+    # 3. Form Quality
+    for kind, prefix in (('fq', 'fqx'), ('mq', 'mq'), ('wd', 'wd')):
+        for k, v in qual(kind).items():
+            out[f'{prefix}_{k}'] = v
+
+    # 4. Determinants
+    out['blends'] = ''.join(b + ',' for b in blends)
+    for f, names in SINGLE_DET_FIELDS.items():
+        out[f] = single(*names)
+
+    # 5. contents
+    for f, name in CONTENT_FIELDS.items():
+        out[f] = tally[('cont', name)]
+
+    # 6. approach
+    for arab, rom in zip([str(i) for i in range(1, 11)], CARD_ROMANS):
+        out[f'app_{rom}'] = '.'.join(approach.get(arab, []))
+
+    # 7. special scores
+    for f, name in SPECIAL_FIELDS.items():
+        out[f] = tally[('sp', name)]
+    out['sum6'] = (out['sp_dv'] + out['sp_dv2'] + out['sp_dr'] + out['sp_dr2'] +
+                   out['sp_inc'] + out['sp_inc2'] + out['sp_fab'] + out['sp_fab2'] +
+                   out['sp_alog'] + out['sp_con'])
+    out['wsum6'] = (1 * out['sp_dv']) + (2 * out['sp_dv2']) + (2 * out['sp_inc']) + (4 * out['sp_inc2']) + \
+                   (3 * out['sp_dr']) + (6 * out['sp_dr2']) + (4 * out['sp_fab']) + (7 * out['sp_fab2']) + \
+                   (5 * out['sp_alog']) + (7 * out['sp_con'])
+
+    # 8. CORE
+    out['R'] = R
+    F = out['F']
+    out['L'] = F / (R - F) if (R - F) != 0 else F / (R - F + 0.001)
+
+    sum_M = alld('Ma', 'Mp', 'Ma-p')
+    sum_fc = alld('fc')
+    sum_cf = alld('cf')
+    sum_c = alld('c')
+    wsumc = 0.5 * sum_fc + 1 * sum_cf + 1.5 * sum_c
+    out['ErleBnistypus'] = f"{sum_M}:{wsumc}"
+    out['EA'] = EA = sum_M + wsumc
+    out['sum_FM'] = alld('fma', 'fmp', 'fma-p')
+    out['sum_m'] = alld('ma', 'mp', 'ma-p')
+    out['sum_Ca'] = alld("c'", "fc'", "c'f")
+    out['sum_V'] = alld('v', 'vf', 'fv')
+    out['sum_T'] = alld('t', 'tf', 'ft')
+    out['sum_Y'] = alld('y', 'yf', 'fy')
+    sumshading = out['sum_Ca'] + out['sum_T'] + out['sum_V'] + out['sum_Y']
+    sumFm_m = out['sum_FM'] + out['sum_m']
+    out['eb'] = f"{sumFm_m}:{sumshading}"
+    out['es'] = sumFm_m + sumshading
+    extra_m = (out['sum_m'] - 1) if out['sum_m'] > 1 else 0
+    extra_Y = (out['sum_Y'] - 1) if out['sum_Y'] > 1 else 0
+    out['adj_es'] = out['es'] - (extra_m + extra_Y)
+    out['D_score'] = int((EA - out['es']) / 2.5000001)
+    out['adj_D'] = int((EA - out['adj_es']) / 2.5000001)
+
+    out['EBper'] = 0
+    if EA >= 4.0 and out['L'] < 1.0:
+        if (4.0 <= EA <= 10.0 and abs(sum_M - wsumc) > 2.0) or (EA > 10.0 and abs(sum_M - wsumc) > 2.5):
+            lo = min(float(sum_M), wsumc)
+            out['EBper'] = max(float(sum_M), wsumc) / lo if lo else 0  # 한쪽이 0이면 NA
+
+    # 9. Affect
+    out['f_c_prop'] = f"{sum_fc}:{sum_cf + sum_c}"
+    out['pure_c'] = sum_c
+    out['ca_c_prop'] = f"{out['sum_Ca']}:{wsumc}"
+    afr_den = tally['afr_den']
+    out['afr'] = tally['afr_num'] / afr_den if afr_den != 0 else 1
+    blends_num = tally['blends']
+    out['blends_r'] = f"{blends_num}:{R}"
+
+    # 10. Interpersonal
+    out['GHR_PHR'] = f"{out['sp_ghr']}:{out['sp_phr']}"
+    sum_a = alld('ma', 'Ma', 'fma', 'ma-p', 'Ma-p', 'fma-p')
+    sum_p = alld('mp', 'Mp', 'fmp', 'ma-p', 'Ma-p', 'fma-p')
+    out['a_p'] = f"{sum_a}:{sum_p}"
+    out['human_cont'] = out['H'] + out['H_paren'] + out['Hd'] + out['Hd_paren']
+    out['Isol'] = (out['Bt'] + 2 * out['Cl'] + out['Ge'] + out['Ls'] + 2 * out['Na']) / R if R else 0
+
+    # 11. Ideation
+    out['Ma_Mp'] = f"{alld('Ma', 'Ma-p')}:{alld('Mp', 'Ma-p')}"
+    out['Lvl_2'] = out['sp_dv2'] + out['sp_dr2'] + out['sp_inc2'] + out['sp_fab2']
+    out['intel'] = 2 * out['sp_ab'] + out['Art'] + out['Ay']
+
+    # 12. Mediation
+    out['x_minus_per'] = out['fqx_minus'] / R if R else 0
+    out['xa_per'] = (out['fqx_plus'] + out['fqx_o'] + out['fqx_u']) / R if R else 0
+    denom = (out['wd_plus'] + out['wd_o'] + out['wd_u'] + out['wd_minus'] + out['wd_none'])
+    out['wda_per'] = (out['wd_plus'] + out['wd_o'] + out['wd_u']) / denom if denom else 0
+    out['s_minus'] = tally['s_minus']
+    out['popular'] = tally['popular']
+    out['x_plus_per'] = (out['fqx_plus'] + out['fqx_o']) / R if R else 0
+    out['xu_per'] = out['fqx_u'] / R if R else 0
+
+    # 13. Processing
+    out['W_D_Dd'] = f"{out['W']}:{out['D']}:{out['Dd']}"
+    out['W_M'] = f"{out['W']}:{sum_M}"
+
+    # 14. Self-perception
+    r = alld('fr', 'rf')
+    out['ego'] = (3 * r + (out['pair'] or 0)) / R if R else 0
+    out['fr_rf'] = r
+    out['fdn'] = alld('fd')
+    out['an_xy'] = out['An'] + out['Xy']
+    out['h_prop'] = f"{out['H']}:{out['H_paren'] + out['Hd'] + out['Hd_paren']}"
+
+    # 15. Indexes 입력 (규칙/나이별 기준은 indices.INDEX_RULES, indices.NORMS)
+    hd_ad = out['Hd'] + out['Ad']
+    h_a = out['H'] + out['A']
+    out['HVI_except'] = '' if hd_ad else f"{h_a}:{hd_ad}"
+    variables = dict(
+        out, col_shd_blends=tally['col_shd_blends'], blends_num=blends_num, sumshading=sumshading,
+        sumFm_m=sumFm_m, wsumc=wsumc, sum_a=sum_a, sum_p=sum_p, sum_fc=sum_fc, sum_cf=sum_cf,
+        sum_c=sum_c, h_a=h_a, hd_ad=hd_ad,
+    )
+    return out, variables
+
+
+def score_protocol(age, rows):
+    """
+    반응 레코드 목록을 한 번 순회해 구조요약 필드 dict 와 반응별 파생값 목록을 반환.
+    파생값은 (카드 아라비아 숫자, GHR/PHR 이 반영된 특수점수 문자열) 튜플이며 rows 와 순서가 같다.
+    """
+    tally = Counter()
+    blends = []
+    approach = {}
+    derived = []
+    for row in rows:
+        row_tally, blend, card, special = score_row(row)
+        tally.update(row_tally)
+        if blend is not None:
+            blends.append((blend_order(card, row.get('response_num')), blend))
+        approach.setdefault(card, []).append(row.get('location') or '')
+        derived.append((card, special))
+    return summarize(age, tally, ordered_blends(blends), approach), derived
+
+
+# ---------------------------------------------------------------------------
+# 증분 갱신
+#
+# state 는 JSON 으로 저장 가능한 누적값이다.
+#   tally: score_row 기여분의 합 (튜플 키는 'kind|value' 문자열)
+#   rows:  {반응 id: [카드, 반응 번호, 반응영역, 혼합반응, 내용 해시]}
+# 반응 하나를 고치면 이전 기여분을 빼고 새 기여분을 더한 뒤 summarize_state 로
+# 비율/지표만 다시 계산한다. 나머지 반응은 다시 읽거나 채점하지 않는다.
+
+def _tally_key(key):
+    return '|'.join(key) if isinstance(key, tuple) else key
+
+
+def _tally_from_state(state):
+    tally = Counter()
+    for key, n in state['tally'].items():
+        tally[tuple(key.split('|')) if '|' in key else key] = n
+    return tally
+
+
+def _apply_tally(state, row_tally, sign):
+    counts = state['tally']
+    for key, n in row_tally.items():
+        key = _tally_key(key)
+        value = counts.get(key, 0) + sign * n
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+
+def build_state(rows):
+    """(id, 레코드) 목록으로 state 를 만든다. 반환: (state, {id: 특수점수})."""
+    state = {'tally': {}, 'rows': {}}
+    specials = {}
+    for rid, row in rows:
+        specials[rid] = add_row(state, rid, row)
+    return state, specials
+
+
+def add_row(state, rid, row):
+    """반응 하나의 기여분을 더하고 GHR/PHR 이 반영된 특수점수를 반환."""
+    row_tally, blend, card, special = score_row(row)
+    _apply_tally(state, row_tally, 1)
+    digest = row_digest(dict(row, special=special))
+    state['rows'][str(rid)] = [card, row.get('response_num'), row.get('location') or '', blend, digest]
+    return special
+
+
+def remove_row(state, rid, row):
+    """
+    저장 당시 레코드(row)의 기여분을 뺀다.
+    state 가 기억하는 내용과 row 가 다르면 False (state 를 믿을 수 없으므로 전체 재계산 필요).
+    """
+    entry = state['rows'].get(str(rid))
+    if entry is None or entry[4] != row_digest(row):
+        return False
+    row_tally, _blend, _card, _special = score_row(row)
+    _apply_tally(state, row_tally, -1)
+    del state['rows'][str(rid)]
+    return True
+
+
+def state_fingerprint(age, state):
+    return _fingerprint_from(age, sum(int(entry[4], 16) for entry in state['rows'].values()))
+
+
+def summarize_state(age, state):
+    """state 로 StructuralSummary 필드 값을 계산 (score_protocol 과 같은 결과)."""
+    ordered = sorted(
+        state['rows'].items(),
+        key=lambda item: (protocol_order(item[1][0], item[1][1]), int(item[0])),
+    )
+    blends = []
+    approach = {}
+    for _rid, (card, num, location, blend, _digest) in ordered:
+        if blend is not None:
+            blends.append((blend_order(card, num), blend))
+        approach.setdefault(card, []).append(location)
+    return summarize(age, _tally_from_state(state), ordered_blends(blends), approach)
+
+
+def state_indices(age, state, norms=None):
+    """
+    저장된 누적값으로 여러 기준값 세트(indices.NORMS)의 지표 판정을 나란히 계산.
+    반응을 다시 채점하지 않는다. 반환: {기준 이름: {'PTI': ..., 'sumPTI': ..., ...}}
+    """
+    _out, variables = _summary_values(_tally_from_state(state), [], {})
+    return evaluate_norms(variables, age, norms)
+
+
+def score_batch(items):
+    """
+    여러 수검자를 한 번에 채점 (프로세스 풀 작업 단위, DB 접근 없음).
+    items: (client_id, 나이, [(반응 id, 레코드), ...], 저장된 지문 또는 None) 목록. 레코드는 채점 순서대로.
+    저장된 지문이 현재 반응과 같으면 건너뛴다.
+    반환: (client_id, 필드 값 dict, state, 지문, {반응 id: 특수점수}) 목록.
+    """
+    results = []
+    for client_id, age, rows, known_fingerprint in items:
+        if known_fingerprint and known_fingerprint == protocol_fingerprint(age, [row for _rid, row in rows]):
+            continue
+        state, specials = build_state(rows)
+        results.append((client_id, summarize_state(age, state), state, state_fingerprint(age, state), specials))
+    return results
@@ -0,0 +1,137 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from .engine import ENGINE_VERSION
+from .models import Client, ResponseCode
+from .projection import projection_version
+
+# 내보내기 파일(xlsx) 디스크 캐시
+#
+# 같은 수검자의 같은 양식을 다시 내려받으면 통합 문서를 새로 만들지 않고 저장해 둔 파일을 보낸다.
+# 파일 이름은 수검자 id / 양식 / 지문. 지문에는 내보내기에 나오는 값을 정하는 것이 모두 들어간다
+# (수검자 정보, 모든 반응 필드, 채점 엔진 버전, 투사 점수 버전, 양식 버전). 반응을 고치면 지문이 바뀌어
+# 자연히 새로 만들고, 같은 양식의 이전 파일은 그때 지운다. 전체 크기가 SCORING_EXPORT_CACHE_MAX_BYTES 를
+# 넘으면 가장 오래 안 쓴 파일부터 지운다 (읽을 때 수정 시각을 갱신). 0 이면 캐시를 쓰지 않는다.
+
+EXPORT_VERSION = 1  # 시트 구성/서식을 바꾸면 올린다
+# MEDIA_ROOT 는 정적 파일로 공개되므로 쓰지 않는다
+CACHE_DIR = Path(getattr(settings, 'SCORING_EXPORT_CACHE_DIR', None) or Path(settings.BASE_DIR) / 'export_cache')
+CACHE_MAX_BYTES = getattr(settings, 'SCORING_EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+VARIANTS = ('intermediate', 'advanced', 'advanced-info')
+
+_CLIENT_FIELDS = [f.attname for f in Client._meta.concrete_fields]
+_RESPONSE_FIELDS = [f.attname for f in ResponseCode._meta.concrete_fields]
+
+
+def export_fingerprint(client, responses, variant):
+    """client 와 반응 목록(프로토콜 순)으로 만든 variant 내보내기의 지문 (sha1)."""
+    parts = [
+        EXPORT_VERSION, ENGINE_VERSION, projection_version(), variant,
+        [getattr(client, f) for f in _CLIENT_FIELDS],
+        [[getattr(rc, f) for f in _RESPONSE_FIELDS] for rc in responses],
+    ]
+    if variant == 'advanced-info':
+        parts.append(client.tester.username)  # 정보 시트의 검사자 계정
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _path(client_id, variant, fingerprint):
+    return CACHE_DIR / str(client_id) / f"{variant}-{fingerprint}.xlsx"
+
+
+def open_export(client, responses, variant, build):
+    """
+    variant 내보내기 파일 객체 (읽기용 binary). 캐시에 있으면 그 파일을, 없으면 build() 가 만든 bytes 를
+    저장한 뒤 연다. 캐시를 쓸 수 없으면 build() 결과를 메모리에서 읽는다.
+    build() 는 (bytes, 완전한지 여부) 를 돌려준다. 일부 값을 계산하지 못해 빠진 파일(False)은 저장하지 않으므로
+    다음 요청에서 다시 만든다.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"알 수 없는 내보내기 양식: {variant}")
+    if CACHE_MAX_BYTES <= 0:
+        return io.BytesIO(build()[0])
+
+    path = _path(client.pk, variant, export_fingerprint(client, responses, variant))
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logging.exception("내보내기 캐시 읽기 실패: %s", path)
+    else:
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # 다른 요청이 막 지웠더라도 열린 파일은 읽을 수 있다
+        return f
+
+    data, complete = build()
+    if not complete:
+        return io.BytesIO(data)
+    # 구조요약을 다시 계산하면 GHR/PHR 특수점수가 responses 에 기록되므로 저장은 만든 뒤의 지문으로 한다
+    path = _path(client.pk, variant, export_fingerprint(client, responses, variant))
+    try:
+        _store(path, variant, data)
+        evict(CACHE_MAX_BYTES)
+    except OSError:
+        logging.exception("내보내기 캐시 저장 실패: %s", path)
+    return io.BytesIO(data)
+
+
+def _store(path, variant, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    # 같은 수검자·양식의 이전 지문 파일은 다시 쓰이지 않는다
+    for old in path.parent.glob('*.xlsx'):
+        if old != path and old.name.rsplit('-', 1)[0] == variant:
+            _unlink(old)
+
+
+def _unlink(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def evict(max_bytes):
+    """캐시 파일 전체 크기가 max_bytes 를 넘으면 오래 안 쓴 파일부터 지워 90% 로 줄인다. 반환: 지운 수"""
+    files, total = [], 0
+    if not CACHE_DIR.is_dir():
+        return 0
+    for client_dir in os.scandir(CACHE_DIR):
+        if not client_dir.is_dir():
+            continue
+        for entry in os.scandir(client_dir.path):
+            if entry.name.endswith('.xlsx'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for _mtime, size, path in sorted(files):
+        if total <= max_bytes * 0.9:
+            break
+        _unlink(Path(path))
+        total -= size
+        removed += 1
+    return removed
+
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .bulk_export import EXPORT_WORKERS, client_zip_chunks
+from .models import Client, ExportJob
+
+# 내보내기 작업 대기열
+#
+# 여러 수검자 ZIP, 형태소 분석이 들어가는 고급 내보내기처럼 오래 걸리는 내보내기를 웹 요청 밖에서 만든다.
+# 요청은 ExportJob 을 만들어 id 를 돌려받고 진행 상황을 조회한다. run_export_worker 명령(로컬 worker 프로세스)이
+# 작업을 요청 순서대로 하나씩 가져가 결과 파일을 JOB_DIR 에 쓴다. 진행 중인 작업은 모든 worker 를 합쳐
+# MAX_RUNNING 개를 넘지 않는다. 진행이 STALE_AFTER 넘게 멈춘 작업은 worker 가 죽은 것으로 보고 다시 대기시키고,
+# 끝난 지 JOB_TTL 이 지난 작업은 결과 파일과 함께 지운다.
+#
+# 작업 중인 worker 는 수검자 한 명이 오래 걸려도 HEARTBEAT_EVERY 마다 heartbeat_at 을 갱신한다. 작업을 가져갈 때
+# owner 토큰을 적고 모든 갱신을 그 토큰으로 조건을 걸므로, 멈췄다 깨어난 worker 는 다른 worker 가 다시 가져간
+# 작업을 덮어쓰지 않고 손을 뗀다. worker 는 대기열을 확인할 때마다 WORKER_FILE 의 수정 시각도 갱신하고,
+# 요청 쪽은 worker_running() 이 False 면 (worker 가 떠 있지 않으면) 작업 대신 요청 안에서 내보낸다.
+
+JOB_DIR = Path(getattr(settings, 'SCORING_EXPORT_JOB_DIR', None) or Path(settings.BASE_DIR) / 'export_jobs')
+MAX_RUNNING = getattr(settings, 'SCORING_EXPORT_MAX_RUNNING_JOBS', 1)
+JOB_TTL = timedelta(seconds=getattr(settings, 'SCORING_EXPORT_JOB_TTL', 24 * 60 * 60))
+STALE_AFTER = timedelta(seconds=getattr(settings, 'SCORING_EXPORT_JOB_STALE', 10 * 60))
+HEARTBEAT_EVERY = STALE_AFTER / 5
+WORKER_FILE = JOB_DIR / 'worker.heartbeat'
+
+
+class JobLost(Exception):
+    """작업이 다른 worker 에게 넘어갔다 (이 worker 가 STALE_AFTER 넘게 멈췄던 경우)."""
+
+
+def enqueue(user, clients, *, include_info_sheet=False):
+    """clients 의 내보내기 작업을 대기열에 넣는다. 결과는 1명이면 xlsx, 여러 명이면 ZIP."""
+    ids = [c.pk for c in clients]
+    return ExportJob.objects.create(
+        requested_by=user, client_ids=ids, include_info_sheet=include_info_sheet, total=len(ids),
+    )
+
+
+def artifact_path(job):
+    return JOB_DIR / f"{job.pk}.{'xlsx' if len(job.client_ids) == 1 else 'zip'}"
+
+
+def claim_next(max_running=MAX_RUNNING):
+    """
+    가장 오래 기다린 작업을 진행 중으로 바꿔 가져온다. 대기 작업이 없거나 진행 중인 작업이
+    max_running 개면 None. 진행 중 작업 수 확인과 상태 변경은 UPDATE 한 문장이라 worker 끼리 겹치지 않는다.
+    """
+    job = ExportJob.objects.filter(status=ExportJob.QUEUED).order_by('pk').first()
+    if job is None:
+        return None
+    running = (ExportJob.objects.filter(status=ExportJob.RUNNING).order_by()
+               .values('status').annotate(n=Count('pk')).values('n'))
+    now = timezone.now()
+    claimed = (
+        ExportJob.objects.filter(pk=job.pk, status=ExportJob.QUEUED)
+        .filter(GreaterThan(Value(max_running), Coalesce(Subquery(running), 0)))
+        .update(status=ExportJob.RUNNING, started_at=now, heartbeat_at=now, owner=uuid.uuid4().hex)
+    )
+    if not claimed:
+        return None  # 다른 worker 가 먼저 가져갔거나 진행 중인 작업이 가득 찼다
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale():
+    """진행이 STALE_AFTER 넘게 멈춘 (worker 가 죽은) 작업을 다시 대기시킨다. 반환: 작업 수"""
+    return ExportJob.objects.filter(
+        status=ExportJob.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ExportJob.QUEUED, done=0, started_at=None, heartbeat_at=None, owner='')
+
+
+def requeue(job):
+    """진행 중인 작업을 처음부터 다시 대기시킨다 (worker 를 멈출 때)."""
+    _owned(job).update(status=ExportJob.QUEUED, done=0, started_at=None, heartbeat_at=None, owner='')
+    _unlink(_tmp_path(job))
+
+
+def touch_worker():
+    """worker 가 살아 있음을 알린다 (WORKER_FILE 의 수정 시각)."""
+    try:
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        WORKER_FILE.touch()
+    except OSError:
+        logging.exception("worker 상태 파일을 갱신하지 못했습니다: %s", WORKER_FILE)
+
+
+def worker_running():
+    """STALE_AFTER 안에 대기열을 확인하거나 작업을 진행한 worker 가 있으면 True."""
+    try:
+        return time.time() - WORKER_FILE.stat().st_mtime < STALE_AFTER.total_seconds()
+    except OSError:
+        return False
+
+
+def purge_expired():
+    """끝난 지 JOB_TTL 이 지난 작업과 결과 파일을 지운다. 반환: 작업 수"""
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.DONE, ExportJob.FAILED], finished_at__lt=timezone.now() - JOB_TTL,
+    )
+    for job in expired:
+        _unlink(artifact_path(job))
+    return expired.delete()[0]
+
+
+def run_job(job, workers=EXPORT_WORKERS):
+    """claim_next 로 가져온 작업의 결과 파일을 쓰고 상태를 완료(수검자별 오류는 error 에) 또는 실패로 바꾼다."""
+    from .views.advanced import build_client_xlsx_bytes  # views 가 이 모듈을 부른다
+
+    found = Client.objects.select_related('tester').in_bulk(job.client_ids)
+    clients = [found[pk] for pk in job.client_ids if pk in found]
+    errors = [f"id={pk}: 수검자를 찾을 수 없습니다.\n" for pk in job.client_ids if pk not in found]
+    done = len(errors)
+
+    def progress(client, error):
+        nonlocal done
+        done += 1
+        if error:
+            errors.append(f"{client.name} (id={client.pk}): {error}\n")
+        if not _owned(job).update(done=done, heartbeat_at=timezone.now()):
+            raise JobLost
+
+    path = artifact_path(job)
+    tmp = _tmp_path(job)
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        JOB_DIR.mkdir(parents=True, exist_ok=True)
+        if len(job.client_ids) == 1:
+            if not clients:
+                raise Client.DoesNotExist("수검자를 찾을 수 없습니다.")
+            file_name, data = build_client_xlsx_bytes(clients[0], include_info_sheet=job.include_info_sheet)
+            tmp.write_bytes(data)
+            progress(clients[0], None)
+        else:
+            file_name = f"clients_{job.created_at:%Y%m%d_%H%M%S}.zip"
+            with open(tmp, 'wb') as f:
+                for chunk in client_zip_chunks(clients, include_info_sheet=job.include_info_sheet,
+                                               workers=workers, progress=progress):
+                    f.write(chunk)
+        if not _owned(job).exists():
+            raise JobLost
+        os.replace(tmp, path)
+    except JobLost:
+        logging.warning("내보내기 작업을 다른 worker 가 가져갔습니다: job_id=%s", job.pk)
+        _unlink(tmp)
+        job.refresh_from_db()
+        return
+    except Exception as e:
+        logging.exception("내보내기 작업 실패: job_id=%s", job.pk)
+        _unlink(tmp)
+        _finish(job, ExportJob.FAILED, error="".join(errors) + f"{type(e).__name__}: {e}")
+        return
+    finally:
+        heartbeat.stop()
+    _finish(job, ExportJob.DONE, done=done, error="".join(errors), file_name=file_name)
+
+
+class _Heartbeat(threading.Thread):
+    """작업이 끝날 때까지 HEARTBEAT_EVERY 마다 heartbeat_at (과 WORKER_FILE) 을 갱신하는 스레드."""
+
+    def __init__(self, job):
+        super().__init__(name=f"export-job-{job.pk}-heartbeat", daemon=True)
+        self.job = job
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(HEARTBEAT_EVERY.total_seconds()):
+                touch_worker()
+                if not _owned(self.job).update(heartbeat_at=timezone.now()):
+                    return  # 다른 worker 에게 넘어갔다 (작업 스레드는 다음 진행 보고에서 알게 된다)
+        finally:
+            connection.close()  # 이 스레드의 DB 연결
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _owned(job):
+    """job 이 아직 이 worker 의 진행 중 작업이면 그 행 하나인 queryset."""
+    return ExportJob.objects.filter(pk=job.pk, status=ExportJob.RUNNING, owner=job.owner)
+
+
+def _tmp_path(job):
+    return artifact_path(job).with_name(f"{job.pk}.{job.owner}.tmp")
+
+
+def _finish(job, status, **fields):
+    now = timezone.now()
+    _owned(job).update(status=status, finished_at=now, heartbeat_at=now, **fields)
+    job.refresh_from_db()
+
+
+def _unlink(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
@@ -1,8 +1,8 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from suit.widgets import AutosizedTextarea
-import re
 
+from .engine import CONTENT_CODES, DETERMINANT_CODES, SPECIAL_CODES, canonical_det, split_codes
 from .models import Client, ResponseCode
 
 class YMDTextInput(forms.TextInput):
@@ -58,43 +58,23 @@ def validate_dev_qual(value):
 
 
 def validate_determinants(value):
-    elements = [element.strip() for element in re.split(r'[,.]+', value.replace(' ', ''))]
-    elements_lower = [item.lower() if item not in ['ma', 'mp', 'Ma', 'Mp', 'Ma-p']
-                      else item for item in elements]
-
-    for element in elements_lower:
-        if element not in [
-            'Ma', 'Mp', 'Ma-p', 'fma', 'fmp', 'fma-p', 'ma', 'mp', 'ma-p',
-            'fc', 'cf', 'c', 'cn', "fc'", "c'f", "c'", 'ft', 'tf', 't',
-            'fv', 'vf', 'v', 'fy', 'yf', 'y', 'fr', 'rf', 'fd', 'f'
-        ]:
+    for element in split_codes(value):
+        if canonical_det(element.strip()) not in DETERMINANT_CODES:
             raise ValidationError("기호 오류")
 
     return value
 
 
 def validate_special(value):
-    elements = [element.strip() for element in re.split(r'[,.]+', value.replace(' ', ''))]
-    for element in elements:
-        if element not in [
-            'DV', 'DV2', 'DR', 'DR2', 'INC', 'INC2', 'FAB', 'FAB2',
-            'CON', 'ALOG', 'PSV', 'AB', 'AG', 'COP', 'MOR', 'PER',
-            'CP', 'GHR', 'PHR'
-        ]:
+    for element in split_codes(value):
+        if element.strip() not in SPECIAL_CODES:
             raise ValidationError("기호 오류")
     return value
 
 
 def validate_contents(value):
-    elements = [element.strip() for element in re.split(r'[,.]+', value.replace(' ', ''))]
-    elements_lower = [item.lower() for item in elements]
-
-    for element in elements_lower:
-        if element not in [
-            'h', '(h)', 'hd', '(hd)', 'hx', 'a', '(a)', '(ad)', 'ad',
-            'an', 'art', 'ay', 'bl', 'bt', 'cg', 'cl', 'ex', 'fi',
-            'fd', 'ge', 'hh', 'ls', 'na', 'sc', 'sx', 'xy'
-        ]:
+    for element in (item.strip().lower() for item in split_codes(value)):
+        if element not in CONTENT_CODES:
             raise ValidationError("기호 오류")
     return value
 
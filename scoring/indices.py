@@ -0,0 +1,233 @@
+import ast
+
+import numpy as np
+
+# 특수지표 (PTI, DEPI, CDI, S-CON, HVI, OBS) 규칙 엔진
+#
+# 각 지표는 (기준 이름, 조건식) 목록이고, 조건식은 구조요약 변수와 나이별 기준값(NORMS)을
+# 이름으로 참조하는 파이썬 식이다. 앞 기준의 결과도 이름으로 참조할 수 있다 (OBS).
+# 규칙은 import 시 한 번 컴파일되며, 같은 규칙으로
+#   - evaluate(values, age)            : 수검자 1명 (파이썬 스칼라)
+#   - evaluate_bulk(columns, ages)     : 여러 명 (NumPy 배열)
+# 을 계산한다. norms 이름을 바꾸면 채점을 다시 하지 않고 다른 기준으로 판정할 수 있다.
+
+INDEX_RULES = {
+    'PTI': [
+        ('pti1', "xa_per < 0.70 and wda_per < 0.75"),
+        ('pti2', "x_minus_per > 0.29"),
+        ('pti3', "Lvl_2 > 2 and sp_fab2 > 0"),
+        ('pti4', "(R < 17 and wsum6 > wsum6_lowR) or (R > 16 and wsum6 > wsum6_highR)"),
+        ('pti5', "mq_minus > 1 or x_minus_per > 0.40"),
+    ],
+    'DEPI': [
+        ('depi1', "sum_V > 0 or fdn > 2"),
+        ('depi2', "col_shd_blends > 0 or S > 2"),
+        ('depi3', "(ego > ego_high and fr_rf == 0) or ego < ego_low"),
+        ('depi4', "afr < afr_low or blends_num < 4"),
+        ('depi5', "sumshading > sumFm_m or sum_Ca > 2"),
+        ('depi6', "sp_mor > 2 or intel > 3"),
+        ('depi7', "sp_cop < 2 or Isol > 0.24"),
+    ],
+    'CDI': [
+        ('cdi1', "EA < 6 or adj_D < 0"),
+        ('cdi2', "sp_cop < 2 and sp_ag < 2"),
+        ('cdi3', "wsumc < 2.5 or afr < afr_low"),
+        ('cdi4', "sum_p > sum_a + 1 or H < 2"),
+        ('cdi5', "sum_T > 1 or Isol > 0.24 or Fd_l > 0"),
+    ],
+    'SCON': [
+        ('scon1', "sum_V + fdn > 2"),
+        ('scon2', "col_shd_blends > 0"),
+        ('scon3', "ego < 0.31 or ego > 0.44"),
+        ('scon4', "sp_mor > 3"),
+        ('scon5', "Zd > 3.5 or Zd < -3.5"),
+        ('scon6', "es > EA"),
+        ('scon7', "sum_cf + sum_c > sum_fc"),
+        ('scon8', "x_plus_per < 0.70"),
+        ('scon9', "S > 3"),
+        ('scon10', "popular < 3 or popular > 8"),
+        ('scon11', "H < 2"),
+        ('scon12', "R < 17"),
+    ],
+    'HVI': [
+        ('hvi1', "Zf > 12"),
+        ('hvi2', "Zd > 3.5"),
+        ('hvi3', "S > 3"),
+        ('hvi4', "human_cont > 6"),
+        ('hvi5', "H_paren + A_paren + Hd_paren + Ad_paren > 3"),
+        ('hvi6', "hd_ad != 0 and div(h_a, hd_ad) < 4"),
+        ('hvi7', "Cg > 3"),
+    ],
+    'OBS': [
+        ('obs1', "Dd > 3"),
+        ('obs2', "Zf > 12"),
+        ('obs3', "Zd > 3.0"),
+        ('obs4', "popular > 7"),
+        ('obs5', "fqx_plus > 1"),
+        ('obs6', "obs1 and obs2 and obs3 and obs4 and obs5"),
+        ('obs7', "count(obs1, obs2, obs3, obs4) >= 2 and fqx_plus > 3"),
+        ('obs8', "count(obs1, obs2, obs3, obs4, obs5) >= 3 and x_plus_per > 0.89"),
+        ('obs9', "fqx_plus > 3 and x_plus_per > 0.89"),
+    ],
+}
+
+# 충족 개수를 sum<지표> 필드로 저장하는 지표 (OBS 는 OBS_posi 로만 판정)
+SUMMED_INDICES = ('PTI', 'DEPI', 'CDI', 'SCON', 'HVI')
+
+# 지표 외 판정 (필드 이름, 조건식)
+EXTRA_RULES = [
+    ('HVI_premise', "sum_T == 0"),
+    ('OBS_posi', "obs6 or obs7 or obs8 or obs9"),
+]
+
+# 나이별 기준값: 이름 → ([(나이 하한, 나이 상한 또는 None, 값), ...], 해당 없을 때 값)
+NORMS = {
+    'default': {
+        'wsum6_highR': ([(5, 7, 20), (8, 10, 19), (11, 13, 18), (14, None, 16)], 20),
+        'wsum6_lowR': ([(5, 7, 16), (8, 10, 15), (11, 13, 14), (14, None, 12)], 16),
+        'afr_low': ([(5, 6, 0.57), (7, 9, 0.55), (10, 13, 0.53), (14, None, 0.46)], 0.57),
+        'ego_high': ([
+            (5, 5, 0.55), (6, 6, 0.52), (7, 7, 0.52), (8, 8, 0.48), (9, 9, 0.45), (10, 10, 0.45),
+            (11, 11, 0.45), (12, 12, 0.38), (13, 13, 0.38), (14, 14, 0.37), (15, 15, 0.33),
+            (16, 16, 0.33), (17, None, 0.33),
+        ], 0.55),
+        'ego_low': ([
+            (5, 5, 0.83), (6, 6, 0.82), (7, 7, 0.77), (8, 8, 0.74), (9, 9, 0.69), (10, 10, 0.63),
+            (11, 11, 0.58), (12, 12, 0.58), (13, 13, 0.56), (14, 14, 0.54), (15, 15, 0.5),
+            (16, 16, 0.48), (17, None, 0.44),
+        ], 0.83),
+    },
+}
+
+_MAX_AGE = 150
+
+
+class _Vectorize(ast.NodeTransformer):
+    """and/or/not → 원소별 논리 연산 함수 호출로 바꾼다."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        func = '_and' if isinstance(node.op, ast.And) else '_or'
+        return ast.Call(func=ast.Name(id=func, ctx=ast.Load()), args=node.values, keywords=[])
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Call(func=ast.Name(id='_not', ctx=ast.Load()), args=[node.operand], keywords=[])
+        return node
+
+
+def _compile(expr):
+    scalar = compile(expr, '<index rule>', 'eval')
+    tree = _Vectorize().visit(ast.parse(expr, mode='eval'))
+    vector = compile(ast.fix_missing_locations(tree), '<index rule>', 'eval')
+    return scalar, vector
+
+
+def _compile_norms(norms):
+    """기준값 표 → 나이(0~_MAX_AGE) 색인 배열."""
+    tables = {}
+    for name, (ranges, default) in norms.items():
+        lut = np.full(_MAX_AGE + 1, default, dtype=float)
+        for lo, hi, value in reversed(ranges):  # 앞 구간이 우선
+            lut[lo:(_MAX_AGE if hi is None else hi) + 1] = value
+        tables[name] = lut
+    return tables
+
+
+def compile_rules(rules=INDEX_RULES, extra=EXTRA_RULES, norms=NORMS):
+    return {
+        'indices': [
+            (index, [(name, *_compile(expr)) for name, expr in criteria])
+            for index, criteria in rules.items()
+        ],
+        'extra': [(field, *_compile(expr)) for field, expr in extra],
+        'norms': {key: _compile_norms(table) for key, table in norms.items()},
+    }
+
+
+def _scalar_div(a, b):
+    return a / b if b else 0
+
+
+def _vector_div(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b != 0, a / np.where(b != 0, b, 1), 0)
+
+
+_SCALAR_FUNCS = {
+    'div': _scalar_div,
+    'count': lambda *conds: sum(bool(c) for c in conds),
+}
+_VECTOR_FUNCS = {
+    'div': _vector_div,
+    'count': lambda *conds: sum(np.asarray(c, dtype=np.int64) for c in conds),
+    '_and': lambda *v: np.logical_and.reduce(np.broadcast_arrays(*v)),
+    '_or': lambda *v: np.logical_or.reduce(np.broadcast_arrays(*v)),
+    '_not': np.logical_not,
+}
+
+COMPILED = compile_rules()
+
+
+def register_norms(name, table):
+    """다른 기준값 세트 등록. table 은 NORMS['default'] 와 같은 형식이며 빠진 항목은 기본값을 쓴다."""
+    NORMS[name] = dict(NORMS['default'], **table)
+    COMPILED['norms'][name] = _compile_norms(NORMS[name])
+
+
+def _age_index(age):
+    return min(max(int(age), 0), _MAX_AGE)
+
+
+def evaluate(values, age, norms='default', compiled=COMPILED):
+    """
+    수검자 1명의 지표 판정. values 는 조건식이 참조하는 변수 dict.
+    반환: {'PTI': 'oxxox', 'sumPTI': 2, ..., 'HVI_premise': bool, 'OBS_posi': bool}
+    """
+    i = _age_index(age)
+    env = dict(values)
+    env.update({name: float(lut[i]) for name, lut in compiled['norms'][norms].items()})
+    env.update(_SCALAR_FUNCS)
+    out = {}
+    for index, criteria in compiled['indices']:
+        flags = []
+        for name, code, _vector in criteria:
+            env[name] = bool(eval(code, {'__builtins__': {}}, env))
+            flags.append(env[name])
+        out[index] = ''.join('o' if f else 'x' for f in flags)
+        if index in SUMMED_INDICES:
+            out[f'sum{index}'] = sum(flags)
+    for field, code, _vector in compiled['extra']:
+        out[field] = bool(eval(code, {'__builtins__': {}}, env))
+    return out
+
+
+def evaluate_bulk(columns, ages, norms='default', compiled=COMPILED):
+    """
+    여러 수검자의 지표 판정. columns 는 변수 이름 → 배열 dict, ages 는 나이 배열.
+    반환 형식은 evaluate 와 같되 값이 목록이다.
+    """
+    idx = np.clip(np.asarray(ages, dtype=np.int64), 0, _MAX_AGE)
+    env = dict(columns)
+    env.update({name: lut[idx] for name, lut in compiled['norms'][norms].items()})
+    env.update(_VECTOR_FUNCS)
+    n = len(idx)
+    out = {}
+    for index, criteria in compiled['indices']:
+        flags = []
+        for name, _scalar, code in criteria:
+            env[name] = np.broadcast_to(eval(code, {'__builtins__': {}}, env), (n,)).astype(bool)
+            flags.append(env[name])
+        m = np.column_stack(flags) if n else np.zeros((0, len(flags)), dtype=bool)
+        out[index] = [''.join('o' if f else 'x' for f in row) for row in m.tolist()]
+        if index in SUMMED_INDICES:
+            out[f'sum{index}'] = m.sum(axis=1).tolist()
+    for field, _scalar, code in compiled['extra']:
+        out[field] = np.broadcast_to(eval(code, {'__builtins__': {}}, env), (n,)).astype(bool).tolist()
+    return out
+
+
+def evaluate_norms(values, age, norms=None, compiled=COMPILED):
+    """여러 기준값 세트로 나란히 판정 (채점 결과 재사용). 반환: {기준 이름: evaluate 결과}"""
+    return {key: evaluate(values, age, key, compiled) for key in (norms or compiled['norms'])}
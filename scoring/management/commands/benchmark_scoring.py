@@ -0,0 +1,220 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from openpyxl import Workbook
+
+from scoring import export_cache
+from scoring.engine import ENGINE_VERSION
+from scoring.forms import ResponseCodeForm
+from scoring.models import Client, ResponseCode, StructuralSummary
+from scoring.snapshot import ProtocolSnapshot
+from scoring.synthetic import DEFAULT_MIX, generate_cohort
+from scoring.views.advanced import (
+    REQUIRED_FIELDS,
+    advanced_upload,
+    compute_projection_metrics,
+    create_advanced_workbook,
+)
+from scoring.views.intermediate import export_structural_summary_xlsx
+
+BENCHMARKS = ['calculate_values', 'projection', 'advanced_workbook', 'intermediate_export', 'advanced_upload']
+
+
+class Command(BaseCommand):
+    help = (
+        "가상 프로토콜로 채점/내보내기 주요 경로의 시간을 재고 JSON 으로 기록합니다. "
+        "모든 데이터는 트랜잭션 안에서 만들고 끝나면 되돌립니다. 내보내기 캐시는 쓰지 않습니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--r-min', type=int, default=14, help="수검자당 최소 반응 수")
+        parser.add_argument('--r-max', type=int, default=40, help="수검자당 최대 반응 수")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mix', action='append', default=[], metavar='KEY=RATE',
+                            help="기호 구성 비율 (예: --mix blend=0.4). 키: " + ", ".join(DEFAULT_MIX))
+        parser.add_argument('--repeat', type=int, default=3, help="벤치마크별 반복 횟수")
+        parser.add_argument('--only', action='append', choices=BENCHMARKS, help="일부 벤치마크만 실행")
+        parser.add_argument('--output', help="결과 JSON 경로")
+        parser.add_argument('--compare', help="비교할 이전 결과 JSON 경로")
+
+    def handle(self, *args, **opts):
+        if opts['clients'] < 1 or opts['repeat'] < 1 or not 1 <= opts['r_min'] <= opts['r_max']:
+            raise CommandError("--clients, --repeat 는 1 이상, --r-min 은 1 이상 --r-max 이하여야 합니다.")
+        mix = {}
+        for item in opts['mix']:
+            key, _, rate = item.partition('=')
+            if key not in DEFAULT_MIX:
+                raise CommandError(f"알 수 없는 --mix 키: {key}")
+            try:
+                mix[key] = float(rate)
+            except ValueError:
+                raise CommandError(f"--mix 값이 숫자가 아닙니다: {item}")
+
+        cohort = generate_cohort(opts['seed'], opts['clients'], opts['r_min'], opts['r_max'], mix)
+        names = opts['only'] or BENCHMARKS
+        export_cache.CACHE_MAX_BYTES = 0  # 되돌릴 수검자의 파일을 남기지 않고, 매번 새로 만드는 시간을 잰다
+        with transaction.atomic():
+            clients = self._create_cohort(cohort)
+            results = {}
+            for name in names:
+                timings = []
+                for _ in range(opts['repeat']):
+                    timings.append(getattr(self, f'_bench_{name}')(clients))
+                results[name] = _stats(timings, len(clients))
+                self.stdout.write(
+                    f"{name:22s} 중앙값 {results[name]['median_s'] * 1000:9.1f}ms "
+                    f"(수검자당 {results[name]['per_client_ms']:7.2f}ms)"
+                )
+            transaction.set_rollback(True)
+
+        report = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'engine_version': ENGINE_VERSION,
+                'clients': opts['clients'],
+                'responses': sum(len(rows) for _, rows in cohort),
+                'r_range': [opts['r_min'], opts['r_max']],
+                'seed': opts['seed'],
+                'mix': dict(DEFAULT_MIX, **mix),
+                'repeat': opts['repeat'],
+            },
+            'results': results,
+        }
+        if opts['compare']:
+            self._compare(report, json.loads(Path(opts['compare']).read_text(encoding='utf-8')))
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"결과 저장: {opts['output']}"))
+
+    def _create_cohort(self, cohort):
+        User = get_user_model()
+        phone = 1000000000
+        while User.objects.filter(phone=f'0{phone}').exists():
+            phone += 1
+        self.user = User.objects.create(username='__benchmark__', phone=f'0{phone}', group='advanced')
+
+        clients = []
+        for fields, rows in cohort:
+            client = Client.objects.create(tester=self.user, **fields)
+            for row in rows:
+                form = ResponseCodeForm(row)
+                if not form.is_valid():
+                    raise CommandError(f"생성된 반응이 유효하지 않습니다: {dict(form.errors)}")
+                ResponseCode.objects.create(client=client, **row)
+            StructuralSummary.objects.create(client=client)
+            client.upload_bytes, client.upload_rows = _upload_xlsx(rows), len(rows)
+            clients.append(client)
+        return clients
+
+    def _bench_calculate_values(self, clients):
+        summaries = [StructuralSummary.objects.get(client=c) for c in clients]
+        started = time.perf_counter()
+        for summary in summaries:
+            summary.calculate_values()
+        return time.perf_counter() - started
+
+    def _bench_projection(self, clients):
+        codes = [list(ResponseCode.objects.filter(client=c).select_related('client')) for c in clients]
+        started = time.perf_counter()
+        for rows in codes:
+            compute_projection_metrics(rows)
+        return time.perf_counter() - started
+
+    def _bench_advanced_workbook(self, clients):
+        started = time.perf_counter()
+        for client in clients:
+            create_advanced_workbook(ProtocolSnapshot.load(client))[0].save(BytesIO())
+        return time.perf_counter() - started
+
+    def _bench_intermediate_export(self, clients):
+        factory = RequestFactory()
+        started = time.perf_counter()
+        for client in clients:
+            request = factory.get('/')
+            request.user = self.user
+            response = export_structural_summary_xlsx(request, client.id)
+            if response.status_code != 200:
+                raise CommandError(f"중급 내보내기 실패 ({client.id}): {response.status_code}")
+        return time.perf_counter() - started
+
+    def _bench_advanced_upload(self, clients):
+        factory = RequestFactory()
+        started = time.perf_counter()
+        for client in clients:
+            request = factory.post('/', {
+                'client': client.id,
+                'replace_existing': 'on',
+                'file': SimpleUploadedFile('responses.xlsx', client.upload_bytes),
+            })
+            request.user = self.user
+            request._messages = CookieStorage(request)
+            response = advanced_upload(request, client.id)
+            if response.status_code != 302:
+                raise CommandError(f"업로드 실패 ({client.id}): {response.status_code}")
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            if ResponseCode.objects.filter(client=client).count() != client.upload_rows:
+                raise CommandError(f"업로드 행 수 불일치 ({client.id})")
+        return elapsed
+
+    def _compare(self, report, previous):
+        self.stdout.write(f"비교 대상: {previous['meta'].get('commit') or '?'} ({previous['meta'].get('created')})")
+        for name, now in report['results'].items():
+            before = previous.get('results', {}).get(name)
+            if not before or not before.get('per_client_ms'):
+                continue
+            change = now['per_client_ms'] / before['per_client_ms'] - 1
+            style = self.style.ERROR if change > 0.1 else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{name:22s} {before['per_client_ms']:7.2f}ms → {now['per_client_ms']:7.2f}ms ({change:+.1%})"
+            ))
+
+
+def _stats(timings, clients):
+    median = statistics.median(timings)
+    return {
+        'runs_s': [round(t, 6) for t in timings],
+        'min_s': round(min(timings), 6),
+        'median_s': round(median, 6),
+        'per_client_ms': round(median / clients * 1000, 4),
+    }
+
+
+def _upload_xlsx(rows):
+    """advanced_upload 가 읽는 형식의 엑셀 파일."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '입력'
+    ws.append(REQUIRED_FIELDS)
+    for row in rows:
+        ws.append([row.get(f) for f in REQUIRED_FIELDS])
+    bio = BytesIO()
+    wb.save(bio)
+    return bio.getvalue()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except Exception:
+        return None
@@ -0,0 +1,117 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.engine import card_number
+from scoring.models import ResponseCode
+from scoring.projection import card_key, token_scores
+from scoring.synthetic import generate_cohort
+from scoring.tokenizer import TOKENIZERS, okt_available, tokenize_with
+
+
+class Command(BaseCommand):
+    help = (
+        "저장된 반응/질문 문장으로 형태소 분석기(okt, dictionary, whitespace)의 속도와 "
+        "기준 분석기 대비 토큰/투사 토큰 점수 차이를 비교합니다. 캐시와 분석 서비스는 쓰지 않습니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokenizer', action='append', choices=TOKENIZERS, help="비교할 분석기 (기본: 쓸 수 있는 전부)")
+        parser.add_argument('--reference', choices=TOKENIZERS, help="기준 분석기 (기본: okt, 없으면 whitespace)")
+        parser.add_argument('--client', type=int, action='append', help="특정 수검자 id 만")
+        parser.add_argument('--limit', type=int, help="최대 반응 수")
+        parser.add_argument('--synthetic', type=int, metavar='CLIENTS', help="저장된 반응 대신 가상 프로토콜 사용")
+        parser.add_argument('--output', help="결과 JSON 경로")
+
+    def handle(self, *args, **opts):
+        okt = okt_available()
+        reference = opts['reference'] or ('okt' if okt else 'whitespace')
+        if not okt and reference == 'okt':
+            raise CommandError("konlpy/JVM 을 쓸 수 없어 okt 를 기준으로 할 수 없습니다.")
+        if not okt and not opts['reference']:
+            self.stdout.write(self.style.WARNING("konlpy/JVM 을 쓸 수 없어 whitespace 를 기준으로 비교합니다."))
+        modes = list(dict.fromkeys(opts['tokenizer'] or [m for m in TOKENIZERS if okt or m != 'okt']))
+        if reference not in modes:
+            modes.insert(0, reference)
+        if 'okt' in modes and not okt:
+            raise CommandError("konlpy/JVM 을 쓸 수 없습니다.")
+
+        cards, responses, inquiries = self._load(opts)
+        if not cards:
+            raise CommandError("비교할 반응이 없습니다.")
+        self.stdout.write(f"반응 {len(cards)}개, 기준 {reference}")
+
+        results = {}
+        for mode in modes:
+            tokenize_with(mode, ['준비'])  # 사전 만들기/JVM 시작은 시간에서 뺀다
+            started = time.perf_counter()
+            tokens = {'response': tokenize_with(mode, responses), 'inquiry': tokenize_with(mode, inquiries)}
+            elapsed = time.perf_counter() - started
+            results[mode] = {
+                'tokens': tokens,
+                'seconds': elapsed,
+                'scores': {
+                    'response': token_scores(cards, tokens['response'], 'response_score'),
+                    'inquiry': token_scores(cards, tokens['inquiry'], 'inquiry_score'),
+                },
+            }
+
+        ref = results[reference]
+        report = {'responses': len(cards), 'reference': reference, 'tokenizers': {}}
+        for mode, res in results.items():
+            row = {
+                'seconds': round(res['seconds'], 4),
+                'ms_per_text': round(res['seconds'] / (2 * len(cards)) * 1000, 4),
+            }
+            for part in ('response', 'inquiry'):
+                a, b = res['scores'][part], ref['scores'][part]
+                row[f'{part}_token_jaccard'] = round(_mean_jaccard(res['tokens'][part], ref['tokens'][part]), 4)
+                row[f'{part}_score_mae'] = round(float(np.mean(np.abs(a - b))), 4)
+                row[f'{part}_score_exact'] = round(float(np.mean(a == b)), 4)
+                row[f'{part}_score_corr'] = _corr(a, b)
+            report['tokenizers'][mode] = row
+            self.stdout.write(
+                f"{mode:10s} {row['ms_per_text']:8.3f}ms/문장  "
+                f"토큰 일치 {row['response_token_jaccard']:.3f}/{row['inquiry_token_jaccard']:.3f}  "
+                f"점수 MAE {row['response_score_mae']:.3f}/{row['inquiry_score_mae']:.3f}  "
+                f"상관 {_fmt(row['response_score_corr'])}/{_fmt(row['inquiry_score_corr'])}  (반응/질문)"
+            )
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"결과 저장: {opts['output']}"))
+
+    def _load(self, opts):
+        if opts['synthetic']:
+            rows = [row for _, protocol in generate_cohort(0, opts['synthetic']) for row in protocol]
+            rows = rows[:opts['limit']] if opts['limit'] else rows
+            return ([card_key(card_number(row['card']), row['card']) for row in rows],
+                    [row['response'] for row in rows], [row['inquiry'] for row in rows])
+        qs = ResponseCode.objects.order_by('id').only('card', 'card_num', 'response', 'inquiry')
+        if opts['client']:
+            qs = qs.filter(client_id__in=opts['client'])
+        if opts['limit']:
+            qs = qs[:opts['limit']]
+        rows = list(qs)
+        return ([card_key(rc.card_num, rc.card) for rc in rows],
+                [rc.response for rc in rows], [rc.inquiry for rc in rows])
+
+
+def _mean_jaccard(a, b):
+    scores = []
+    for x, y in zip(a, b):
+        x, y = set(x), set(y)
+        scores.append(len(x & y) / len(x | y) if x | y else 1.0)
+    return float(np.mean(scores)) if scores else 1.0
+
+
+def _corr(a, b):
+    if len(a) < 2 or np.std(a) == 0 or np.std(b) == 0:
+        return None
+    return round(float(np.corrcoef(a, b)[0, 1]), 4)
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.3f}'
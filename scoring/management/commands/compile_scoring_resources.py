@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from scoring.projection import COMPILED_DIR, compile_resources
+
+
+class Command(BaseCommand):
+    help = (
+        "투사지표 참조 자료 JSON 을 바이너리(토큰 점수표는 memory-map 용)로 변환합니다. "
+        "배포 시 자료 파일이 바뀔 때마다 실행하세요 (없거나 오래되면 JSON 을 그대로 읽습니다)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(COMPILED_DIR), help="출력 디렉터리 (기본: SCORING_COMPILED_RESOURCE_DIR 설정 또는 resources/compiled)")
+
+    def handle(self, *args, **opts):
+        out_dir = Path(opts['output'])
+        manifest = compile_resources(out_dir)
+        size = sum((out_dir / name).stat().st_size for name in ['tokens.npy', *manifest['tables'].values()])
+        self.stdout.write(self.style.SUCCESS(
+            f"{out_dir} 에 저장: 카드 {len(manifest['cards'])}장, "
+            f"표 {len(manifest['tables'])}개, {size / 1024:.0f}KB"
+        ))
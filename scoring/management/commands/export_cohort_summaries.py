@@ -0,0 +1,55 @@
+import csv
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from scoring.cohort import score_cohort
+from scoring.engine import ROW_FIELDS
+from scoring.indices import NORMS
+from scoring.models import Client, ResponseCode, StructuralSummary
+
+
+class Command(BaseCommand):
+    help = "조건에 맞는 수검자들의 구조요약을 DB 에 저장하지 않고 일괄 계산해 CSV 로 내보냅니다 (연구용)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="CSV 파일 경로")
+        parser.add_argument('--tester', help="검사자 username")
+        parser.add_argument('--since', type=date.fromisoformat, help="검사일 시작 (YYYY-MM-DD)")
+        parser.add_argument('--until', type=date.fromisoformat, help="검사일 끝 (YYYY-MM-DD)")
+        parser.add_argument('--norms', default='default', choices=sorted(NORMS), help="특수지표 기준값 세트")
+
+    def handle(self, *args, **opts):
+        clients = Client.objects.all()
+        if opts['tester']:
+            clients = clients.filter(tester__username=opts['tester'])
+        if opts['since']:
+            clients = clients.filter(testDate__gte=opts['since'])
+        if opts['until']:
+            clients = clients.filter(testDate__lte=opts['until'])
+
+        started = time.monotonic()
+        ages = dict(clients.values_list('id', 'age'))
+        rows = {cid: [] for cid in ages}
+        responses = (
+            ResponseCode.objects.filter(client_id__in=clients.values('id'))
+            .in_protocol_order().values_list('client_id', 'card_num', 'parsed_codes', *ROW_FIELDS)
+        )
+        for client_id, card_num, parsed, *values in responses.iterator(chunk_size=5000):
+            rows[client_id].append(dict(zip(ROW_FIELDS, values), card_num=card_num, parsed=parsed or None))
+        protocols = [(cid, ages[cid], rows[cid]) for cid in sorted(ages)]
+        ids, values = score_cohort(protocols, opts['norms'])
+
+        fields = [f.name for f in StructuralSummary._meta.fields if f.name in values]
+        with open(opts['output'], 'w', newline='', encoding='utf-8-sig') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['client_id'] + fields)
+            for i, cid in enumerate(ids):
+                writer.writerow([cid] + [values[f][i] for f in fields])
+
+        skipped = len(protocols) - len(ids)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ids)}명 계산 완료 ({time.monotonic() - started:.1f}s)"
+            + (f", 나이 미상 {skipped}명 제외" if skipped else "")
+        ))
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from scoring.models import ProjectionScore, ResponseCode, StructuralSummary
+from scoring.process_pool import process_pool
+from scoring.projection import (
+    PROJECTION_FIELDS,
+    build_resources,
+    card_key,
+    card_t_from_scores,
+    changed_cards,
+    load_resources,
+    projection_version,
+    resource_paths,
+    response_frame,
+    score_tokenized,
+    tokenize_frame,
+)
+
+# worker 프로세스의 참조 자료 {'old': ..., 'new': ...}
+_worker_resources = {}
+
+
+class Command(BaseCommand):
+    help = (
+        "참조 자료(resources/*.json)를 바꾸기 전후로 저장된 프로토콜의 투사지표를 다시 계산해 "
+        "수검자별·카드별 T 변화를 보고합니다. 항목이 바뀐 카드의 반응만 다시 계산합니다. "
+        "--apply 를 주면 새 값을 저장합니다 (새 자료를 배포한 뒤에만)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--old', help="이전 자료 디렉터리 (기본: 현재 자료, 없는 파일은 현재 자료)")
+        parser.add_argument('--new', help="새 자료 디렉터리 (기본: 현재 자료, 없는 파일은 현재 자료)")
+        parser.add_argument('--client', type=int, action='append', help="특정 수검자 id 만")
+        parser.add_argument('--workers', type=int, default=1, help="채점 프로세스 수")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="프로세스에 한 번에 맡길 반응 수")
+        parser.add_argument('--output', help="보고서 엑셀(.xlsx) 경로")
+        parser.add_argument('--apply', action='store_true', help="새 자료 기준 점수와 T 평균을 저장")
+
+    def handle(self, *args, **opts):
+        if opts['workers'] < 1 or opts['chunk_size'] < 1:
+            raise CommandError("--workers, --chunk-size 는 1 이상이어야 합니다.")
+        current = resource_paths()
+        paths = {'old': resource_paths(opts['old']), 'new': resource_paths(opts['new'])}
+        compiled = {which: p == current for which, p in paths.items()}
+        cards = changed_cards(paths['old'], paths['new'])
+        self.stdout.write(f"바뀐 카드: {', '.join(sorted(cards, key=lambda c: (len(c), c))) or '없음'}")
+
+        resources = {which: build_resources(p, use_compiled=compiled[which]) for which, p in paths.items()}
+        versions = {which: projection_version(res) for which, res in resources.items()}
+        if opts['apply'] and resources['new']['version'] != load_resources()['version']:
+            raise CommandError("--apply 는 새 자료를 배포한 뒤(--new 가 현재 자료와 같을 때)에만 쓸 수 있습니다.")
+
+        qs = ResponseCode.objects.order_by('client_id', 'id')
+        if opts['client']:
+            qs = qs.filter(client_id__in=opts['client'])
+        rows = list(qs)
+        if not rows:
+            raise CommandError("다시 계산할 반응이 없습니다.")
+        hashes = {rc.pk: rc.projection_source() for rc in rows}
+        stored = {p.pk: p for p in ProjectionScore.objects.filter(pk__in=list(hashes))}
+
+        # 바뀐 카드의 반응: 이전/새 자료로 모두 계산
+        # 나머지: 이전 자료 기준 저장값이 맞으면 그대로, 아니면 한 번만 계산 (두 자료에서 같은 값)
+        changed = [rc for rc in rows if card_key(rc.card_num, rc.card) in cards]
+        unchanged = [rc for rc in rows if card_key(rc.card_num, rc.card) not in cards]
+        missing = [
+            rc for rc in unchanged
+            if rc.pk not in stored or stored[rc.pk].version != versions['old']
+            or stored[rc.pk].source_hash != hashes[rc.pk]
+        ]
+        self.stdout.write(
+            f"반응 {len(rows)}개: 바뀐 카드 {len(changed)}개 재계산, "
+            f"그 밖의 카드 {len(unchanged) - len(missing)}개 저장값 사용 / {len(missing)}개 계산"
+        )
+
+        jobs = [('old', changed), ('new', changed), ('old', missing)]
+        results = self._score(jobs, resources, paths, compiled, opts['workers'], opts['chunk_size'])
+        scores = {'old': {}, 'new': {}}
+        for (which, rcs), values in zip(jobs, results):
+            scores[which].update(zip((rc.pk for rc in rcs), values))
+        for rc in unchanged:
+            values = scores['old'].get(rc.pk) or {f: getattr(stored[rc.pk], f) for f in PROJECTION_FIELDS.values()}
+            scores['old'][rc.pk] = scores['new'][rc.pk] = values
+
+        by_card, by_client, summaries = _report(rows, scores)
+        self._print_summary(by_card, by_client, len(changed))
+        if opts['output']:
+            _workbook({'수검자별': by_client, '카드별': by_card}).save(opts['output'])
+            self.stdout.write(self.style.SUCCESS(f"보고서 저장: {opts['output']}"))
+        if opts['apply']:
+            self._apply(rows, hashes, scores['new'], versions['new'], summaries)
+
+    def _score(self, jobs, resources, paths, compiled, workers, chunk_size):
+        """[(자료 이름, 반응 목록), ...] → 작업별 [{필드: 값}, ...] (반응 순서대로)."""
+        frames = [tokenize_frame(response_frame(rcs)) if rcs else None for _, rcs in jobs]
+        tasks = [
+            (i, which, frame.iloc[start:start + chunk_size])
+            for i, ((which, _), frame) in enumerate(zip(jobs, frames)) if frame is not None
+            for start in range(0, len(frame), chunk_size)
+        ]
+        _worker_resources.update(resources)
+        if workers == 1 or len(tasks) == 1:
+            parts = [_score_chunk(which, chunk) for _, which, chunk in tasks]
+        else:
+            with process_pool(workers, 'scoring.management.commands.recompute_projection._init_worker',
+                              (paths, compiled)) as pool:
+                parts = list(pool.map(_score_chunk, [t[1] for t in tasks], [t[2] for t in tasks]))
+        out = [[] for _ in jobs]
+        for (i, _, _), part in zip(tasks, parts):
+            out[i].extend(part)
+        return out
+
+    def _print_summary(self, by_card, by_client, n_changed):
+        delta = by_client['T_변화'].dropna()
+        moved = (delta.abs() > 1e-9).sum()
+        self.stdout.write(f"수검자 {len(by_client)}명 중 T 가 바뀐 수검자 {moved}명")
+        if len(delta):
+            self.stdout.write(
+                f"수검자 T 변화: 평균 {delta.mean():+.3f}, |평균| {delta.abs().mean():.3f}, "
+                f"최대 {delta.abs().max():.3f}"
+            )
+        if n_changed:
+            for card, part in by_card.groupby('카드', sort=False):
+                d = part['T_변화'].dropna()
+                if len(d) and (d.abs() > 1e-9).any():
+                    self.stdout.write(f"  카드 {card:>3s}: 수검자 {len(d)}명, 평균 {d.mean():+.3f}, 최대 {d.abs().max():.3f}")
+
+    def _apply(self, rows, hashes, new_scores, version, summaries):
+        fresh = [
+            ProjectionScore(response_id=rc.pk, version=version, source_hash=hashes[rc.pk],
+                            **{f: _float(new_scores[rc.pk][f]) for f in PROJECTION_FIELDS.values()})
+            for rc in rows
+        ]
+        with transaction.atomic():
+            pks = [rc.pk for rc in rows]
+            for start in range(0, len(pks), 500):
+                ProjectionScore.objects.filter(pk__in=pks[start:start + 500]).delete()
+            ProjectionScore.objects.bulk_create(fresh, batch_size=500)
+            for client_id, (overall_t, card_t) in summaries.items():
+                StructuralSummary.objects.filter(client_id=client_id).update(
+                    projection_t=overall_t, projection_card_t=card_t,
+                )
+        self.stdout.write(self.style.SUCCESS(f"저장: 반응 {len(fresh)}개, 수검자 {len(summaries)}명"))
+
+
+def _init_worker(paths, compiled):
+    # 새로 시작한 worker 는 자료를 직접 만든다 (fork 로 시작했으면 부모의 자료를 그대로 쓴다)
+    for which, p in paths.items():
+        if which not in _worker_resources:
+            _worker_resources[which] = build_resources(p, use_compiled=compiled[which])
+
+
+def _float(value):
+    return None if value is None or pd.isna(value) else float(value)
+
+
+def _score_chunk(which, chunk):
+    df = score_tokenized(chunk, _worker_resources[which])
+    return [dict(zip(PROJECTION_FIELDS.values(), values)) for values in df[list(PROJECTION_FIELDS)].itertuples(index=False)]
+
+
+def _report(rows, scores):
+    """
+    (카드별 표, 수검자별 표, {수검자 id: (새 전체 T, 새 카드별 T)}).
+    T 평균은 StructuralSummary.projection_t / projection_card_t 와 같은 방식으로 낸다.
+    """
+    df = pd.DataFrame({
+        '수검자': [rc.client_id for rc in rows],
+        '카드': [card_key(rc.card_num, rc.card) for rc in rows],
+        'old': np.array([scores['old'][rc.pk]['t_score'] for rc in rows], dtype=float),
+        'new': np.array([scores['new'][rc.pk]['t_score'] for rc in rows], dtype=float),
+    })
+    by_card = (df.groupby(['수검자', '카드'], sort=False)
+                 .agg(반응수=('old', 'size'), 이전_T=('old', 'mean'), 새_T=('new', 'mean'))
+                 .reset_index())
+    by_card['T_변화'] = by_card['새_T'] - by_card['이전_T']
+
+    clients, summaries = [], {}
+    for client_id, part in df.groupby('수검자', sort=False):
+        old_t, _ = card_t_from_scores(zip(part['수검자'], part['카드'], part['old']))
+        new_t, new_card_t = card_t_from_scores(zip(part['수검자'], part['카드'], part['new']))
+        summaries[client_id] = (new_t, new_card_t)
+        clients.append({
+            '수검자': client_id,
+            '반응수': len(part),
+            '바뀐_반응수': int((~np.isclose(part['old'], part['new'], rtol=0, atol=1e-9, equal_nan=True)).sum()),
+            '이전_T': old_t,
+            '새_T': new_t,
+        })
+    by_client = pd.DataFrame(clients).astype({'이전_T': float, '새_T': float})
+    by_client['T_변화'] = by_client['새_T'] - by_client['이전_T']
+    return by_card, by_client, summaries
+
+
+def _workbook(sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for title, df in sheets.items():
+        ws = wb.create_sheet(title)
+        ws.append(list(df.columns))
+        for values in df.itertuples(index=False):
+            ws.append([None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in values])
+    return wb
@@ -0,0 +1,143 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from scoring.engine import ENGINE_VERSION, ROW_FIELDS, score_batch
+from scoring.models import Client, ResponseCode, StructuralSummary
+
+
+class Command(BaseCommand):
+    help = "전체(또는 조건에 맞는) 수검자의 구조요약을 여러 프로세스로 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tester', help="검사자 username")
+        parser.add_argument('--since', type=date.fromisoformat, help="검사일 시작 (YYYY-MM-DD)")
+        parser.add_argument('--until', type=date.fromisoformat, help="검사일 끝 (YYYY-MM-DD)")
+        parser.add_argument('--stale-only', action='store_true',
+                            help="반응/나이/엔진 버전이 바뀐 요약만 다시 계산")
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="프로세스 수 (1 이면 현재 프로세스에서 실행)")
+
+    def handle(self, *args, **opts):
+        if opts['chunk_size'] < 1 or opts['workers'] < 1:
+            raise CommandError("--chunk-size 와 --workers 는 1 이상이어야 합니다.")
+
+        clients = Client.objects.all()
+        if opts['tester']:
+            clients = clients.filter(tester__username=opts['tester'])
+        if opts['since']:
+            clients = clients.filter(testDate__gte=opts['since'])
+        if opts['until']:
+            clients = clients.filter(testDate__lte=opts['until'])
+        total = clients.count()
+        ids = clients.order_by('id').values_list('id', flat=True).iterator(chunk_size=opts['chunk_size'])
+
+        started = time.monotonic()
+        done = recomputed = 0
+        pool = ProcessPoolExecutor(opts['workers']) if opts['workers'] > 1 else None
+        try:
+            # 한 청크를 쓰는 동안 다음 청크(들)를 풀에서 채점
+            pending = []
+            for chunk in _chunks(ids, opts['chunk_size']):
+                payload, summaries = self._load_chunk(chunk, opts['stale_only'])
+                pending.append((len(chunk), summaries, self._submit(pool, payload, opts['workers'])))
+                if len(pending) > 1:
+                    done, recomputed = self._drain(pending.pop(0), done, recomputed, total, started)
+            while pending:
+                done, recomputed = self._drain(pending.pop(0), done, recomputed, total, started)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"완료: {done}명 중 {recomputed}명 재계산 ({elapsed:.1f}s)"
+        ))
+
+    def _load_chunk(self, client_ids, stale_only):
+        summaries = {}
+        for ss in StructuralSummary.objects.filter(client_id__in=client_ids).order_by('-pk'):
+            summaries[ss.client_id] = ss  # 중복이 있으면 pk 가 가장 작은 것
+
+        rows = {cid: [] for cid in client_ids}
+        responses = (
+            ResponseCode.objects.filter(client_id__in=client_ids)
+            .only('id', 'client_id', 'card_num', 'parsed_codes', *ROW_FIELDS).in_protocol_order()
+        )
+        for rc in responses:
+            rows[rc.client_id].append(rc)
+
+        payload = []
+        for cid, age in Client.objects.filter(id__in=client_ids).values_list('id', 'age'):
+            ss = summaries.get(cid)
+            known = None
+            if stale_only and ss is not None and ss.engine_version == ENGINE_VERSION:
+                known = ss.fingerprint
+            payload.append((cid, age, [(rc.id, rc.scoring_record()) for rc in rows[cid]], known))
+        return payload, (summaries, rows)
+
+    def _submit(self, pool, payload, workers):
+        if pool is None:
+            future = Future()
+            future.set_result(score_batch(payload))
+            return [future]
+        # 청크를 프로세스 수만큼 나눠 동시에 채점
+        size = max(1, -(-len(payload) // workers))
+        return [pool.submit(score_batch, payload[i:i + size]) for i in range(0, len(payload), size)]
+
+    def _drain(self, item, done, recomputed, total, started):
+        n, (summaries, rows), futures = item
+        results = [r for f in futures for r in f.result()]
+        if results:
+            self._write(results, summaries, rows)
+        done += n
+        recomputed += len(results)
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f"{done}/{total}명 처리, {recomputed}명 재계산 ({rate:.1f}명/s)")
+        return done, recomputed
+
+    @transaction.atomic
+    def _write(self, results, summaries, rows):
+        to_update, to_create, specials = [], [], []
+        fields = None
+        for cid, values, state, fingerprint, derived in results:
+            ss = summaries.get(cid)
+            if ss is None:
+                ss = StructuralSummary(client_id=cid)
+                to_create.append(ss)
+            else:
+                to_update.append(ss)
+            for field, value in values.items():
+                setattr(ss, field, value)
+            ss.score_state = state
+            ss.fingerprint = fingerprint
+            ss.engine_version = ENGINE_VERSION
+            fields = list(values) + ['score_state', 'fingerprint', 'engine_version']
+            for rc in rows[cid]:
+                if rc.special != derived[rc.id]:
+                    rc.set_special(derived[rc.id])
+                    specials.append(rc)
+
+        if to_update:
+            StructuralSummary.objects.bulk_update(to_update, fields)
+        if to_create:
+            StructuralSummary.objects.bulk_create(to_create)
+        if specials:
+            ResponseCode.objects.bulk_update(specials, ResponseCode.SPECIAL_UPDATE_FIELDS)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
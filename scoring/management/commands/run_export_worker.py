@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.bulk_export import EXPORT_WORKERS
+from scoring.export_jobs import (
+    MAX_RUNNING, claim_next, purge_expired, requeue, requeue_stale, run_job, touch_worker,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "내보내기 작업 대기열(ExportJob)을 처리하는 worker 입니다. 웹 서버와 별도로 실행해 둡니다. "
+        "작업을 요청 순서대로 하나씩 처리하며, 모든 worker 를 합친 동시 작업 수는 --max-running 을 넘지 않습니다. "
+        "떠 있는 worker 가 없으면 관리자/고급 내보내기는 작업을 만들지 않고 요청 안에서 바로 내보냅니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="대기 작업이 없으면 끝냄")
+        parser.add_argument('--poll', type=float, default=2.0, help="대기 작업이 없을 때 다시 확인할 간격(초)")
+        parser.add_argument('--workers', type=int, default=EXPORT_WORKERS, help="작업 하나에서 통합 문서를 만들 프로세스 수")
+        parser.add_argument('--max-running', type=int, default=MAX_RUNNING, help="모든 worker 를 합친 동시 작업 수")
+
+    def handle(self, *args, **opts):
+        if opts['workers'] < 1 or opts['max_running'] < 1 or opts['poll'] <= 0:
+            raise CommandError("--workers, --max-running 은 1 이상, --poll 은 0 보다 커야 합니다.")
+        while True:
+            touch_worker()
+            stale = requeue_stale()
+            if stale:
+                self.stdout.write(self.style.WARNING(f"멈춘 작업 {stale}개를 다시 대기시켰습니다."))
+            purge_expired()
+
+            job = claim_next(opts['max_running'])
+            if job is None:
+                if opts['once']:
+                    return
+                time.sleep(opts['poll'])
+                continue
+
+            self.stdout.write(f"작업 #{job.pk} 시작: 수검자 {job.total}명")
+            started = time.perf_counter()
+            try:
+                run_job(job, opts['workers'])
+            except KeyboardInterrupt:
+                requeue(job)
+                self.stdout.write(self.style.WARNING(f"작업 #{job.pk} 을 다시 대기시키고 멈춥니다."))
+                return
+            message = f"작업 #{job.pk} {job.get_status_display()}: {job.done}/{job.total} ({time.perf_counter() - started:.1f}초)"
+            if job.error:
+                message += f", 오류 {len(job.error.splitlines())}건"
+            self.stdout.write(self.style.SUCCESS(message) if job.status == job.DONE else self.style.ERROR(message))
@@ -0,0 +1,36 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scoring.tokenizer import LOCAL_TOKENIZER, serve
+
+
+class Command(BaseCommand):
+    help = (
+        "형태소 분석기(Okt)를 미리 띄워 둔 worker 프로세스 풀을 실행합니다. "
+        "웹 프로세스의 SCORING_TOKENIZER_ADDRESS 를 같은 주소로 설정하면 분석을 이 서비스에 맡깁니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=getattr(settings, 'SCORING_TOKENIZER_ADDRESS', None),
+                            help="'host:port' 또는 unix socket 경로 (기본: SCORING_TOKENIZER_ADDRESS 설정)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=50, help="worker 하나에 한 번에 맡길 문장 수")
+
+    def handle(self, *args, **opts):
+        if not opts['address']:
+            raise CommandError("--address 또는 SCORING_TOKENIZER_ADDRESS 설정이 필요합니다.")
+        if opts['workers'] < 1 or opts['chunk_size'] < 1:
+            raise CommandError("--workers, --chunk-size 는 1 이상이어야 합니다.")
+
+        def ready(address):
+            self.stdout.write(self.style.SUCCESS(
+                f"형태소 분석 서비스 시작: {address} (분석기 {LOCAL_TOKENIZER}, worker {opts['workers']}개)"
+            ))
+            self.stdout.flush()
+
+        try:
+            serve(opts['address'], opts['workers'], opts['chunk_size'], on_ready=ready)
+        except KeyboardInterrupt:
+            self.stdout.write("중지")
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-17 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0016_client_current_psych_dx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='structuralsummary',
+            name='engine_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='채점 엔진 버전'),
+        ),
+        migrations.AddField(
+            model_name='structuralsummary',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='반응 지문'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0017_structuralsummary_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='structuralsummary',
+            name='score_state',
+            field=models.JSONField(blank=True, default=dict, verbose_name='채점 누적값'),
+        ),
+    ]
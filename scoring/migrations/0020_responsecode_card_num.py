@@ -0,0 +1,64 @@
+# Generated by Django 4.2.10 on 2026-10-17 00:15
+
+import re
+
+from django.db import migrations, models
+
+# 이 마이그레이션을 만들 때의 scoring.engine.card_number 사본.
+# 엔진이 바뀌어도 이 마이그레이션의 결과가 바뀌지 않도록 고정해 둔다.
+
+ROMAN_TO_ARABIC = {
+    'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
+    'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10'
+}
+UNICODE_ROMAN = {
+    'Ⅰ': 'I', 'Ⅱ': 'II', 'Ⅲ': 'III', 'Ⅳ': 'IV', 'Ⅴ': 'V',
+    'Ⅵ': 'VI', 'Ⅶ': 'VII', 'Ⅷ': 'VIII', 'Ⅸ': 'IX', 'Ⅹ': 'X'
+}
+
+
+def card_number(card):
+    if card is None:
+        return None
+    s = str(card).strip()
+    for u, r in UNICODE_ROMAN.items():
+        s = s.replace(u, r)
+    su = s.upper()
+    if su not in ROMAN_TO_ARABIC:
+        su = re.sub(r'[^IVX0-9]', '', su)
+    if su in ROMAN_TO_ARABIC:
+        return int(ROMAN_TO_ARABIC[su])
+    if re.fullmatch(r'([1-9]|10)', su):
+        return int(su)
+    return None
+
+
+def fill_card_num(apps, schema_editor):
+    ResponseCode = apps.get_model('scoring', 'ResponseCode')
+    # 카드 표기 종류는 몇 가지뿐이므로 표기별로 한 번씩 UPDATE
+    for card in ResponseCode.objects.values_list('card', flat=True).distinct():
+        ResponseCode.objects.filter(card=card).update(card_num=card_number(card))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0019_responsecode_parsed_codes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='responsecode',
+            options={'ordering': ['client_id', 'card_num', 'response_num']},
+        ),
+        migrations.AddField(
+            model_name='responsecode',
+            name='card_num',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='카드(1~10)'),
+        ),
+        migrations.RunPython(fill_card_num, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='responsecode',
+            index=models.Index(fields=['client', 'card_num', 'response_num'], name='scoring_res_client__5c513e_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-17 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0020_responsecode_card_num'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenizedText',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('tokens', models.JSONField(default=list)),
+                ('used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.10 on 2026-10-17 00:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0021_tokenizedtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectionScore',
+            fields=[
+                ('response', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='projection', serialize=False, to='scoring.responsecode', verbose_name='반응')),
+                ('version', models.CharField(max_length=16, verbose_name='참조 자료 버전')),
+                ('source_hash', models.CharField(max_length=40, verbose_name='입력 해시')),
+                ('response_score', models.FloatField(verbose_name='반응 점수')),
+                ('inquiry_score', models.FloatField(verbose_name='질문 점수')),
+                ('det_score', models.FloatField(verbose_name='결정인 점수')),
+                ('cont_score', models.FloatField(verbose_name='내용인 점수')),
+                ('special_score', models.FloatField(verbose_name='특수점수 점수')),
+                ('final', models.FloatField(verbose_name='투사지수')),
+                ('t_score', models.FloatField(null=True, verbose_name='투사지수 T')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='structuralsummary',
+            name='projection_card_t',
+            field=models.JSONField(blank=True, default=dict, verbose_name='카드별 투사지수 T 평균'),
+        ),
+        migrations.AddField(
+            model_name='structuralsummary',
+            name='projection_t',
+            field=models.FloatField(blank=True, null=True, verbose_name='투사지수 T 평균'),
+        ),
+    ]
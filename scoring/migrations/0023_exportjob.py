@@ -0,0 +1,34 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('scoring', '0022_projectionscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_ids', models.JSONField(default=list, verbose_name='수검자 id 목록')),
+                ('include_info_sheet', models.BooleanField(default=False, verbose_name='정보 시트 포함')),
+                ('status', models.CharField(choices=[('queued', '대기'), ('running', '진행 중'), ('done', '완료'), ('failed', '실패')], db_index=True, default='queued', max_length=10, verbose_name='상태')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='처리한 수검자 수')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='전체 수검자 수')),
+                ('error', models.TextField(blank=True, default='', verbose_name='오류')),
+                ('file_name', models.CharField(blank=True, default='', max_length=255, verbose_name='파일 이름')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='요청 시각')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='시작 시각')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='마지막 진행 시각')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='완료 시각')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='요청자')),
+            ],
+        ),
+    ]
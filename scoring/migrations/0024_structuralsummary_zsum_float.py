@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0023_exportjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='structuralsummary',
+            name='Zsum',
+            field=models.FloatField(default=0.0, verbose_name='Zsum'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0024_structuralsummary_zsum_float'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='owner',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='처리 중인 worker 토큰'),
+        ),
+    ]
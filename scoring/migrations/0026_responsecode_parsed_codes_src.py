@@ -0,0 +1,85 @@
+# Generated by Django 4.2.10 on 2026-10-17 03:10
+
+import hashlib
+import json
+import re
+
+from django.db import migrations
+
+# 이 마이그레이션을 만들 때의 scoring.engine.parse_codes / code_mask 사본.
+# 엔진이 바뀌어도 이 마이그레이션의 결과가 바뀌지 않도록 고정해 둔다.
+
+CASE_KEPT_DETS = ['ma', 'mp', 'Ma', 'Mp', 'Ma-p']
+DETERMINANT_CODES = [
+    'Ma', 'Mp', 'Ma-p', 'fma', 'fmp', 'fma-p', 'ma', 'mp', 'ma-p',
+    'fc', 'cf', 'c', 'cn', "fc'", "c'f", "c'", 'ft', 'tf', 't',
+    'fv', 'vf', 'v', 'fy', 'yf', 'y', 'fr', 'rf', 'fd', 'f',
+]
+CONTENT_CODES = [
+    'h', '(h)', 'hd', '(hd)', 'hx', 'a', '(a)', 'ad', '(ad)', 'an', 'art', 'ay', 'bl', 'bt', 'cg', 'cl',
+    'ex', 'fd', 'fi', 'ge', 'hh', 'ls', 'na', 'sc', 'sx', 'xy', 'id',
+]
+SPECIAL_CODES = [
+    'DV', 'DV2', 'DR', 'DR2', 'INC', 'INC2', 'FAB', 'FAB2', 'ALOG', 'CON', 'PSV', 'AB',
+    'AG', 'COP', 'MOR', 'PER', 'CP', 'GHR', 'PHR',
+]
+CODE_BITS = {
+    'det': {code: 1 << i for i, code in enumerate(DETERMINANT_CODES)},
+    'cont': {code: 1 << i for i, code in enumerate(CONTENT_CODES)},
+    'sp': {code: 1 << i for i, code in enumerate(SPECIAL_CODES)},
+}
+CODE_CANON = {
+    'det': lambda token: token.lower() if token not in CASE_KEPT_DETS else token,
+    'cont': str.lower,
+    'sp': str,
+}
+
+
+def split_codes(value):
+    return re.split(r'[.,]+', (value or '').replace(' ', ''))
+
+
+def parse_codes(determinants, content, special):
+    return {
+        'det': split_codes(determinants),
+        'cont': [item for item in split_codes(content) if item],
+        'sp': ' '.join(split_codes(special)).split() if special else [],
+        'src': hashlib.sha1(json.dumps([determinants, content, special], ensure_ascii=False).encode()).hexdigest(),
+    }
+
+
+def code_mask(kind, tokens):
+    bits, canon = CODE_BITS[kind], CODE_CANON[kind]
+    mask = 0
+    for token in tokens:
+        mask |= bits.get(canon(token), 0)
+    return mask
+
+
+def refill_parsed_codes(apps, schema_editor):
+    # 분해한 문자열의 해시(src)를 함께 저장한다. save() 를 거치지 않고 바뀌어 분해가 낡은 반응도 여기서 바로잡힌다
+    ResponseCode = apps.get_model('scoring', 'ResponseCode')
+    fields = ['parsed_codes', 'det_mask', 'cont_mask', 'special_mask']
+    batch = []
+    for rc in ResponseCode.objects.only('id', 'determinants', 'content', 'special').iterator(chunk_size=2000):
+        rc.parsed_codes = parse_codes(rc.determinants, rc.content, rc.special)
+        rc.det_mask = code_mask('det', rc.parsed_codes['det'])
+        rc.cont_mask = code_mask('cont', rc.parsed_codes['cont'])
+        rc.special_mask = code_mask('sp', rc.parsed_codes['sp'])
+        batch.append(rc)
+        if len(batch) >= 2000:
+            ResponseCode.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        ResponseCode.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0025_exportjob_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(refill_parsed_codes, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,17 @@
-from django.db import models
+import hashlib
+import json
+import logging
+
+from django.db import models, transaction
 from accounts.models import User
-from django.db.models import Q
-from collections import Counter
-import re
+
+from .engine import (
+    ENGINE_VERSION, ROW_FIELDS, add_row, build_state, card_number, code_mask, codes_source, current_codes,
+    parse_codes, protocol_fingerprint, remove_row, row_digest, state_fingerprint, state_indices, summarize_state,
+)
+from .projection import (
+    PROJECTION_FIELDS, card_key, card_t_from_scores, projection_version, response_frame, score_frame,
+)
 
 
 class DataTable(models.Model):
@@ -131,9 +140,26 @@ class Client(models.Model):
         return f"{self.name} (검사일 {self.testDate})"
 
 
+class ResponseCodeQuerySet(models.QuerySet):
+    def in_protocol_order(self):
+        """카드 → 반응 번호 순 (카드 번호를 알 수 없는 반응은 맨 뒤)."""
+        return self.order_by(
+            models.F('card_num').asc(nulls_last=True), models.F('response_num').asc(nulls_first=True), 'id',
+        )
+
+    def with_code(self, kind, code):
+        """기호가 포함된 반응만 (kind: 'det' | 'cont' | 'sp'). 예: with_code('det', 'FC')"""
+        field = {'det': 'det_mask', 'cont': 'cont_mask', 'sp': 'special_mask'}[kind]
+        bit = code_mask(kind, [code])
+        if not bit:
+            return self.none()
+        return self.alias(_code_bit=models.F(field).bitand(bit)).filter(_code_bit=bit)
+
+
 class ResponseCode(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name='수검자', related_name='responses')
     card = models.CharField(max_length=5, verbose_name='카드번호', null=True)
+    card_num = models.PositiveSmallIntegerField(verbose_name='카드(1~10)', null=True, blank=True, editable=False)
     response_num = models.IntegerField(verbose_name='반응번호', null=True)
     time = models.CharField(max_length=100, verbose_name='반응시간', blank=True, null=True)
     response = models.TextField(verbose_name='반응내용', blank=True, null=True)
@@ -151,24 +177,83 @@ class ResponseCode(models.Model):
     special = models.CharField(max_length=50, verbose_name='특수점수', blank=True, null=True)
     comment = models.TextField(verbose_name='코멘트', blank=True, null=True)
 
+    # 저장 시 한 번 분해한 기호 (engine.parse_codes) 와 SQL 필터용 비트마스크
+    parsed_codes = models.JSONField(verbose_name='기호 분해', default=dict, blank=True, editable=False)
+    det_mask = models.BigIntegerField(verbose_name='결정인 비트', default=0, editable=False)
+    cont_mask = models.BigIntegerField(verbose_name='내용인 비트', default=0, editable=False)
+    special_mask = models.BigIntegerField(verbose_name='특수점수 비트', default=0, editable=False)
+
+    objects = ResponseCodeQuerySet.as_manager()
+
     class Meta:
-        ordering = ['client_id', 'card', 'response_num']
+        ordering = ['client_id', 'card_num', 'response_num']
         indexes = [
             models.Index(fields=['client', 'card']),
+            models.Index(fields=['client', 'card_num', 'response_num']),
         ]
         unique_together = [
         ]
 
+    def parse_codes(self):
+        self.parsed_codes = parse_codes(self.determinants, self.content, self.special)
+        self.det_mask = code_mask('det', self.parsed_codes['det'])
+        self.cont_mask = code_mask('cont', self.parsed_codes['cont'])
+        self.special_mask = code_mask('sp', self.parsed_codes['sp'])
+
+    def set_special(self, special):
+        """채점 엔진이 판정한 특수점수 반영 (bulk_update 시 SPECIAL_UPDATE_FIELDS 를 함께 기록)."""
+        parsed = dict(current_codes(self.parsed_codes, self.determinants, self.content, self.special))
+        self.special = special
+        parsed['sp'] = parse_codes(None, None, special)['sp']
+        parsed['src'] = codes_source(self.determinants, self.content, special)
+        self.parsed_codes = parsed
+        self.special_mask = code_mask('sp', self.parsed_codes['sp'])
+
+    SPECIAL_UPDATE_FIELDS = ['special', 'parsed_codes', 'special_mask']
+
+    def scoring_record(self):
+        record = {f: getattr(self, f) for f in ROW_FIELDS}
+        record['card_num'] = self.card_num
+        record['parsed'] = self.parsed_codes or None
+        return record
+
+    PROJECTION_SOURCE_FIELDS = ['card', 'response', 'inquiry', 'determinants', 'pair', 'content', 'special']
+
+    def projection_source(self):
+        """투사 점수 입력값의 해시 (ProjectionScore.source_hash)."""
+        values = [self.card_num] + [getattr(self, f) for f in self.PROJECTION_SOURCE_FIELDS]
+        return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.card_num = card_number(self.card)
+        self.parse_codes()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.client.name} - Card {self.card} #{self.response_num}"
 
 
+class ProjectionScore(models.Model):
+    """반응별 투사 점수 (scoring.projection.score_frame). 반응 저장 후 StructuralSummary.refresh_projection 이 채운다."""
+    response = models.OneToOneField(ResponseCode, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='projection', verbose_name='반응')
+    version = models.CharField(max_length=16, verbose_name='참조 자료 버전')
+    source_hash = models.CharField(max_length=40, verbose_name='입력 해시')
+    response_score = models.FloatField(verbose_name='반응 점수')
+    inquiry_score = models.FloatField(verbose_name='질문 점수')
+    det_score = models.FloatField(verbose_name='결정인 점수')
+    cont_score = models.FloatField(verbose_name='내용인 점수')
+    special_score = models.FloatField(verbose_name='특수점수 점수')
+    final = models.FloatField(verbose_name='투사지수')
+    t_score = models.FloatField(verbose_name='투사지수 T', null=True)
+
+
 class StructuralSummary(models.Model):
     client = models.ForeignKey('Client', on_delete=models.CASCADE, verbose_name='수검자')
 
     # 1. Location Features
     Zf = models.PositiveIntegerField(verbose_name='Zf', default=0)
-    Zsum = models.PositiveIntegerField(verbose_name='Zsum', default=0)
+    Zsum = models.FloatField(verbose_name='Zsum', default=0.0)
     Zest = models.FloatField(verbose_name='Zest', default=0.0)
     W = models.PositiveIntegerField(verbose_name='W', default=0)
     D = models.PositiveIntegerField(verbose_name='D', default=0)
@@ -363,454 +448,214 @@ class StructuralSummary(models.Model):
     OBS = models.CharField(max_length=15, verbose_name="HVI", default='xxxxxxxxx')
     OBS_posi = models.BooleanField(default=False)
 
-    def calculate_values(self):
-        age = self.client.age
-        response_codes = ResponseCode.objects.filter(client=self.client)
-        determinants_list = []
-        all_d_list = []
-        contents_list = []
-        blends = ''
-        special_list = []
-        elements_to_check = ['fy', 'yf', 'y', 'ft', 'tf', 't', 'fv', 'vf', 'v', "c'f", "fc'", "c'"]  # shd elements
-        col_shd_blends = 0
-
-        # 1. Location Features
-        zf = response_codes.filter(Q(Z='ZD') | Q(Z='ZW') | Q(Z='ZS') | Q(Z='ZA')).count()
-        self.Zf = zf
-
-        # 로마숫자 → 아라비아
-        roman_dict = {
-            'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
-            'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10'
-        }
-        for rc in response_codes:
-            rc.card = roman_dict.get(rc.card, rc.card)
-            rc.save()
-
-        # Zsum
-        z_sum_dict = {
-            '1': {'ZW': 1, 'ZA': 4, 'ZD': 6, 'ZS': 3.5},
-            '2': {'ZW': 4.5, 'ZA': 3, 'ZD': 5.5, 'ZS': 4.5},
-            '3': {'ZW': 5.5, 'ZA': 3, 'ZD': 4, 'ZS': 4.5},
-            '4': {'ZW': 2, 'ZA': 4, 'ZD': 3.5, 'ZS': 5},
-            '5': {'ZW': 1, 'ZA': 2.5, 'ZD': 5, 'ZS': 4},
-            '6': {'ZW': 2.5, 'ZA': 2.5, 'ZD': 6, 'ZS': 6.5},
-            '7': {'ZW': 2.5, 'ZA': 1, 'ZD': 3, 'ZS': 4},
-            '8': {'ZW': 4.5, 'ZA': 3, 'ZD': 3, 'ZS': 4},
-            '9': {'ZW': 5.5, 'ZA': 2.5, 'ZD': 4.5, 'ZS': 5},
-            '10': {'ZW': 5.5, 'ZA': 4, 'ZD': 4.5, 'ZS': 6}
-        }
-        self.Zsum = sum(z_sum_dict.get(rc.card, {}).get(rc.Z, 0) for rc in response_codes)
-
-        # Zest / Zd
-        if zf == 0:
-            self.Zest = 0
-        elif zf > 50:
-            self.Zest = 173
-        else:
-            z_est_dict = {
-                1: 0, 2: 2.5, 3: 6, 4: 10, 5: 13.5, 6: 17, 7: 20.5, 8: 24, 9: 27.5,
-                10: 31, 11: 34.5, 12: 38, 13: 41.5, 14: 45.5, 15: 49, 16: 51.5, 17: 56,
-                18: 59.5, 19: 63, 20: 66.5, 21: 70, 22: 73.5, 23: 77, 24: 81, 25: 84.5,
-                26: 88, 27: 91.5, 28: 95, 29: 98.5, 30: 102.5, 31: 105.5, 32: 109.5,
-                33: 112.5, 34: 116.5, 35: 120, 36: 123.5, 37: 127, 38: 130.5, 39: 134,
-                40: 137.5, 41: 141, 42: 144, 43: 148, 44: 152, 45: 155.5, 46: 159,
-                47: 162.5, 48: 166, 49: 169.5, 50: 173
-            }
-            self.Zest = z_est_dict.get(zf, 0)
-        self.Zd = self.Zsum - self.Zest if self.Zest > 0 else 0
-
-        # 위치 빈도
-        self.W = response_codes.filter(location__contains='W').count()
-        self.D = response_codes.filter(Q(location__exact='D') | Q(location__exact="DS")).count()
-        self.Dd = response_codes.filter(location__contains='Dd').count()
-        self.S = response_codes.filter(location__contains='S').count()
-
-        # 2. Dev Qual
-        dev_qual_list = [rc.dev_qual for rc in response_codes if rc.dev_qual]
-        dq = Counter(dev_qual_list)
-        self.dev_plus = dq['+']
-        self.dev_o = dq['o']
-        self.dev_vplus = dq['v/+']
-        self.dev_v = dq['v']
-
-        # 3. Form Quality
-        fq_list = [rc.form_qual for rc in response_codes if rc.form_qual]
-        fq = Counter(fq_list)
-        self.fqx_plus = fq['+']
-        self.fqx_o = fq['o']
-        self.fqx_u = fq['u']
-        self.fqx_minus = fq['-']
-        self.fqx_none = fq['no']  # ← 폼 입력값 'no'로 집계
-
-        mqual_qs = response_codes.filter(determinants__regex=r'(?<!F)M')
-        mqc = Counter([m.form_qual for m in mqual_qs if m.form_qual])
-        self.mq_plus = mqc['+']
-        self.mq_o = mqc['o']
-        self.mq_u = mqc['u']
-        self.mq_minus = mqc['-']
-        self.mq_none = mqc['no']  # ← 'no'
-
-        wd_qs = response_codes.filter(location__regex=r'\b(W|D|DS|WS)\b')
-        wdc = Counter(wd.form_qual for wd in wd_qs if wd.form_qual)
-        self.wd_plus = wdc['+']
-        self.wd_o = wdc['o']
-        self.wd_u = wdc['u']
-        self.wd_minus = wdc['-']
-        self.wd_none = wdc['no']  # ← 'no'
-
-        # 결정인/내용/특수점수 수집
-        shd_blends = 0
-        for rc in response_codes:
-            # 결정인
-            dets = re.split(r'[.,]+', (rc.determinants or '').replace(' ', ''))
-            dets_lower = [item.lower() if item not in ['ma', 'mp', 'Ma', 'Mp', 'Ma-p'] else item for item in dets]
-            all_d_list.extend(dets_lower)
-
-            # 혼합반응/섀딩 블렌드
-            if len(dets) >= 2:
-                blends += '.'.join(dets) + ','
-                if (any(e in dets_lower for e in elements_to_check) and any(e in dets_lower for e in ['c', 'cf', 'fc'])):
-                    col_shd_blends += 1
-                if len(set(elements_to_check) & set(dets_lower)) >= 2:
-                    shd_blends += 1
-            else:
-                determinants_list.extend(dets_lower)
-
-            # 쌍반응
-            if rc.pair:
-                determinants_list.append(rc.pair)
-
-            # 내용
-            conts = re.split(r'[.,]+', (rc.content or '').replace(' ', ''))
-            conts_lower = [item.lower() for item in conts if item]
-            contents_list.extend(conts_lower)
-
-            # 특수점수
-            if rc.special:
-                specials = re.split(r'[.,]+', rc.special.replace(' ', ''))
-                specials = ' '.join(specials).split()
-                specials = [v for v in specials if v not in ["GHR", "PHR"]]
-            else:
-                specials = []
-
-            # GHR/PHR 판정
-            if (any(c in conts_lower for c in ['h', '(h)', 'hd', '(hd)', 'hx'])
-                    or any(d in dets_lower for d in ['Ma', 'Mp', 'Ma-p'])
-                    or (any(d in dets_lower for d in ['fma', 'fmp', 'fma-p'])
-                        and any(s in specials for s in ['COP', 'AG']))):
-                if ("h" in conts_lower and rc.form_qual in ["+", "o", "u"]
-                        and all(s not in specials for s in ['DV2', 'DR', 'DR2', 'INC', 'INC2', 'FAB', 'FAB2', 'CON', 'ALOG', 'AG', 'MOR'])):
-                    specials.append("GHR")
-                elif rc.form_qual in ["-", "no"] or any(s in specials for s in ['DV2', 'DR2', 'INC2', 'FAB2', 'CON', 'ALOG']):
-                    specials.append("PHR")
-                elif "COP" in specials and "AG" not in specials:
-                    specials.append("GHR")
-                elif "FAB" in specials or "MOR" in specials or "an" in conts_lower:
-                    specials.append("PHR")
-                elif rc.popular == "P" and rc.card in ['3', '4', '7', '9']:
-                    specials.append("GHR")
-                elif any(s in specials for s in ['AG', 'INC', 'DR']) or "hd" in conts_lower:
-                    specials.append("PHR")
-                else:
-                    specials.append("GHR")
-
-            special_list.extend(specials)
-            rc.special = ','.join(specials)
-            rc.save()
-
-        # 4-1 blends, 4-2 단일 결정인
-        self.blends = blends
-        self.M = determinants_list.count('Ma') + determinants_list.count('Mp') + determinants_list.count('Ma-p')
-        self.FM = determinants_list.count('fma') + determinants_list.count('fmp') + determinants_list.count('fma-p')
-        self.m_l = determinants_list.count('ma') + determinants_list.count('mp') + determinants_list.count('ma-p')
-        self.FC = determinants_list.count('fc')
-        self.CF = determinants_list.count('cf')
-        self.C = determinants_list.count('c')
-        self.Cn = determinants_list.count('cn')
-        self.FCa = determinants_list.count("fc'")
-        self.CaF = determinants_list.count("c'f")
-        self.Ca = determinants_list.count("c'")
-        self.FT = determinants_list.count('ft')
-        self.TF = determinants_list.count('tf')
-        self.T = determinants_list.count('t')
-        self.FV = determinants_list.count('fv')
-        self.VF = determinants_list.count('vf')
-        self.V = determinants_list.count('v')
-        self.FY = determinants_list.count('fy')
-        self.YF = determinants_list.count('yf')
-        self.Y = determinants_list.count('y')
-        self.Fr = determinants_list.count('fr')
-        self.rF = determinants_list.count('rf')
-        self.FD = determinants_list.count('fd')
-        self.F = determinants_list.count('f')
-        self.pair = determinants_list.count('2')
-
-        # 5. contents
-        self.H = contents_list.count('h')
-        self.H_paren = contents_list.count('(h)')
-        self.Hd = contents_list.count('hd')
-        self.Hd_paren = contents_list.count('(hd)')
-        self.Hx = contents_list.count('hx')
-        self.A = contents_list.count('a')
-        self.A_paren = contents_list.count('(a)')
-        self.Ad = contents_list.count('ad')
-        self.Ad_paren = contents_list.count('(ad)')
-        self.An = contents_list.count('an')
-        self.Art = contents_list.count('art')
-        self.Ay = contents_list.count('ay')
-        self.Bl = contents_list.count('bl')
-        self.Bt = contents_list.count('bt')
-        self.Cg = contents_list.count('cg')
-        self.Cl = contents_list.count('cl')
-        self.Ex = contents_list.count('ex')
-        self.Fd_l = contents_list.count('fd')
-        self.Fi = contents_list.count('fi')
-        self.Ge = contents_list.count('ge')
-        self.Hh = contents_list.count('hh')
-        self.Ls = contents_list.count('ls')
-        self.Na = contents_list.count('na')
-        self.Sc = contents_list.count('sc')
-        self.Sx = contents_list.count('sx')
-        self.Xy = contents_list.count('xy')
-        self.Idio = contents_list.count('id')
-
-        # 6. approach
-        app_data = {str(i): [] for i in range(1, 11)}
+    # 16. Staleness
+    fingerprint = models.CharField(max_length=40, verbose_name='반응 지문', default='', blank=True)
+    engine_version = models.PositiveIntegerField(verbose_name='채점 엔진 버전', default=0)
+    score_state = models.JSONField(verbose_name='채점 누적값', default=dict, blank=True)
+    projection_t = models.FloatField(verbose_name='투사지수 T 평균', null=True, blank=True)
+    projection_card_t = models.JSONField(verbose_name='카드별 투사지수 T 평균', default=dict, blank=True)
+
+    @classmethod
+    def current_for(cls, client, response_codes=None, projection=True):
+        """
+        client 의 최신 구조요약. 반응/나이/엔진 버전이 바뀐 경우에만 재계산해 저장한다.
+        response_codes 는 이미 불러온 반응 (프로토콜 순), projection=False 면 투사 점수는 갱신하지 않는다.
+        """
+        summary = cls.objects.filter(client=client).order_by('pk').first() or cls(client=client)
+        summary.client = client
+        try:
+            summary.refresh_if_stale(response_codes)
+        except Exception:
+            # 저장된 요약이 있으면 이전 값으로라도 계속 진행 (다음 요청에서 재시도)
+            if not summary.pk:
+                raise
+            logging.exception("구조요약 재계산 실패: client_id=%s", client.pk)
+        if projection:
+            summary._refresh_projection_logged()
+        return summary
+
+    @classmethod
+    def apply_edits(cls, client, changes):
+        """
+        반응 저장 후 호출. changes 는 (반응 id, 수정 전 레코드 또는 None, 수정 후 레코드) 목록.
+        저장된 누적값에서 바뀐 반응의 기여분만 빼고 더해 요약을 갱신한다.
+        누적값을 믿을 수 없으면(엔진 버전/나이 변경, 다른 경로의 수정) 전체 재계산으로 넘어간다.
+        """
+        summary = cls.objects.filter(client=client).order_by('pk').first()
+        if (summary is None or summary.engine_version != ENGINE_VERSION or not summary.score_state
+                or summary.fingerprint != state_fingerprint(client.age, summary.score_state)):
+            return cls.current_for(client)
+        summary.client = client
+        rows = summary._fetch_response_codes()
+
+        state = summary.score_state
+        specials = {}
+        for rid, before, after in changes:
+            if before == after:
+                continue
+            if before is not None and not remove_row(state, rid, before):
+                return cls.current_for(client, rows)
+            specials[rid] = (add_row(state, rid, after), after)
+
+        # 누적값이 만들어진 반응 집합(id + 채점 필드)이 지금 DB 의 반응과 같아야 한다.
+        # 관리자/shell/다른 요청에서 바뀌거나 지워진 반응이 있으면 전체 재계산
+        expected = {rid: entry[4] for rid, entry in state['rows'].items()}
+        expected.update((str(rid), row_digest(after)) for rid, (_special, after) in specials.items())
+        if expected != {str(rc.pk): row_digest(rc.scoring_record()) for rc in rows}:
+            return cls.current_for(client, rows)
+
+        for field, value in summarize_state(client.age, state).items():
+            setattr(summary, field, value)
+        summary.fingerprint = state_fingerprint(client.age, state)
+        summary.save()
+        changed = []
+        for rid, (special, after) in specials.items():
+            if special != after.get('special'):
+                rc = ResponseCode(id=rid, determinants=after.get('determinants'), content=after.get('content'),
+                                  special=after.get('special'), parsed_codes=after.get('parsed') or {})
+                rc.set_special(special)
+                changed.append(rc)
+        if changed:
+            ResponseCode.objects.bulk_update(changed, ResponseCode.SPECIAL_UPDATE_FIELDS)
+        summary._refresh_projection_logged()
+        return summary
+
+    def refresh_projection(self, response_codes=None):
+        """
+        반응별 투사 점수 중 없거나 입력/참조 자료가 바뀐 것만 다시 계산해 저장하고,
+        카드별·전체 T 평균을 요약에 반영한다. 반환: {반응 id: ProjectionScore}
+        """
+        if response_codes is None:
+            response_codes = ResponseCode.objects.filter(client=self.client)
+        response_codes = list(response_codes)
+        version = projection_version()
+        hashes = {rc.pk: rc.projection_source() for rc in response_codes}
+        scores = {p.pk: p for p in ProjectionScore.objects.filter(pk__in=list(hashes))}
+        stale = [
+            rc for rc in response_codes
+            if rc.pk not in scores or scores[rc.pk].version != version or scores[rc.pk].source_hash != hashes[rc.pk]
+        ]
+        if stale:
+            df = score_frame(response_frame(stale))
+            fresh = [
+                ProjectionScore(response_id=rc.pk, version=version, source_hash=hashes[rc.pk],
+                                **{field: float(value) for field, value in zip(PROJECTION_FIELDS.values(), values)})
+                for rc, values in zip(stale, df[list(PROJECTION_FIELDS)].itertuples(index=False))
+            ]
+            with transaction.atomic():
+                ProjectionScore.objects.filter(pk__in=[rc.pk for rc in stale]).delete()
+                ProjectionScore.objects.bulk_create(fresh)
+            scores.update((p.pk, p) for p in fresh)
+
+        overall_t, card_t = card_t_from_scores(
+            (rc.client_id, card_key(rc.card_num, rc.card), scores[rc.pk].t_score) for rc in response_codes
+        )
+        if (overall_t, card_t) != (self.projection_t, self.projection_card_t):
+            self.projection_t, self.projection_card_t = overall_t, card_t
+            if self.pk:
+                self.save(update_fields=['projection_t', 'projection_card_t'])
+        return scores
+
+    def _refresh_projection_logged(self):
+        # 투사 점수는 고급 내보내기에서 다시 시도하므로, 실패해도 구조요약 저장은 계속한다
+        if not self.pk:
+            return
+        try:
+            self.refresh_projection()
+        except Exception:
+            logging.exception("투사 점수 계산 실패: client_id=%s", self.client_id)
+
+    def indices_by_norms(self, norms=None):
+        """저장된 누적값으로 기준값 세트별 지표 판정 (indices.NORMS / register_norms)."""
+        if self.engine_version != ENGINE_VERSION or not self.score_state:
+            self.refresh_if_stale()
+        return state_indices(self.client.age, self.score_state, norms)
+
+    def _fetch_response_codes(self):
+        return list(
+            ResponseCode.objects.filter(client=self.client)
+            .only('id', 'card_num', 'parsed_codes', *ROW_FIELDS).in_protocol_order()
+        )
+
+    def is_stale(self, response_codes=None):
+        if self.engine_version != ENGINE_VERSION or not self.fingerprint:
+            return True
+        if response_codes is None:
+            response_codes = self._fetch_response_codes()
+        records = [rc.scoring_record() for rc in response_codes]
+        return self.fingerprint != protocol_fingerprint(self.client.age, records)
+
+    def refresh_if_stale(self, response_codes=None):
+        if response_codes is None:
+            response_codes = self._fetch_response_codes()
+        if self.pk and not self.is_stale(response_codes):
+            return False
+        self.calculate_values(response_codes)
+        self.save()
+        return True
+
+    def calculate_values(self, response_codes=None):
+        if response_codes is None:
+            response_codes = self._fetch_response_codes()
+        state, specials = build_state((rc.id, rc.scoring_record()) for rc in response_codes)
+        for field, value in summarize_state(self.client.age, state).items():
+            setattr(self, field, value)
+
+        # 카드 번호는 엔진 내부에서만 아라비아 숫자로 변환하고 원본은 그대로 둔다.
+        # GHR/PHR 판정 결과는 값이 바뀐 반응만 한 번에 기록
+        changed = []
         for rc in response_codes:
-            app_data[rc.card].append(rc.location or '')
-        for arab, rom in zip([str(i) for i in range(1, 11)], ['I','II','III','IV','V','VI','VII','VIII','IX','X']):
-            setattr(self, f'app_{rom}', '.'.join(app_data[arab]))
-
-        # 7. special score 합계
-        sc = Counter(special_list)
-        self.sp_dv = sc['DV']
-        self.sp_dv2 = sc['DV2']
-        self.sp_dr = sc['DR']
-        self.sp_dr2 = sc['DR2']
-        self.sp_inc = sc['INC']
-        self.sp_inc2 = sc['INC2']
-        self.sp_fab = sc['FAB']
-        self.sp_fab2 = sc['FAB2']
-        self.sp_alog = sc['ALOG']
-        self.sp_con = sc['CON']
-        self.sp_psv = sc['PSV']
-        self.sp_ab = sc['AB']
-        self.sp_ag = sc['AG']
-        self.sp_cop = sc['COP']
-        self.sp_mor = sc['MOR']
-        self.sp_per = sc['PER']
-        self.sp_cp = sc['CP']
-        self.sp_ghr = sc['GHR']
-        self.sp_phr = sc['PHR']
-
-        self.sum6 = (self.sp_dv + self.sp_dv2 + self.sp_dr + self.sp_dr2 +
-                     self.sp_inc + self.sp_inc2 + self.sp_fab + self.sp_fab2 +
-                     self.sp_alog + self.sp_con)
-        self.wsum6 = (1 * self.sp_dv) + (2 * self.sp_dv2) + (2 * self.sp_inc) + (4 * self.sp_inc2) + \
-                     (3 * self.sp_dr) + (6 * self.sp_dr2) + (4 * self.sp_fab) + (7 * self.sp_fab2) + \
-                     (5 * self.sp_alog) + (7 * self.sp_con)
-
-        # 8. CORE
-        self.R = len(response_codes)
-        if (self.R - self.F) != 0:
-            self.L = self.F / (self.R - self.F)
-        else:
-            self.L = self.F / (self.R - self.F + 0.001)
-
-        sum_M = all_d_list.count('Ma') + all_d_list.count('Mp') + all_d_list.count('Ma-p')
-        sum_fc = all_d_list.count('fc')
-        sum_cf = all_d_list.count('cf')
-        sum_c = all_d_list.count('c')
-        wsumc = 0.5 * sum_fc + 1 * sum_cf + 1.5 * sum_c
-        self.ErleBnistypus = f"{sum_M}:{wsumc}"
-        self.EA = sum_M + wsumc
-        self.sum_FM = all_d_list.count('fma') + all_d_list.count('fmp') + all_d_list.count('fma-p')
-        self.sum_m = all_d_list.count('ma') + all_d_list.count('mp') + all_d_list.count('ma-p')
-        self.sum_Ca = all_d_list.count("c'") + all_d_list.count("fc'") + all_d_list.count("c'f")
-        self.sum_V = all_d_list.count('v') + all_d_list.count('vf') + all_d_list.count('fv')
-        self.sum_T = all_d_list.count('t') + all_d_list.count('tf') + all_d_list.count('ft')
-        self.sum_Y = all_d_list.count('y') + all_d_list.count('yf') + all_d_list.count('fy')
-        sumshading = self.sum_Ca + self.sum_T + self.sum_V + self.sum_Y
-        sumFm_m = self.sum_FM + self.sum_m
-        self.eb = f"{sumFm_m}:{sumshading}"
-        self.es = sumFm_m + sumshading
-        extra_m = (self.sum_m - 1) if self.sum_m > 1 else 0
-        extra_Y = (self.sum_Y - 1) if self.sum_Y > 1 else 0
-        self.adj_es = self.es - (extra_m + extra_Y)
-        self.D_score = int((self.EA - self.es) / 2.5000001)
-        self.adj_D = int((self.EA - self.adj_es) / 2.5000001)
-
-        if self.EA >= 4.0 and self.L < 1.0:
-            if (4.0 <= self.EA <= 10.0 and abs(sum_M - wsumc) > 2.0) or (self.EA > 10.0 and abs(sum_M - wsumc) > 2.5):
-                self.EBper = max(float(sum_M), wsumc) / min(float(sum_M), wsumc)
-            else:
-                self.EBper = 0
-        else:
-            self.EBper = 0
-
-        # 9. Affect
-        self.f_c_prop = f"{sum_fc}:{sum_cf + sum_c}"
-        self.pure_c = sum_c
-        self.ca_c_prop = f"{self.sum_Ca}:{wsumc}"
-        afr_num = response_codes.filter(Q(card='8') | Q(card='9') | Q(card='10')).count()
-        afr_den = response_codes.filter(Q(card__in=[str(i) for i in range(1, 8)])).count()
-        self.afr = afr_num / afr_den if afr_den != 0 else 1
-        blends_str = blends.rstrip(',')
-        blends_num = len(blends_str.split(',')) if blends_str else 0
-        self.blends_r = f"{blends_num}:{self.R}"
-
-        # 10. Interpersonal
-        self.GHR_PHR = f"{self.sp_ghr}:{self.sp_phr}"
-        sum_a = (all_d_list.count('ma') + all_d_list.count('Ma') + all_d_list.count('fma') +
-                 all_d_list.count('ma-p') + all_d_list.count('Ma-p') + all_d_list.count('fma-p'))
-        sum_p = (all_d_list.count('mp') + all_d_list.count('Mp') + all_d_list.count('fmp') +
-                 all_d_list.count('ma-p') + all_d_list.count('Ma-p') + all_d_list.count('fma-p'))
-        self.a_p = f"{sum_a}:{sum_p}"
-        self.human_cont = self.H + self.H_paren + self.Hd + self.Hd_paren
-        self.Isol = (self.Bt + 2 * self.Cl + self.Ge + self.Ls + 2 * self.Na) / self.R if self.R else 0
-
-        # 11. Ideation
-        sum_Ma = all_d_list.count('Ma') + all_d_list.count('Ma-p')
-        sum_Mp = all_d_list.count('Mp') + all_d_list.count('Ma-p')
-        self.Ma_Mp = f"{sum_Ma}:{sum_Mp}"
-        self.Lvl_2 = self.sp_dv2 + self.sp_dr2 + self.sp_inc2 + self.sp_fab2
-        self.intel = 2 * self.sp_ab + self.Art + self.Ay
-
-        # 12. Mediation
-        self.x_minus_per = self.fqx_minus / self.R if self.R else 0
-        self.xa_per = (self.fqx_plus + self.fqx_o + self.fqx_u) / self.R if self.R else 0
-        denom = (self.wd_plus + self.wd_o + self.wd_u + self.wd_minus + self.wd_none)
-        self.wda_per = (self.wd_plus + self.wd_o + self.wd_u) / denom if denom else 0
-        s_list = response_codes.filter(location__contains='S')
-        s_counts = Counter(s.form_qual for s in s_list if s.form_qual)
-        self.s_minus = s_counts['-']
-        self.popular = response_codes.filter(popular__contains="P").count()
-        self.x_plus_per = (self.fqx_plus + self.fqx_o) / self.R if self.R else 0
-        self.xu_per = self.fqx_u / self.R if self.R else 0
-
-        # 13. Processing
-        self.W_D_Dd = f"{self.W}:{self.D}:{self.Dd}"
-        self.W_M = f"{self.W}:{sum_M}"
-
-        # 14. Self-perception
-        r = all_d_list.count('fr') + all_d_list.count('rf')
-        self.ego = (3 * r + (self.pair or 0)) / self.R if self.R else 0
-        self.fr_rf = r
-        self.fdn = all_d_list.count('fd')
-        self.an_xy = self.An + self.Xy
-        self.h_prop = f"{self.H}:{self.H_paren + self.Hd + self.Hd_paren}"
-
-        # 15. Indexes (연령 기준 반영은 기존 로직 유지)
-        highR_wsum6_map = {(5, 7): 20, (8, 10): 19, (11, 13): 18, (14, float('inf')): 16}
-        for rng, val in highR_wsum6_map.items():
-            if rng[0] <= age <= rng[1]:
-                highR_wsum6_crt = val
-                break
-        else:
-            highR_wsum6_crt = 20
+            if rc.special != specials[rc.id]:
+                rc.set_special(specials[rc.id])
+                changed.append(rc)
+        if changed:
+            ResponseCode.objects.bulk_update(changed, ResponseCode.SPECIAL_UPDATE_FIELDS)
 
-        lowR_wsum6_map = {(5, 7): 16, (8, 10): 15, (11, 13): 14, (14, float('inf')): 12}
-        for rng, val in lowR_wsum6_map.items():
-            if rng[0] <= age <= rng[1]:
-                lowR_wsum6_crt = val
-                break
-        else:
-            lowR_wsum6_crt = 16
-
-        afr_map = {(5, 6): 0.57, (7, 9): 0.55, (10, 13): 0.53, (14, float('inf')): 0.46}
-        for rng, val in afr_map.items():
-            if rng[0] <= age <= rng[1]:
-                afr_crt = val
-                break
-        else:
-            afr_crt = 0.57
-
-        ego_map = {
-            5: (0.55, 0.83), 6: (0.52, 0.82), 7: (0.52, 0.77), 8: (0.48, 0.74),
-            9: (0.45, 0.69), 10: (0.45, 0.63), 11: (0.45, 0.58), 12: (0.38, 0.58),
-            13: (0.38, 0.56), 14: (0.37, 0.54), 15: (0.33, 0.5), 16: (0.33, 0.48)
-        }
-        if age in ego_map:
-            high_ego_crt, low_ego_crt = ego_map[age]
-        elif age >= 17:
-            high_ego_crt, low_ego_crt = 0.33, 0.44
-        else:
-            high_ego_crt, low_ego_crt = 0.55, 0.83
-
-        PTI1 = "o" if self.xa_per < 0.70 and self.wda_per < 0.75 else "x"
-        PTI2 = "o" if self.x_minus_per > 0.29 else "x"
-        PTI3 = "o" if self.Lvl_2 > 2 and self.sp_fab2 > 0 else "x"
-        PTI4 = "o" if (self.R < 17 and self.wsum6 > lowR_wsum6_crt) or (self.R > 16 and self.wsum6 > highR_wsum6_crt) else "x"
-        PTI5 = "o" if self.mq_minus > 1 or self.x_minus_per > 0.40 else "x"
-        self.PTI = PTI1 + PTI2 + PTI3 + PTI4 + PTI5
-        self.sumPTI = self.PTI.count("o")
-
-        DEPI1 = "o" if self.sum_V > 0 or self.fdn > 2 else "x"
-        DEPI2 = "o" if col_shd_blends > 0 or self.S > 2 else "x"
-        DEPI3 = "o" if (self.ego > high_ego_crt and self.fr_rf == 0) or (self.ego < low_ego_crt) else "x"
-        DEPI4 = "o" if self.afr < afr_crt or blends_num < 4 else "x"
-        DEPI5 = "o" if sumshading > sumFm_m or self.sum_Ca > 2 else "x"
-        DEPI6 = "o" if self.sp_mor > 2 or self.intel > 3 else "x"
-        DEPI7 = "o" if self.sp_cop < 2 or self.Isol > 0.24 else "x"
-        self.DEPI = DEPI1 + DEPI2 + DEPI3 + DEPI4 + DEPI5 + DEPI6 + DEPI7
-        self.sumDEPI = self.DEPI.count("o")
-
-        CDI1 = "o" if self.EA < 6 or self.adj_D < 0 else "x"
-        CDI2 = "o" if self.sp_cop < 2 and self.sp_ag < 2 else "x"
-        CDI3 = "o" if wsumc < 2.5 or self.afr < afr_crt else "x"
-        CDI4 = "o" if sum_p > sum_a + 1 or self.H < 2 else "x"
-        CDI5 = "o" if self.sum_T > 1 or self.Isol > 0.24 or self.Fd_l > 0 else "x"
-        self.CDI = CDI1 + CDI2 + CDI3 + CDI4 + CDI5
-        self.sumCDI = self.CDI.count("o")
-
-        SCON1 = "o" if self.sum_V + self.fdn > 2 else "x"
-        SCON2 = "o" if col_shd_blends > 0 else "x"
-        SCON3 = "o" if self.ego < 0.31 or self.ego > 0.44 else "x"
-        SCON4 = "o" if self.sp_mor > 3 else "x"
-        SCON5 = "o" if self.Zd > 3.5 or self.Zd < -3.5 else "x"
-        SCON6 = "o" if self.es > self.EA else "x"
-        SCON7 = "o" if sum_cf + sum_c > sum_fc else "x"
-        SCON8 = "o" if self.x_plus_per < 0.70 else "x"
-        SCON9 = "o" if self.S > 3 else "x"
-        SCON10 = "o" if self.popular < 3 or self.popular > 8 else "x"
-        SCON11 = "o" if self.H < 2 else "x"
-        SCON12 = "o" if self.R < 17 else "x"
-        self.SCON = SCON1 + SCON2 + SCON3 + SCON4 + SCON5 + SCON6 + SCON7 + SCON8 + SCON9 + SCON10 + SCON11 + SCON12
-        self.sumSCON = self.SCON.count("o")
-
-        self.HVI_premise = (self.sum_T == 0)
-        HVI2 = "o" if self.Zf > 12 else "x"
-        HVI3 = "o" if self.Zd > 3.5 else "x"
-        HVI4 = "o" if self.S > 3 else "x"
-        HVI5 = "o" if self.human_cont > 6 else "x"
-        HVI6 = "o" if self.H_paren + self.A_paren + self.Hd_paren + self.Ad_paren > 3 else "x"
-        try:
-            ratio = (self.H + self.A) / (self.Hd + self.Ad)
-            HVI7 = "o" if ratio < 4 else "x"
-        except ZeroDivisionError:
-            HVI7 = "x"
-            self.HVI_except = f"{(self.H + self.A)}:{(self.Hd + self.Ad)}"
-        HVI8 = "o" if self.Cg > 3 else "x"
-        self.HVI = HVI2 + HVI3 + HVI4 + HVI5 + HVI6 + HVI7 + HVI8
-        self.sumHVI = self.HVI.count('o')
-
-        OBS1 = "o" if self.Dd > 3 else "x"
-        OBS2 = "o" if self.Zf > 12 else "x"
-        OBS3 = "o" if self.Zd > 3.0 else "x"
-        OBS4 = "o" if self.popular > 7 else "x"
-        OBS5 = "o" if self.fqx_plus > 1 else "x"
-        OBS6 = "o" if OBS1 == OBS2 == OBS3 == OBS4 == OBS5 == "o" else "x"
-        OBS7 = "o" if sum(1 for obs in [OBS1, OBS2, OBS3, OBS4] if obs == "o") >= 2 and self.fqx_plus > 3 else "x"
-        OBS8 = "o" if (sum(1 for obs in [OBS1, OBS2, OBS3, OBS4, OBS5] if obs == "o") >= 3 and self.x_plus_per > 0.89) else "x"
-        OBS9 = "o" if self.fqx_plus > 3 and self.x_plus_per > 0.89 else "x"
-        self.OBS = OBS1 + OBS2 + OBS3 + OBS4 + OBS5 + OBS6 + OBS7 + OBS8 + OBS9
-        self.OBS_posi = "o" in self.OBS[-4:]
+        self.score_state = state
+        self.fingerprint = state_fingerprint(self.client.age, state)
+        self.engine_version = ENGINE_VERSION
 
     def save(self, *args, **kwargs):
-        if not self.pk:
+        if not self.pk and not self.fingerprint:
             self.calculate_values()
         super(StructuralSummary, self).save(*args, **kwargs)
 
     def __str__(self):
         return str(self.client)
+
+
+class TokenizedText(models.Model):
+    """반응/질문 문장의 형태소 분석 결과 캐시 (scoring.tokenizer). key = 분석기 + 정규화 문장의 sha1"""
+    key = models.CharField(max_length=40, primary_key=True)
+    tokens = models.JSONField(default=list)
+    used_at = models.DateTimeField(db_index=True)
+
+
+class ExportJob(models.Model):
+    """
+    내보내기 작업 대기열 (scoring.export_jobs). run_export_worker 명령이 요청 순서대로 처리하고,
+    요청한 쪽은 진행 상황(done / total)을 조회하다가 완료되면 결과 파일을 내려받는다.
+    """
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, '대기'),
+        (RUNNING, '진행 중'),
+        (DONE, '완료'),
+        (FAILED, '실패'),
+    )
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='요청자')
+    client_ids = models.JSONField(default=list, verbose_name='수검자 id 목록')
+    include_info_sheet = models.BooleanField(default=False, verbose_name='정보 시트 포함')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True, verbose_name='상태')
+    done = models.PositiveIntegerField(default=0, verbose_name='처리한 수검자 수')
+    total = models.PositiveIntegerField(default=0, verbose_name='전체 수검자 수')
+    error = models.TextField(blank=True, default='', verbose_name='오류')
+    file_name = models.CharField(max_length=255, blank=True, default='', verbose_name='파일 이름')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='요청 시각')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='시작 시각')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='마지막 진행 시각')
+    owner = models.CharField(max_length=32, blank=True, default='', verbose_name='처리 중인 worker 토큰')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='완료 시각')
+
+    def __str__(self):
+        return f"내보내기 #{self.pk} ({self.get_status_display()} {self.done}/{self.total})"
@@ -0,0 +1,36 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+# 작업 프로세스 풀 (bulk_export, recompute_projection)
+#
+# 웹 서버와 worker 명령은 스레드(DB 연결, 참조 자료 lock 등)나 konlpy 의 JVM 을 가진 채 돌 수 있다.
+# 이런 프로세스를 fork 하면 자식이 잠긴 lock 을 물려받아 멈출 수 있으므로, worker 는 새 인터프리터로
+# 시작(spawn)하고 initializer 에서 django.setup() 을 한 뒤 작업 모듈의 초기화 함수를 부른다.
+# 자식은 Django 앱이 준비되기 전에 이 모듈을 import 하므로, 여기서는 모델을 import 하지 않는다.
+
+START_METHOD = getattr(settings, 'SCORING_POOL_START_METHOD', 'spawn')  # 'spawn' | 'forkserver'
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    """
+    worker 수가 workers 인 ProcessPoolExecutor. initializer 는 worker 에서 django.setup() 다음에 부를
+    함수의 경로 문자열 (예: 'scoring.bulk_export._init_worker'), initargs 는 그 인자 (pickle 가능해야 한다).
+    """
+    if START_METHOD == 'fork':
+        connections.close_all()  # 자식이 부모의 DB 연결을 같이 쓰지 않도록
+    return ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context(START_METHOD),
+        initializer=_setup_worker, initargs=(initializer, initargs),
+    )
+
+
+def _setup_worker(initializer, initargs):
+    import django
+    from django.utils.module_loading import import_string
+
+    django.setup()
+    if initializer:
+        import_string(initializer)(*initargs)
@@ -0,0 +1,641 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .engine import UNICODE_ROMAN
+from .tokenizer import current_tokenizer, tokenize_texts
+
+# 투사지표 계산용 참조 자료 (resources/*.json)
+#
+# JSON 을 읽어 조회용 dict / 통계표로 바꾸는 비용이 크므로 (약 6MB) 프로세스마다 한 번만 만들고,
+# 파일의 수정 시각·크기가 바뀌었을 때만 다시 읽는다.
+# 큰 토큰 점수표 두 개는 compile_scoring_resources 로 바이너리(.npy)로 바꿔 두면 JSON 대신
+# 읽기 전용 memory-map 으로 열어, 여러 worker 프로세스가 같은 메모리 페이지를 나눠 쓴다.
+# 나머지 작은 표도 검증을 마친 DataFrame 을 JSON 으로 함께 저장한다. manifest 에는 원본 파일의 경로·수정 시각·크기와
+# sha256 을 적어 두고, 다시 불러올 때 수정 시각·크기가 같으면 원본을 읽거나 해시하지 않는다.
+# 토큰/품사/카드와 (채점영역, 기호) 는 불러올 때 정수 id 로 바꿔 두고, 점수는 [카드, id] 밀집 배열에
+# 둔다. 조회는 배열 단위로 id 를 찾아 한 번에 모은다 (TokenScoreTable / SymbolScoreTable.lookup).
+#
+# 반응별 점수는 그 반응과 참조 자료에만 달려 있으므로 (score_frame), 반응을 저장할 때 계산해
+# ProjectionScore 에 두고 내보내기에서는 읽기만 한다. projection_version() 이 바뀌면 다시 계산한다.
+
+RESOURCE_DIR = Path(getattr(settings, 'SCORING_RESOURCE_DIR',
+                            Path(__file__).resolve().parent / 'resources')).resolve()
+
+DEFAULT_RESOURCE_FILENAMES = {
+    'symbol_score':   'symbol_score_mapping.json',
+    'response_score': 'response_token_scores_mapping.json',
+    'inquiry_score':  'inquiry_token_scores_mapping.json',
+    'score_stats':    'scoring_area_card_stats.json',
+    'index_stats':    'projection_index_card_stats.json',
+}
+RESOURCE_FILENAMES = getattr(settings, 'SCORING_RESOURCE_FILENAMES', DEFAULT_RESOURCE_FILENAMES)
+
+
+def _read_json_df(path: Path, required_cols=None) -> pd.DataFrame:
+    if not path.exists():
+        raise FileNotFoundError(f"필요한 JSON 데이터 파일이 없습니다: {path}")
+
+    def _ensure_required(df: pd.DataFrame) -> pd.DataFrame:
+        if not required_cols:
+            return df
+        missing = [c for c in required_cols if c not in df.columns]
+        if missing:
+            raise ValueError(
+                f"{path.name} 에 필요한 열이 없습니다: {', '.join(missing)} "
+                f"(사용 가능한 열: {', '.join(map(str, getattr(df, 'columns', [])))} )"
+            )
+        return df
+
+    for kwargs in ({}, {'lines': True}):
+        try:
+            df_try = pd.read_json(path, dtype=False, **kwargs)
+            if isinstance(df_try, pd.DataFrame) and not df_try.empty:
+                rename = {
+                    'card':'카드','Card':'카드','card_id':'카드',
+                    'token':'토큰','Token':'토큰',
+                    'pos':'품사','POS':'품사',
+                    'score':'점수','Score':'점수'
+                }
+                df_try = df_try.rename(columns=rename)
+                return _ensure_required(df_try)
+        except Exception:
+            pass
+
+    raw = json.loads(path.read_text(encoding='utf-8'))
+
+    if isinstance(raw, dict):
+        rows = []
+
+        if all(isinstance(v, dict) and set(v.keys()) & {'mean', 'std'} for v in raw.values()):
+            for card, obj in raw.items():
+                rows.append({'카드': str(card), 'mean': obj.get('mean'), 'std': obj.get('std')})
+            return _ensure_required(pd.DataFrame(rows))
+
+        is_area_stats = any(
+            isinstance(areas, dict) and any(isinstance(v, dict) and {'mean','std'} <= set(v.keys())
+                                            for v in areas.values())
+            for areas in raw.values()
+        )
+        if is_area_stats:
+            for card, areas in raw.items():
+                if not isinstance(areas, dict):
+                    continue
+                for area_name, stat in areas.items():
+                    if isinstance(stat, dict) and {'mean','std'} <= set(stat.keys()):
+                        rows.append({'카드': str(card), '채점영역': str(area_name),
+                                     'mean': stat.get('mean'), 'std': stat.get('std')})
+            return _ensure_required(pd.DataFrame(rows))
+
+        is_symbol_scores = any(isinstance(areas, dict) and any(isinstance(v, dict) for v in areas.values())
+                               for areas in raw.values())
+        if is_symbol_scores:
+            for card, areas in raw.items():
+                if not isinstance(areas, dict):
+                    continue
+                for area_name, symbols in areas.items():
+                    if isinstance(symbols, dict):
+                        for sym, sc in symbols.items():
+                            rows.append({'카드': str(card), '채점영역': str(area_name),
+                                         '기호': str(sym), '점수': sc})
+            return _ensure_required(pd.DataFrame(rows))
+
+        for key in ('records','data','rows'):
+            if isinstance(raw.get(key), list):
+                df = pd.DataFrame(raw[key])
+                return _ensure_required(df)
+
+        raise ValueError(f"{path.name} 을(를) DataFrame으로 변환할 수 없습니다.")
+
+    if isinstance(raw, list):
+        df = pd.DataFrame(raw)
+        rename = {
+            'card':'카드','Card':'카드','card_id':'카드',
+            'token':'토큰','Token':'토큰',
+            'pos':'품사','POS':'품사',
+            'score':'점수','Score':'점수'
+        }
+        df = df.rename(columns=rename)
+        return _ensure_required(df)
+
+    raise ValueError(f"{path.name} 을(를) DataFrame으로 변환할 수 없습니다.")
+
+
+_RESOURCE_COLUMNS = {
+    'response_score': ['카드', '토큰', '품사', '점수'],
+    'inquiry_score':  ['카드', '토큰', '품사', '점수'],
+    'symbol_score':   ['카드', '채점영역', '기호', '점수'],
+    'score_stats':    ['카드', '채점영역', 'mean', 'std'],
+    'index_stats':    ['카드', 'mean', 'std'],
+}
+
+TOKEN_TABLES = ('response_score', 'inquiry_score')
+FRAME_TABLES = ('symbol_score', 'score_stats', 'index_stats')
+COMPILED_FORMAT = 3
+COMPILED_DIR = Path(getattr(settings, 'SCORING_COMPILED_RESOURCE_DIR', RESOURCE_DIR / 'compiled')).resolve()
+_MISSING_INT = -128  # int8 표에서 '점수 없음'
+
+_cache = {'signature': None, 'resources': None}
+_lock = threading.Lock()
+
+
+def resource_paths(directory=None):
+    """참조 자료 파일 경로. directory 를 주면 그 안의 파일을 쓰고, 없는 파일은 현재 자료를 쓴다."""
+    paths = {key: RESOURCE_DIR / RESOURCE_FILENAMES[key] for key in _RESOURCE_COLUMNS}
+    if directory is not None:
+        for key in paths:
+            candidate = Path(directory) / RESOURCE_FILENAMES[key]
+            if candidate.exists():
+                paths[key] = candidate
+    return paths
+
+
+def _signature(paths):
+    sig = []
+    for key, path in sorted(paths.items()):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"필요한 JSON 데이터 파일이 없습니다: {path}")
+        sig.append((key, str(path), st.st_mtime_ns, st.st_size))
+    manifest = COMPILED_DIR / 'manifest.json'
+    try:
+        st = manifest.stat()
+        sig.append(('compiled', str(manifest), st.st_mtime_ns, st.st_size))
+    except FileNotFoundError:
+        pass
+    return tuple(sig)
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_record(path):
+    """manifest 에 적는 원본 파일 기록."""
+    st = path.stat()
+    return {'file': path.name, 'path': str(path), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+            'sha256': _file_digest(path)}
+
+
+def _source_digest(path, src):
+    """원본 파일의 sha256. src (manifest 의 기록) 와 경로·수정 시각·크기가 같으면 다시 해시하지 않는다."""
+    st = path.stat()
+    if (src and src.get('path') == str(path)
+            and src.get('mtime_ns') == st.st_mtime_ns and src.get('size') == st.st_size):
+        return src['sha256']
+    return _file_digest(path)
+
+
+def _intern(values, index):
+    """값 목록 → id 배열 (index 는 pd.Index, 없는 값은 -1)."""
+    return index.get_indexer(pd.Index(values, dtype=object))
+
+
+class TokenScoreTable:
+    """
+    토큰 점수표. scores[카드, 토큰 id, 품사 id] (토큰 id = 정렬된 tokens 안의 위치).
+    compile_resources 결과를 읽기 전용 memory-map 으로 열거나, JSON 에서 메모리에 만든다.
+    토큰 id 는 tokens 를 이진 탐색해 찾으므로 memory-map 한 토큰 목록을 프로세스 메모리로 복사하지 않는다.
+    """
+
+    def __init__(self, tokens, pos, cards, scores):
+        self.tokens = tokens
+        self.pos = list(pos)
+        self.scores = scores
+        self.pos_index = pd.Index(self.pos)
+        self.card_index = pd.Index(list(cards))
+
+    def lookup(self, cards, tokens, pos, default):
+        """(카드, 토큰, 품사) 배열 → 점수 배열. 표에 없으면 default."""
+        out = np.full(len(tokens), default, dtype=float)
+        if not len(tokens):
+            return out
+        ci = _intern(cards, self.card_index)
+        ti = self._token_ids(tokens)
+        pi = _intern(pos, self.pos_index)
+        idx = np.flatnonzero((ci >= 0) & (ti >= 0) & (pi >= 0))
+        values = self.scores[ci[idx], ti[idx], pi[idx]]
+        found = values != _MISSING_INT if values.dtype == np.int8 else ~np.isnan(values)
+        out[idx[found]] = values[found]
+        return out
+
+    def _token_ids(self, values):
+        """토큰 배열 → 토큰 id 배열 (없는 토큰은 -1)."""
+        values = np.array([str(v) for v in values], dtype=str)
+        if not len(self.tokens):
+            return np.full(len(values), -1)
+        ids = np.minimum(np.searchsorted(self.tokens, values), len(self.tokens) - 1)
+        return np.where(self.tokens[ids] == values, ids, -1)
+
+    def entries(self):
+        """점수가 하나라도 있는 (토큰, 품사) 목록."""
+        present = self.scores != _MISSING_INT if self.scores.dtype == np.int8 else ~np.isnan(self.scores)
+        ti, pi = np.nonzero(present.any(axis=0))
+        return [(str(self.tokens[t]), self.pos[p]) for t, p in zip(ti.tolist(), pi.tolist())]
+
+
+class SymbolScoreTable:
+    """기호 점수표. 채점영역마다 scores[카드, 기호 id] (없으면 NaN)."""
+
+    def __init__(self, df):
+        self.card_index = pd.Index(sorted(set(df['카드']), key=lambda c: (len(c), c)))
+        self.integral = pd.api.types.is_integer_dtype(df['점수'].dtype)
+        self.areas = {}
+        for area, part in df.groupby('채점영역', sort=False):
+            symbol_index = pd.Index(list(dict.fromkeys(part['기호'])))
+            scores = np.full((len(self.card_index), len(symbol_index)), np.nan)
+            # 같은 키가 여러 번이면 마지막 값
+            scores[_intern(part['카드'], self.card_index), _intern(part['기호'], symbol_index)] = part['점수'].to_numpy(dtype=float)
+            self.areas[area] = (symbol_index, scores)
+
+    def lookup(self, cards, area, symbols, default):
+        """카드 배열과 한 채점영역의 기호 배열 → 점수 배열. 표에 없으면 default."""
+        out = np.full(len(symbols), default, dtype=float)
+        if not len(symbols) or area not in self.areas:
+            return out
+        symbol_index, scores = self.areas[area]
+        ci = _intern(cards, self.card_index)
+        si = _intern(symbols, symbol_index)
+        idx = np.flatnonzero((ci >= 0) & (si >= 0))
+        values = scores[ci[idx], si[idx]]
+        found = ~np.isnan(values)
+        out[idx[found]] = values[found]
+        return out
+
+
+def _read_token_frames(paths):
+    frames = {}
+    for key in TOKEN_TABLES:
+        df = _read_json_df(paths[key], required_cols=_RESOURCE_COLUMNS[key])
+        df['카드'] = df['카드'].astype(str)
+        df['토큰'] = df['토큰'].astype(str)
+        df['품사'] = df['품사'].astype(str)
+        frames[key] = df
+    return frames
+
+
+def _build_token_tables(frames):
+    """토큰 점수 표들 → (tokens, pos, cards, {표 이름: 점수 배열}). 정수 점수면 int8, 아니면 float64."""
+    tokens = np.array(sorted(set().union(*(set(df['토큰']) for df in frames.values()))))
+    pos = sorted(set().union(*(set(df['품사']) for df in frames.values())))
+    cards = sorted(set().union(*(set(df['카드']) for df in frames.values())), key=lambda c: (len(c), c))
+    pos_index = {p: i for i, p in enumerate(pos)}
+    card_index = {c: i for i, c in enumerate(cards)}
+
+    tables = {}
+    for key, df in frames.items():
+        values = df['점수'].astype(float).to_numpy()
+        integral = bool(np.all(np.isfinite(values) & (values == np.round(values)) & (np.abs(values) < 128)))
+        if integral:
+            scores = np.full((len(cards), len(tokens), len(pos)), _MISSING_INT, dtype=np.int8)
+        else:
+            scores = np.full((len(cards), len(tokens), len(pos)), np.nan, dtype=np.float64)
+        ci = df['카드'].map(card_index).to_numpy()
+        ti = np.searchsorted(tokens, df['토큰'].to_numpy())
+        pi = df['품사'].map(pos_index).to_numpy()
+        scores[ci, ti, pi] = values  # 같은 키가 여러 번이면 마지막 값
+        tables[key] = scores
+    return tokens, pos, cards, tables
+
+
+def _read_small_frames(paths, keys=FRAME_TABLES):
+    frames = {}
+    for key in keys:
+        df = _read_json_df(paths[key], required_cols=_RESOURCE_COLUMNS[key])
+        df['카드'] = df['카드'].astype(str)
+        frames[key] = df
+    return frames
+
+
+def _write_frame(path, df):
+    # 열 값과 dtype 을 JSON 으로 (pickle 과 달리 pandas 버전과 상관없이 읽을 수 있고 코드를 실행하지 않는다)
+    data = {
+        'columns': {col: df[col].tolist() for col in df.columns},
+        'dtypes': {col: str(df[col].dtype) for col in df.columns},
+    }
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+
+def _read_frame(path):
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return pd.DataFrame(data['columns']).astype(data['dtypes'])
+
+
+def compile_resources(out_dir=None, paths=None):
+    """
+    참조 자료 JSON → 바이너리.
+      tokens.npy            : 정렬된 토큰 문자열 (토큰 id = 위치)
+      <토큰 표 이름>.npy     : [카드, 토큰 id, 품사 id] 점수 (정수면 int8, 아니면 float64, memory-map 용)
+      <작은 표 이름>.json    : 검증을 마친 DataFrame (열 값과 dtype)
+      manifest.json         : 카드/품사 목록, 원본 파일 경로·수정 시각·크기·sha256
+    반환: manifest dict
+    """
+    out_dir = Path(out_dir or COMPILED_DIR)
+    paths = paths or resource_paths()
+    # 원본 기록은 읽기 전에 남긴다 (읽는 중에 바뀌면 불러올 때 수정 시각이 달라 다시 확인한다)
+    sources = {key: _source_record(paths[key]) for key in sorted(paths)}
+    tokens, pos, cards, scores = _build_token_tables(_read_token_frames(paths))
+    frames = _read_small_frames(paths)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tables = {}
+    for key, table in scores.items():
+        np.save(out_dir / f'{key}.npy', table)
+        tables[key] = f'{key}.npy'
+    np.save(out_dir / 'tokens.npy', tokens)
+    for key, df in frames.items():
+        _write_frame(out_dir / f'{key}.json', df)
+        tables[key] = f'{key}.json'
+
+    manifest = {
+        'format': COMPILED_FORMAT,
+        'cards': cards,
+        'pos': pos,
+        'tables': tables,
+        'sources': sources,
+    }
+    # manifest 를 마지막에 바꿔 써서, 읽는 쪽이 반쯤 쓰인 결과를 쓰지 않게 한다
+    tmp = out_dir / 'manifest.json.tmp'
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, out_dir / 'manifest.json')
+    return manifest
+
+
+def _read_manifest():
+    """컴파일 결과의 manifest. 없거나 형식이 다르면 None."""
+    try:
+        manifest = json.loads((COMPILED_DIR / 'manifest.json').read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+    if manifest.get('format') != COMPILED_FORMAT:
+        logging.warning("컴파일된 투사 자료 형식이 달라 JSON 을 사용합니다. compile_scoring_resources 를 다시 실행하세요.")
+        return None
+    return manifest
+
+
+def build_resources(paths, use_compiled=True):
+    """
+    참조 자료 → 계산에 바로 쓰는 형태. use_compiled=False 면 컴파일 결과를 보지 않고 JSON 을 읽는다.
+    컴파일 결과는 원본과 내용(sha256)이 같은 표만 쓰고, 나머지는 JSON 에서 읽는다.
+      response_score / inquiry_score : TokenScoreTable (컴파일된 경우 memory-map)
+      symbol_score                   : SymbolScoreTable
+      score_mean / score_std         : 카드 × 채점영역 표
+      index_stats                    : 카드별 mean, std 표
+    """
+    manifest = _read_manifest() if use_compiled else None
+    sources = manifest['sources'] if manifest else {}
+    digests = {key: _source_digest(paths[key], sources.get(key)) for key in sorted(paths)}
+    fresh = {key for key in paths if (sources.get(key) or {}).get('sha256') == digests[key]}
+    if manifest:
+        for key in sorted(set(paths) - fresh):
+            logging.warning(f"{paths[key].name} 이(가) 컴파일 후 바뀌어 JSON 을 사용합니다. "
+                            f"compile_scoring_resources 를 다시 실행하세요.")
+
+    if fresh.issuperset(TOKEN_TABLES):
+        tokens = np.load(COMPILED_DIR / 'tokens.npy', mmap_mode='r')
+        resources = {
+            key: TokenScoreTable(tokens, manifest['pos'], manifest['cards'],
+                                 np.load(COMPILED_DIR / manifest['tables'][key], mmap_mode='r'))
+            for key in TOKEN_TABLES
+        }
+    else:
+        tokens, pos, cards, scores = _build_token_tables(_read_token_frames(paths))
+        resources = {key: TokenScoreTable(tokens, pos, cards, table) for key, table in scores.items()}
+
+    frames = {key: _read_frame(COMPILED_DIR / manifest['tables'][key]) for key in FRAME_TABLES if key in fresh}
+    frames.update(_read_small_frames(paths, [key for key in FRAME_TABLES if key not in fresh]))
+    sc_stats = frames['score_stats']
+    resources.update({
+        'version': hashlib.sha1(''.join(digests[key] for key in sorted(paths)).encode()).hexdigest(),
+        'token_version': hashlib.sha1(''.join(digests[key] for key in TOKEN_TABLES).encode()).hexdigest(),
+        'symbol_score': SymbolScoreTable(frames['symbol_score']),
+        'score_mean': sc_stats.pivot(index='카드', columns='채점영역', values='mean'),
+        'score_std': sc_stats.pivot(index='카드', columns='채점영역', values='std'),
+        'index_stats': frames['index_stats'][['카드', 'mean', 'std']].copy(),
+    })
+    return resources
+
+
+def load_resources():
+    """프로세스 공용 참조 자료. 파일이 바뀌면 다시 만든다. 반환값은 읽기 전용으로 쓸 것."""
+    paths = resource_paths()
+    sig = _signature(paths)
+    if _cache['signature'] == sig:
+        return _cache['resources']
+    with _lock:
+        if _cache['signature'] != sig:
+            _cache['resources'] = build_resources(paths)
+            _cache['signature'] = sig
+        return _cache['resources']
+
+
+# 반응별 저장 점수: score_frame 열 → ProjectionScore 필드
+PROJECTION_FIELDS = {
+    'RESPONSE_점수': 'response_score',
+    'INQUIRY_점수': 'inquiry_score',
+    '결정인_점수': 'det_score',
+    '내용인_점수': 'cont_score',
+    '특수점수_점수': 'special_score',
+    '투사지수_final': 'final',
+    '투사지수_T': 't_score',
+}
+
+
+def projection_version(resources=None):
+    """반응별 점수가 달라지는 조건 (참조 자료 내용 + 형태소 분석기 + 기호 분해 규칙)."""
+    resources = resources or load_resources()
+    key = f"{resources['version']}\0{current_tokenizer()}\0{SYMBOL_RULES_VERSION}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def card_digests(paths):
+    """참조 자료 파일들 → {카드: 그 카드 항목 전체의 sha1}. 자료가 바뀐 카드를 찾는 데 쓴다."""
+    parts = {}
+    for key in sorted(_RESOURCE_COLUMNS):
+        cols = _RESOURCE_COLUMNS[key]
+        df = _read_json_df(paths[key], required_cols=cols)[cols].astype(str)
+        if key in TOKEN_TABLES or key == 'symbol_score':
+            df = df.drop_duplicates(cols[:-1], keep='last')  # 표를 만들 때처럼 같은 키는 마지막 값
+        for card, part in df.groupby('카드'):
+            rows = sorted(map(tuple, part.to_numpy().tolist()))
+            parts.setdefault(card, []).append(f'{key}\0{rows!r}')
+    return {card: hashlib.sha1('\n'.join(items).encode('utf-8')).hexdigest() for card, items in parts.items()}
+
+
+def changed_cards(old_paths, new_paths):
+    """두 참조 자료 사이에 항목이 하나라도 다른 카드 집합."""
+    old, new = card_digests(old_paths), card_digests(new_paths)
+    return {card for card in set(old) | set(new) if old.get(card) != new.get(card)}
+
+
+def card_key(card_num, card):
+    """반응의 카드 열 값 (숫자 문자열, 알 수 없는 카드는 정리한 원문)."""
+    if card_num:
+        return str(card_num)
+    s = '' if card is None else str(card).strip()
+    for u, r in UNICODE_ROMAN.items():
+        s = s.replace(u, r)
+    return s
+
+
+# 기호 점수용 분해 규칙. 구조요약 채점(engine.parse_codes)과 다르며, 참조 자료의 기호 점수가 이 규칙으로 만들어졌으므로
+# 바꾸면 점수가 달라진다 (바꿀 때는 SYMBOL_RULES_VERSION 을 올릴 것).
+#   결정인   : ',' '.' 로 나눔 (공백은 기호 안에 남는다. 'FC FT' 는 기호 하나)
+#   내용인   : ',' 로만 나눔 ('H.Cg' 는 기호 하나)
+#   특수점수 : ',' 공백 ';' '+' '/' 로 나눠 대문자로 (중복 제외, 'DV.AG' 는 기호 하나)
+SYMBOL_RULES_VERSION = 2
+_DET_SEP = re.compile(r'[,.]')
+_SPECIAL_SEP = re.compile(r'[,\s;+/]+')
+
+
+def symbol_tokens(rc):
+    """투사 점수용 기호 목록. 결정인에는 쌍반응(2)을 덧붙인다."""
+    det_tokens = [t.strip() for t in _DET_SEP.split(rc.determinants or '') if t.strip()]
+    val2 = (rc.pair or '').strip()
+    if val2 and val2 not in det_tokens:
+        det_tokens.append(val2)
+    specials = (t.strip().upper() for t in _SPECIAL_SEP.split((rc.special or '').strip()))
+    return {
+        '결정인': det_tokens,
+        '내용인': [t.strip() for t in (rc.content or '').split(',') if t.strip()],
+        '특수점수': list(dict.fromkeys(t for t in specials if t)),
+    }
+
+
+def _explode_lists(values):
+    """목록 열 → (행 위치 배열, 원소 목록). 빈 목록/None 원소는 건너뛴다."""
+    values = [v if isinstance(v, (list, tuple)) else () for v in values]
+    items = list(itertools.chain.from_iterable(values))
+    if None in items:
+        values = [[x for x in v if x is not None] for v in values]
+        items = list(itertools.chain.from_iterable(values))
+    counts = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    return np.repeat(np.arange(len(values), dtype=np.int64), counts), items
+
+
+def _calculate_token_score(df, token_table, token_column_name, score_column_name):
+    rows, tokens = _explode_lists(df[token_column_name])
+    words = [t[0] for t in tokens]
+    pos = [t[1] for t in tokens]
+    # 반응 안에서 같은 (토큰, 품사) 는 한 번만 센다
+    word_codes, word_uniques = pd.factorize(pd.Series(words, dtype=object))
+    pos_codes, pos_uniques = pd.factorize(pd.Series(pos, dtype=object))
+    key = (rows * (len(word_uniques) + 1) + word_codes) * (len(pos_uniques) + 1) + pos_codes
+    first = np.sort(np.unique(key, return_index=True)[1])
+    cards = df['카드'].astype(str).to_numpy()[rows[first]]
+    scores = token_table.lookup(cards, word_uniques.take(word_codes[first]), pos_uniques.take(pos_codes[first]), default=2)
+    df[score_column_name] = np.bincount(rows[first], weights=scores, minlength=len(df))
+    return df
+
+
+def token_scores(cards, token_lists, table='response_score'):
+    """카드 목록과 문장별 (토큰, 품사) 목록 → 문장별 토큰 점수 합 (score_frame 과 같은 규칙)."""
+    df = pd.DataFrame({'카드': list(cards), '토큰': list(token_lists)})
+    return _calculate_token_score(df, load_resources()[table], '토큰', '점수')['점수'].to_numpy()
+
+
+def _apply_symbol_score(df, symbol_table):
+    cards = df['카드'].astype(str).to_numpy()
+    for area in ['결정인', '내용인', '특수점수']:
+        rows, symbols = _explode_lists(df[area] if area in df.columns else [None] * len(df))
+        scores = symbol_table.lookup(cards[rows], area, symbols, default=2)
+        total = np.bincount(rows, weights=scores, minlength=len(df))
+        if symbol_table.integral:
+            total = total.astype(np.int64)
+        df[f'{area}_점수'] = total
+    return df
+
+
+def response_frame(response_codes):
+    """ResponseCode 목록 → score_frame 입력 (ID, 카드, N, 반응, 질문, 결정인/내용인/특수점수 기호 목록)."""
+    response_codes = list(response_codes)
+    df = pd.DataFrame({
+        'ID': [rc.client_id for rc in response_codes],
+        '카드': [card_key(rc.card_num, rc.card) for rc in response_codes],
+        'N': [rc.response_num for rc in response_codes],
+        '반응': [rc.response for rc in response_codes],
+        '질문': [rc.inquiry for rc in response_codes],
+    })
+    return df.join(pd.DataFrame([symbol_tokens(rc) for rc in response_codes], index=df.index))
+
+
+def score_frame(df_proc, resources=None):
+    """반응별 토큰/기호 점수, 영역별 z, 투사지수_final, 투사지수_T 를 붙인 표. 각 행은 서로 독립이다."""
+    return score_tokenized(tokenize_frame(df_proc), resources)
+
+
+def tokenize_frame(df_proc):
+    """score_frame 입력에 RESPONSE_토큰 / INQUIRY_토큰 열을 붙인 사본."""
+    df_proc = df_proc.copy()
+    # 반응과 질문을 한 번에 보내 캐시 조회와 분석 서비스 요청을 한 번으로 줄인다
+    n = len(df_proc)
+    tokens = tokenize_texts(df_proc['반응'].tolist() + df_proc['질문'].tolist())
+    df_proc['RESPONSE_토큰'] = tokens[:n]
+    df_proc['INQUIRY_토큰']  = tokens[n:]
+    return df_proc
+
+
+def score_tokenized(df_proc, resources=None):
+    """tokenize_frame 결과를 resources (기본: 현재 참조 자료) 로 채점한다."""
+    res = resources or load_resources()
+    df_sc = _calculate_token_score(df_proc.copy(), res['response_score'], 'RESPONSE_토큰', 'RESPONSE_점수')
+    df_sc = _calculate_token_score(df_sc,   res['inquiry_score'],  'INQUIRY_토큰',  'INQUIRY_점수')
+    df_sc = _apply_symbol_score(df_sc, res['symbol_score'])
+
+    mean_df = res['score_mean']
+    std_df  = res['score_std']
+    cards = df_sc['카드'].astype(str)
+    known = cards.isin(mean_df.index).to_numpy()
+    for a in ['RESPONSE_점수','INQUIRY_점수','결정인_점수','내용인_점수','특수점수_점수']:
+        colz = f'{a}_z'
+        if a in df_sc.columns and a in mean_df.columns:
+            m = mean_df[a].reindex(cards).to_numpy(dtype=float)
+            s = std_df[a].reindex(cards).to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = (df_sc[a].to_numpy(dtype=float) - m) / s
+            df_sc[colz] = np.where(known & (s != 0), z, 0.0)
+        else:
+            df_sc[colz] = 0.0
+    z_cols = ['결정인_점수_z','내용인_점수_z','특수점수_점수_z','INQUIRY_점수_z','RESPONSE_점수_z']
+    df_sc['투사지수_final'] = df_sc[z_cols].sum(axis=1)
+
+    df_sc = df_sc.merge(res['index_stats'], on='카드', how='left')
+    df_sc['std']  = df_sc['std'].replace(0, np.nan).fillna(1.0)
+    df_sc['mean'] = df_sc['mean'].fillna(0.0)
+    df_sc['투사지수_T'] = 50 + 10*(df_sc['투사지수_final'] - df_sc['mean'])/df_sc['std']
+    return df_sc.drop(columns=['mean','std'])
+
+
+def card_t_summary(df_sc):
+    """반응별 투사지수_T → (카드 평균들의 평균, {카드 번호: T 평균}). 숫자가 아닌 카드는 0."""
+    df_card_avg = (df_sc.groupby(['ID','카드'], as_index=False)
+                      .agg(투사지수_T평균=('투사지수_T','mean')))
+    df_card_avg['카드'] = pd.to_numeric(df_card_avg['카드'], errors='coerce').fillna(0).astype(int)
+    df_card_avg = df_card_avg.sort_values(['ID','카드'])
+    t_map = {int(k): float(v) for k, v in zip(df_card_avg['카드'], df_card_avg['투사지수_T평균'])}
+    overall_t = float(df_card_avg['투사지수_T평균'].mean()) if not df_card_avg.empty else float(df_sc['투사지수_T'].mean())
+    return overall_t, t_map
+
+
+def card_t_from_scores(rows):
+    """
+    저장된 반응별 T [(수검자 id, 카드, T), ...] → (전체 T 평균 또는 None, {'카드 번호': T 평균}).
+    StructuralSummary.projection_t / projection_card_t 형식.
+    """
+    df = pd.DataFrame(list(rows), columns=['ID', '카드', '투사지수_T']).astype({'투사지수_T': float})
+    overall_t, t_map = card_t_summary(df)
+    return (None if np.isnan(overall_t) else overall_t), {str(k): v for k, v in t_map.items()}
@@ -0,0 +1,109 @@
+import threading
+from copy import copy
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.merge import MergedCellRange
+
+# 엑셀 내보내기 시트의 정적 레이아웃 (skeleton)
+#
+# 라벨, 병합, 채우기/글꼴/테두리/정렬, 고정 서식과 열 너비는 수검자와 상관없이 같다. 이것을 프로세스마다
+# 한 번만 그려 두고, 내보낼 때마다 셀과 서식 번호만 새 통합 문서로 복사한 뒤 값을 채운다.
+# openpyxl 셀 서식은 통합 문서별 목록의 번호(StyleArray)이므로 복사할 때 대상 통합 문서의 번호로 바꾼다.
+# 셀 목록과 서식 목록은 openpyxl 의 공개 API 가 아니므로 requirements.txt 에서 openpyxl 버전을 고정하고,
+# scoring.tests.SheetSkeletonTests 가 복사한 시트를 새로 그린 시트와 비교한다 (openpyxl 을 올릴 때 확인).
+
+BUILTIN_FORMAT_LIMIT = 164  # 이보다 작은 numFmtId 는 엑셀 기본 서식
+
+
+class SheetSkeleton:
+    """
+    build(ws) 가 그린 시트를 틀로 삼아 create_sheet(wb) 마다 복사한다.
+    복사하는 것: 셀 값/서식, 병합, 열 너비, 행 높이, 눈금선, 틀 고정, 자동 필터.
+    """
+
+    def __init__(self, title, build):
+        self.title = title
+        self._build = build
+        self._template = None
+        self._lock = threading.Lock()
+
+    def _get_template(self):
+        if self._template is None:
+            with self._lock:
+                if self._template is None:
+                    wb = Workbook()
+                    ws = wb.active
+                    ws.title = self.title
+                    self._build(ws)
+                    self._template = _freeze(ws)
+        return self._template
+
+    def create_sheet(self, wb, title=None):
+        """wb 끝에 틀을 복사한 새 시트를 만든다."""
+        tpl = self._get_template()
+        ws = wb.create_sheet(title=title or self.title)
+        styles = [_restyle(wb, tpl['workbook'], style) for style in tpl['styles']]
+        cells = ws._cells
+        for row, column, value, data_type, style, merged in tpl['cells']:
+            style = None if style is None else copy(styles[style])
+            if merged:
+                cell = MergedCell(ws, row, column)
+                cell._style = style
+            else:
+                cell = Cell(ws, row=row, column=column, style_array=style)
+                cell._value = value
+                cell.data_type = data_type
+            cells[row, column] = cell
+        if tpl['cells']:
+            ws._current_row = max(ws._current_row, tpl['cells'][-1][0])  # ws.cell() 이 갱신하는 값 (iter_cols 가 씀)
+        for coord in tpl['merged']:
+            ws.merged_cells.add(MergedCellRange(ws, coord))
+        for key, width in tpl['widths'].items():
+            ws.column_dimensions[key].width = width
+        for key, height in tpl['heights'].items():
+            ws.row_dimensions[key].height = height
+        ws.sheet_view.showGridLines = tpl['grid_lines']
+        ws.freeze_panes = tpl['freeze_panes']
+        ws.auto_filter.ref = tpl['auto_filter']
+        return ws
+
+
+def _freeze(ws):
+    """틀 시트 → 복사에 필요한 것만 담은 dict (서식은 서로 다른 StyleArray 목록의 번호로)."""
+    styles, index, cells = [], {}, []
+    for (row, column), cell in sorted(ws._cells.items()):
+        key = tuple(cell._style) if cell.has_style else None
+        if key is not None and key not in index:
+            index[key] = len(styles)
+            styles.append(StyleArray(key))
+        merged = isinstance(cell, MergedCell)
+        cells.append((row, column, None if merged else cell._value,
+                      None if merged else cell.data_type, index.get(key), merged))
+    return {
+        'workbook': ws.parent,
+        'styles': styles,
+        'cells': cells,
+        'merged': [CellRange(str(r)).coord for r in ws.merged_cells.ranges],
+        'widths': {k: d.width for k, d in ws.column_dimensions.items() if d.width},
+        'heights': {k: d.height for k, d in ws.row_dimensions.items() if d.height},
+        'grid_lines': ws.sheet_view.showGridLines,
+        'freeze_panes': ws.freeze_panes,
+        'auto_filter': ws.auto_filter.ref,
+    }
+
+
+def _restyle(wb, src, style):
+    """src 통합 문서 기준 StyleArray → wb 의 서식 목록에 등록한 같은 서식."""
+    out = copy(style)
+    out.fontId = wb._fonts.add(src._fonts[style.fontId])
+    out.fillId = wb._fills.add(src._fills[style.fillId])
+    out.borderId = wb._borders.add(src._borders[style.borderId])
+    out.alignmentId = wb._alignments.add(src._alignments[style.alignmentId])
+    out.protectionId = wb._protections.add(src._protections[style.protectionId])
+    if style.numFmtId >= BUILTIN_FORMAT_LIMIT:
+        fmt = src._number_formats[style.numFmtId - BUILTIN_FORMAT_LIMIT]
+        out.numFmtId = wb._number_formats.add(fmt) + BUILTIN_FORMAT_LIMIT
+    return out
@@ -0,0 +1,62 @@
+import logging
+
+from .models import ResponseCode, StructuralSummary
+
+# 고급 내보내기용 프로토콜 스냅숏
+#
+# 내보내기 한 번에 필요한 자료(수검자, 반응, 구조요약, 반응별 투사 점수)를 한 번씩만 불러와 묶어 둔다.
+# 시트 작성 함수들은 queryset 대신 이것만 읽으므로, 내보내기의 DB 조회 수는 반응 수와 상관없이 일정하다
+# (반응 1번, 구조요약 1번, 투사 점수 1번 + 오래된 값이 있을 때의 갱신).
+
+
+def load_responses(client):
+    """client 의 반응 목록 (카드 → 반응 번호 순)."""
+    return list(ResponseCode.objects.filter(client=client).in_protocol_order())
+
+
+class ProtocolSnapshot:
+    """
+    client            : Client
+    responses         : 반응 tuple (카드 → 반응 번호 순)
+    summary           : 최신 StructuralSummary (빠진 카드가 있으면 None)
+    projection_scores : {반응 id: ProjectionScore} (빠진 카드가 있거나 계산에 실패하면 None)
+    """
+
+    __slots__ = ('client', 'responses', 'summary', 'projection_scores')
+
+    def __init__(self, client, responses, summary=None, projection_scores=None):
+        object.__setattr__(self, 'client', client)
+        object.__setattr__(self, 'responses', tuple(responses))
+        object.__setattr__(self, 'summary', summary)
+        object.__setattr__(self, 'projection_scores', projection_scores)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ProtocolSnapshot 은 바꿀 수 없습니다.")
+
+    @classmethod
+    def load(cls, client, responses=None):
+        """
+        반응을 한 번 불러오고 (responses 를 주면 그것을 쓴다), 10장 카드가 모두 있으면
+        구조요약/투사 점수까지 맞춰 둔다.
+        """
+        if responses is None:
+            responses = load_responses(client)
+        snapshot = cls(client, responses)
+        if snapshot.missing_cards:
+            return snapshot
+
+        summary = StructuralSummary.current_for(client, responses, projection=False)
+        try:
+            scores = summary.refresh_projection(responses)
+        except Exception:
+            # 투사지표 없이 나머지 시트는 내보낸다
+            logging.exception("투사 점수 계산 실패: client_id=%s", client.pk)
+            scores = None
+        return cls(client, responses, summary, scores)
+
+    @property
+    def missing_cards(self):
+        """1~10번 카드 중 반응이 하나도 없는 카드 번호 목록."""
+        from .views._base import missing_cards  # views 가 이 모듈을 부른다
+
+        return missing_cards(self.responses)
@@ -0,0 +1,145 @@
+import random
+from datetime import date, timedelta
+
+from .engine import CARD_ROMANS
+
+# 벤치마크/부하 시험용 가상 프로토콜 생성기
+#
+# 만들어지는 반응은 forms.ResponseCodeForm 검증을 통과한다 (W 또는 DQ + 이면 Z 있음 등).
+# 반응 수(R)와 기호 구성 비율(mix)을 조절할 수 있고, 같은 seed 면 같은 결과가 나온다.
+
+LOCATIONS = ['W', 'WS', 'D', 'DS', 'Dd', 'DdS']
+LOCATION_WEIGHTS = [30, 6, 40, 4, 15, 5]
+DEV_QUALS = ['+', 'o', 'v/+', 'v']
+DEV_QUAL_WEIGHTS = [25, 65, 4, 6]
+Z_BY_LOCATION = {'W': 'ZW', 'WS': 'ZS', 'D': 'ZA', 'DS': 'ZS', 'Dd': 'ZD', 'DdS': 'ZS'}
+
+FORM_DETS = ['Ma', 'Mp', 'Ma-p', 'FMa', 'FMp', 'ma', 'mp', 'FC', "FC'", 'FT', 'FV', 'FY', 'Fr', 'FD']
+NON_FORM_DETS = ['CF', 'C', 'Cn', "C'F", "C'", 'TF', 'T', 'VF', 'V', 'YF', 'Y', 'rF']
+CONTENTS = [
+    'H', '(H)', 'Hd', '(Hd)', 'Hx', 'A', '(A)', '(Ad)', 'Ad', 'An', 'Art', 'Ay', 'Bl',
+    'Bt', 'Cg', 'Cl', 'Ex', 'Fi', 'Fd', 'Ge', 'Hh', 'Ls', 'Na', 'Sc', 'Sx', 'Xy',
+]
+CONTENT_WEIGHTS = [
+    12, 3, 6, 2, 1, 25, 3, 2, 10, 3, 3, 1, 1,
+    4, 4, 2, 1, 2, 1, 1, 3, 2, 2, 2, 1, 1,
+]
+SPECIALS = [
+    'DV', 'DV2', 'DR', 'DR2', 'INC', 'INC2', 'FAB', 'FAB2', 'CON', 'ALOG', 'PSV',
+    'AB', 'AG', 'COP', 'MOR', 'PER', 'CP', 'GHR', 'PHR',
+]
+SPECIAL_WEIGHTS = [4, 1, 2, 1, 3, 1, 3, 1, 1, 1, 1, 2, 3, 4, 4, 2, 1, 6, 5]
+
+# 카드별 흔한 반응 낱말 (반응/질문 문장 생성용)
+CARD_WORDS = {
+    1: ['박쥐', '나비', '나방', '가면', '여자', '날개', '몸통', '더듬이'],
+    2: ['곰', '강아지', '사람', '피', '로켓', '손바닥', '춤추는'],
+    3: ['사람', '여자', '나비', '리본', '항아리', '심장', '원숭이'],
+    4: ['거인', '괴물', '가죽', '부츠', '나무', '고릴라', '발'],
+    5: ['나비', '박쥐', '새', '날개', '토끼', '다리'],
+    6: ['가죽', '고양이', '기타', '배', '토템', '털'],
+    7: ['여자', '아이', '토끼', '구름', '얼굴', '머리카락'],
+    8: ['동물', '곰', '산', '꽃', '뼈', '색깔', '올라가는'],
+    9: ['불', '연기', '마녀', '꽃', '폭발', '사슴'],
+    10: ['게', '거미', '꽃', '불꽃놀이', '바다', '해마', '애벌레'],
+}
+INQUIRY_WORDS = ['모양', '색깔', '여기', '날개', '머리', '다리', '털', '느낌', '움직이는', '퍼진', '어두운', '보여요']
+
+DEFAULT_MIX = {
+    'pure_f': 0.35,           # 결정인이 F 하나인 반응 비율
+    'blend': 0.20,            # 혼합 결정인 비율
+    'pair': 0.25,             # (2) 비율
+    'popular': 0.25,          # P 비율
+    'second_content': 0.25,   # 내용인 2개 이상 비율
+    'special': 0.30,          # 특수점수 1개 이상 비율
+    'minus': 0.15,            # 형태질 - 비율
+}
+
+
+def _sentence(rng, words, length):
+    return ' '.join(rng.choice(words) for _ in range(length)) + ' 같아요'
+
+
+def _determinants(rng, mix):
+    if rng.random() < mix['pure_f']:
+        return 'F'
+    n = 2 if rng.random() < mix['blend'] else 1
+    if rng.random() < mix['blend'] / 4:
+        n = 3
+    dets = rng.sample(FORM_DETS, n)
+    if rng.random() < 0.2:
+        dets[-1] = rng.choice(NON_FORM_DETS)
+    return '.'.join(dict.fromkeys(dets))
+
+
+def _card_counts(rng, responses):
+    """R 개 반응을 10장 카드에 나눈다 (카드마다 최소 1개)."""
+    counts = [1] * 10
+    for _ in range(max(responses, 10) - 10):
+        counts[rng.randrange(10)] += 1
+    return counts
+
+
+def generate_protocol(rng, responses=22, mix=None):
+    """ResponseCode 필드 dict 목록 (client 제외)."""
+    mix = dict(DEFAULT_MIX, **(mix or {}))
+    rows = []
+    num = 0
+    for card, count in enumerate(_card_counts(rng, responses), start=1):
+        words = CARD_WORDS[card]
+        for _ in range(count):
+            num += 1
+            location = rng.choices(LOCATIONS, LOCATION_WEIGHTS)[0]
+            dev_qual = rng.choices(DEV_QUALS, DEV_QUAL_WEIGHTS)[0]
+            needs_z = ('W' in location and dev_qual != 'v') or '+' in dev_qual
+            if rng.random() < mix['minus']:
+                form_qual = '-'
+            else:
+                form_qual = rng.choice(['+', 'o', 'o', 'o', 'u'])
+            contents = [rng.choices(CONTENTS, CONTENT_WEIGHTS)[0]]
+            if rng.random() < mix['second_content']:
+                contents.append(rng.choices(CONTENTS, CONTENT_WEIGHTS)[0])
+            specials = []
+            if rng.random() < mix['special']:
+                specials = rng.choices(SPECIALS, SPECIAL_WEIGHTS, k=rng.choice([1, 1, 2]))
+            rows.append({
+                'card': CARD_ROMANS[card - 1],
+                'response_num': num,
+                'time': str(rng.randint(2, 40)),
+                'response': _sentence(rng, words, rng.randint(2, 6)),
+                'inquiry': _sentence(rng, words + INQUIRY_WORDS, rng.randint(4, 14)),
+                'rotation': '',
+                'location': location,
+                'dev_qual': dev_qual,
+                'loc_num': rng.randint(1, 30) if location.startswith('D') else None,
+                'determinants': _determinants(rng, mix),
+                'form_qual': form_qual,
+                'pair': '2' if rng.random() < mix['pair'] else '',
+                'content': ', '.join(dict.fromkeys(contents)),
+                'popular': 'P' if rng.random() < mix['popular'] else '',
+                'Z': Z_BY_LOCATION[location] if needs_z or rng.random() < 0.1 else '',
+                'special': ', '.join(dict.fromkeys(specials)),
+                'comment': '',
+            })
+    return rows
+
+
+def generate_client_fields(rng, index=0):
+    """Client 생성용 필드 (tester 제외)."""
+    test_date = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    age = rng.choice([rng.randint(7, 17), rng.randint(18, 70), rng.randint(18, 70)])
+    return {
+        'name': f'synthetic-{index:05d}',
+        'gender': rng.choice(['M', 'F']),
+        'birthdate': date(test_date.year - age - 1, 1, 1) + timedelta(days=rng.randrange(365)),
+        'testDate': test_date,
+    }
+
+
+def generate_cohort(seed=0, clients=10, r_min=14, r_max=40, mix=None):
+    """[(client 필드, 반응 목록), ...]"""
+    rng = random.Random(seed)
+    return [
+        (generate_client_fields(rng, i), generate_protocol(rng, rng.randint(r_min, r_max), mix))
+        for i in range(clients)
+    ]
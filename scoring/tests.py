@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import math
+import os
+import random
+import shutil
+import re
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import Listener
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+from accounts.models import User
+
+from . import bulk_export, synthetic, export_cache, export_jobs, projection, token_dictionary, tokenizer
+from .cohort import score_cohort
+from .forms import ResponseCodeForm, validate_contents
+from .engine import CARD_ROMANS, protocol_order, score_protocol
+from .models import Client, ExportJob, ProjectionScore, ResponseCode, StructuralSummary, TokenizedText
+from .projection import (
+    RESOURCE_DIR, RESOURCE_FILENAMES, _apply_symbol_score, _read_json_df, load_resources, response_frame, symbol_tokens,
+)
+from .views import advanced, intermediate
+from .views.advanced import advanced_xlsx_file
+
+# 기존(엔진 도입 전) StructuralSummary.calculate_values 로 계산해 둔 프로토콜과 구조요약 값.
+# rows 는 기존 계산이 한 번 돈 뒤 저장된 반응 (카드 번호/GHR·PHR 반영), expected 는 그 반응으로 다시 계산한 값.
+# 마지막 프로토콜은 M 이 없어 기존 계산이 EBper 에서 ZeroDivisionError 를 낸 경우다.
+BASELINE = json.loads((Path(__file__).parent / 'testdata' / 'baseline_summaries.json').read_text(encoding='utf-8'))
+
+# 저장/증분 계산용 필드와 투사 점수는 구조요약 값 비교에서 뺀다
+SUMMARY_FIELDS = [
+    f.name for f in StructuralSummary._meta.concrete_fields
+    if f.name not in ('id', 'client', 'fingerprint', 'score_state', 'engine_version') and not f.name.startswith('projection')
+]
+
+
+def ordered(rows):
+    return sorted(rows, key=lambda r: protocol_order(r['card'], r['response_num']))
+
+
+class EngineBaselineTests(SimpleTestCase):
+    def assertSameValue(self, field, expected, actual):
+        if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+            self.assertTrue(math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9), f"{field}: {expected} != {actual}")
+        else:
+            self.assertEqual(expected, actual, field)
+
+    def test_score_protocol_matches_baseline(self):
+        for i, protocol in enumerate(BASELINE):
+            if protocol['expected'] == 'ZeroDivisionError':
+                continue
+            with self.subTest(protocol=i):
+                out, derived = score_protocol(protocol['age'], ordered(protocol['rows']))
+                self.assertEqual(len(derived), len(protocol['rows']))
+                for field, value in protocol['expected'].items():
+                    self.assertSameValue(field, value, out[field])
+
+    def test_ebper_zero_divisor_is_na(self):
+        protocol = BASELINE[-1]
+        self.assertEqual(protocol['expected'], 'ZeroDivisionError')
+        out, _derived = score_protocol(protocol['age'], ordered(protocol['rows']))
+        self.assertGreaterEqual(out['EA'], 4.0)
+        self.assertEqual(out['EBper'], 0)
+
+    def test_cohort_matches_engine(self):
+        protocols = [(i, p['age'], ordered(p['rows'])) for i, p in enumerate(BASELINE)]
+        protocols.append((len(protocols), None, ordered(BASELINE[0]['rows'])))  # 나이 없는 수검자는 제외
+        ids, out = score_cohort(protocols)
+        self.assertEqual(ids, list(range(len(BASELINE))))
+        for j, (_cid, age, rows) in enumerate(protocols[:-1]):
+            expected, _derived = score_protocol(age, rows)
+            self.assertEqual(set(out), set(expected))
+            for field, value in expected.items():
+                with self.subTest(protocol=j, field=field):
+                    self.assertEqual(out[field][j], value)
+
+
+class ScoringTestCase(TestCase):
+    def make_client(self, rows, age=30, name='수검자'):
+        user, _created = User.objects.get_or_create(username='tester', defaults={'group': 'advanced'})
+        client = Client.objects.create(
+            tester=user, name=name, gender='M',
+            birthdate=datetime.date(2024 - age, 1, 1), testDate=datetime.date(2024, 6, 1),
+        )
+        for row in rows:
+            ResponseCode.objects.create(client=client, **row)
+        return client
+
+
+@mock.patch.object(StructuralSummary, '_refresh_projection_logged', lambda self: None)
+class ApplyEditsTests(ScoringTestCase):
+    def setUp(self):
+        self.client_obj = self.make_client(BASELINE[1]['rows'], age=BASELINE[1]['age'])
+        StructuralSummary.current_for(self.client_obj, projection=False)
+
+    def assertMatchesRecompute(self, summary):
+        summary = StructuralSummary.objects.get(pk=summary.pk)
+        fresh = StructuralSummary(client=self.client_obj)
+        rows = list(ResponseCode.objects.filter(client=self.client_obj).in_protocol_order())
+        for rc in rows:
+            rc.parsed_codes = {}  # 저장된 분해가 아니라 지금 문자열을 새로 분해해 계산
+        fresh.calculate_values(rows)
+        for field in SUMMARY_FIELDS + ['fingerprint']:
+            self.assertEqual(getattr(summary, field), getattr(fresh, field), field)
+        self.assertFalse(summary.is_stale())
+
+    def edit(self, rc, **fields):
+        before = rc.scoring_record()
+        for field, value in fields.items():
+            setattr(rc, field, value)
+        rc.save()
+        return rc.pk, before, ResponseCode.objects.get(pk=rc.pk).scoring_record()
+
+    def apply_incrementally(self, changes):
+        # 누적값을 믿을 수 있으면 전체 재계산(calculate_values)을 하지 않는다
+        with mock.patch.object(StructuralSummary, 'calculate_values') as recompute:
+            summary = StructuralSummary.apply_edits(self.client_obj, changes)
+        recompute.assert_not_called()
+        return summary
+
+    def test_edit(self):
+        rcs = list(ResponseCode.objects.filter(client=self.client_obj).in_protocol_order())
+        changes = [
+            self.edit(rcs[0], determinants='Ma.CF', special='COP'),
+            self.edit(rcs[3], location='DdS', Z='ZS', form_qual='-'),
+        ]
+        self.assertMatchesRecompute(self.apply_incrementally(changes))
+
+    def test_add(self):
+        rc = ResponseCode.objects.create(
+            client=self.client_obj, card='X', response_num=99, location='D', dev_qual='o',
+            determinants='FC', form_qual='o', content='Bt', popular='', Z='', special='',
+        )
+        summary = self.apply_incrementally([(rc.pk, None, ResponseCode.objects.get(pk=rc.pk).scoring_record())])
+        self.assertMatchesRecompute(summary)
+
+    def test_unchanged_rows_are_skipped(self):
+        rc = ResponseCode.objects.filter(client=self.client_obj).first()
+        record = rc.scoring_record()
+        summary = self.apply_incrementally([(rc.pk, record, record)])
+        self.assertMatchesRecompute(summary)
+
+    def test_delete_outside_edit_views_falls_back_to_recompute(self):
+        ResponseCode.objects.filter(client=self.client_obj).in_protocol_order().first().delete()
+        self.assertMatchesRecompute(StructuralSummary.apply_edits(self.client_obj, []))
+
+    def test_edit_outside_edit_views_falls_back_to_recompute(self):
+        rcs = list(ResponseCode.objects.filter(client=self.client_obj).in_protocol_order())
+        # update() 는 save() 를 거치지 않아 parsed_codes 가 'F' 로 남는다
+        ResponseCode.objects.filter(pk=rcs[1].pk).update(determinants='Ma.CF.FD', special='AG')
+        changes = [self.edit(rcs[2], content='H, Cg')]
+        summary = StructuralSummary.apply_edits(self.client_obj, changes)
+        self.assertMatchesRecompute(summary)
+        self.assertIn('Ma.CF.FD', summary.blends)
+
+    def test_stale_before_record_falls_back_to_recompute(self):
+        rc = ResponseCode.objects.filter(client=self.client_obj).first()
+        _pk, before, after = self.edit(rc, popular='P')
+        before = dict(before, determinants='Ma.mp')  # 저장 당시와 다른 수정 전 레코드
+        self.assertMatchesRecompute(StructuralSummary.apply_edits(self.client_obj, [(rc.pk, before, after)]))
+
+
+class ExportCacheTests(ScoringTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (('CACHE_DIR', Path(tmp.name)), ('CACHE_MAX_BYTES', 1024 * 1024)):
+            patcher = mock.patch.object(export_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client_obj = self.make_client(BASELINE[0]['rows'])
+        self.builds = 0
+
+    def responses(self):
+        return list(ResponseCode.objects.filter(client=self.client_obj).in_protocol_order())
+
+    def build(self, complete=True):
+        self.builds += 1
+        return f"workbook {self.builds}".encode(), complete
+
+    def open(self, variant='intermediate'):
+        with export_cache.open_export(self.client_obj, self.responses(), variant, self.build) as f:
+            return f.read()
+
+    def cached_files(self):
+        return sorted(p.name for p in export_cache.CACHE_DIR.rglob('*.xlsx'))
+
+    def test_fingerprint(self):
+        responses = self.responses()
+        fingerprint = export_cache.export_fingerprint(self.client_obj, responses, 'intermediate')
+        self.assertEqual(fingerprint, export_cache.export_fingerprint(self.client_obj, self.responses(), 'intermediate'))
+        self.assertNotEqual(fingerprint, export_cache.export_fingerprint(self.client_obj, responses, 'advanced'))
+
+        responses[0].inquiry = '수정한 질문 단계'
+        self.assertNotEqual(fingerprint, export_cache.export_fingerprint(self.client_obj, responses, 'intermediate'))
+        responses = self.responses()
+        self.client_obj.name = '다른 이름'
+        self.assertNotEqual(fingerprint, export_cache.export_fingerprint(self.client_obj, responses, 'intermediate'))
+        self.client_obj.refresh_from_db()
+        with mock.patch.object(export_cache, 'ENGINE_VERSION', export_cache.ENGINE_VERSION + 1):
+            self.assertNotEqual(fingerprint, export_cache.export_fingerprint(self.client_obj, responses, 'intermediate'))
+
+    def test_hit_reuses_file(self):
+        self.assertEqual(self.open(), b"workbook 1")
+        self.assertEqual(self.open(), b"workbook 1")
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(self.open('advanced'), b"workbook 2")
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_edit_invalidates_and_replaces_file(self):
+        self.open()
+        rc = self.responses()[0]
+        rc.response = '수정한 반응'
+        rc.save()
+        self.assertEqual(self.open(), b"workbook 2")
+        self.assertEqual(self.open(), b"workbook 2")
+        self.assertEqual(len(self.cached_files()), 1)  # 같은 양식의 이전 파일은 지운다
+
+    def test_incomplete_build_is_not_cached(self):
+        with export_cache.open_export(self.client_obj, self.responses(), 'advanced', lambda: self.build(False)) as f:
+            self.assertEqual(f.read(), b"workbook 1")
+        self.assertEqual(self.cached_files(), [])
+        self.assertEqual(self.open('advanced'), b"workbook 2")
+        self.assertEqual(self.open('advanced'), b"workbook 2")
+
+    def test_advanced_export_without_projection_is_not_cached(self):
+        with mock.patch.object(StructuralSummary, 'refresh_projection', side_effect=RuntimeError("참조 자료 없음")), \
+                self.assertLogs(level='ERROR'):
+            with advanced_xlsx_file(self.client_obj, self.responses()) as f:
+                self.assertTrue(f.read().startswith(b"PK"))
+        self.assertEqual(self.cached_files(), [])
+
+    def test_intermediate_export_skips_projection(self):
+        self.client.force_login(self.client_obj.tester)
+        url = reverse('scoring:export_structural_summary_xlsx', args=[self.client_obj.pk])
+        with mock.patch.object(StructuralSummary, 'refresh_projection') as refresh:
+            response = self.client.get(url)
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"PK"))
+        refresh.assert_not_called()
+
+    def test_disabled(self):
+        with mock.patch.object(export_cache, 'CACHE_MAX_BYTES', 0):
+            self.open()
+            self.open()
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(self.cached_files(), [])
+
+    def test_evict_oldest(self):
+        for i in range(3):
+            other = self.make_client(BASELINE[0]['rows'][:3], name=f"수검자 {i}")
+            with export_cache.open_export(other, [], 'intermediate', lambda: (b"x" * 100, True)):
+                pass
+        self.assertEqual(export_cache.evict(250), 1)
+        self.assertEqual(len(self.cached_files()), 2)
+
+
+class SheetSkeletonTests(SimpleTestCase):
+    """SheetSkeleton 은 openpyxl 내부 구조(셀 목록, 서식 번호)를 직접 복사하므로 새로 그린 시트와 같아야 한다."""
+
+    SKELETONS = [
+        intermediate.UPPER_SHEET, intermediate.LOWER_SHEET, intermediate.SPECIAL_INDICES_SHEET,
+        advanced.UPPER_SHEET, advanced.LOWER_SHEET, advanced.SPECIAL_INDICES_SHEET, advanced.DEVIATION_SHEET,
+    ]
+
+    @staticmethod
+    def reload(wb):
+        bio = io.BytesIO()
+        wb.save(bio)
+        return load_workbook(io.BytesIO(bio.getvalue()))
+
+    @staticmethod
+    def dump(ws):
+        cells = {
+            cell.coordinate: (cell.value, cell.number_format, repr(cell.font), repr(cell.fill),
+                              repr(cell.border), repr(cell.alignment), repr(cell.protection))
+            for row in ws.iter_rows() for cell in row if cell.value is not None or cell.has_style
+        }
+        return {
+            'cells': cells,
+            'merged': sorted(str(r) for r in ws.merged_cells.ranges),
+            'widths': {k: d.width for k, d in ws.column_dimensions.items() if d.width},
+            'heights': {k: d.height for k, d in ws.row_dimensions.items() if d.height},
+            'grid_lines': ws.sheet_view.showGridLines,
+            'freeze_panes': ws.freeze_panes,
+            'auto_filter': ws.auto_filter.ref,
+        }
+
+    def test_copy_matches_fresh_drawing(self):
+        for skeleton in self.SKELETONS:
+            with self.subTest(sheet=skeleton.title, module=skeleton._build.__module__):
+                fresh = Workbook()
+                fresh.active.title = skeleton.title
+                skeleton._build(fresh.active)
+
+                # 대상 통합 문서에 다른 서식이 먼저 등록돼 있어도 서식 번호를 맞게 옮겨야 한다
+                copied = Workbook()
+                other = copied.active
+                other['A1'].font = Font(name='Arial', bold=True, color='FF0000')
+                other['A2'].fill = PatternFill('solid', fgColor='00FF00')
+                other['A3'].border = Border(left=Side(style='thick'))
+                other['A4'].alignment = Alignment(wrap_text=True)
+                other['A5'].number_format = '0.000%'
+                skeleton.create_sheet(copied)
+                skeleton.create_sheet(copied, title='두 번째')
+
+                expected = self.dump(self.reload(fresh)[skeleton.title])
+                reloaded = self.reload(copied)
+                self.assertEqual(self.dump(reloaded[skeleton.title]), expected)
+                self.assertEqual(self.dump(reloaded['두 번째']), expected)
+
+
+# 투사 점수 기존 구현 (views/advanced.py compute_projection_metrics, 벡터화 전). 형태소 분석 결과는 받은 값을 쓴다.
+def _old_normalize_special_tokens(s):
+    if not s:
+        return s
+    toks = re.split(r"[,\s;+/]+", str(s).strip())
+    toks = [t.strip().upper() for t in toks if t and t.strip()]
+    return ", ".join(dict.fromkeys(toks))
+
+
+def _old_apply_pair_into_determinants(row):
+    det = str(row.get('결정인') or '').strip()
+    val2 = row.get('(2)')
+    val2 = (str(int(val2)).strip() if (val2 not in (None, '', ' ') and not pd.isna(val2)) else '')
+    det_tokens = [x.strip() for x in re.split(r'[,.]', det) if x.strip()]
+    if val2 and val2 not in det_tokens:
+        det_tokens.append(val2)
+    row['결정인'] = ', '.join(det_tokens) if det_tokens else np.nan
+    return row
+
+
+def _old_calculate_token_score(df, token_freq_df, token_column_name, score_column_name):
+    tf = token_freq_df.copy()
+    tf['토큰_튜플'] = list(zip(tf['토큰'], tf['품사']))
+    token_score_map = tf.set_index(['카드', '토큰_튜플'])['점수'].to_dict()
+
+    def compute_row(row):
+        card = str(row['카드'])
+        tokens = row.get(token_column_name) or []
+        uniq = set(tokens)
+        total = 0
+        for tok in uniq:
+            total += token_score_map.get((card, tok), 2)
+        return total
+
+    df[score_column_name] = df.apply(compute_row, axis=1)
+    return df
+
+
+def _old_apply_symbol_score(df, score_table_df):
+    areas = ['결정인', '내용인', '특수점수']
+    score_dict = {col: [] for col in areas}
+    lookup = score_table_df.set_index(['카드', '채점영역', '기호'])['점수'].to_dict()
+
+    for _, row in df.iterrows():
+        card = str(row['카드'])
+        for area in areas:
+            score = 0
+            cell = row.get(area)
+            if pd.isna(cell) or cell in (None, ''):
+                score_dict[area].append(0)
+                continue
+            symbols = [s.strip() for s in str(cell).split(',') if s.strip()]
+            for sym in symbols:
+                score += lookup.get((card, area, sym), 2)
+            score_dict[area].append(score)
+
+    for area in areas:
+        df[f'{area}_점수'] = score_dict[area]
+    return df
+
+
+def _old_resource(key):
+    df = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES[key], required_cols=projection._RESOURCE_COLUMNS[key])
+    df['카드'] = df['카드'].astype(str)
+    return df
+
+
+def _old_projection_frame(response_codes):
+    df_raw = pd.DataFrame([{
+        'ID': rc.client_id, '카드': str(rc.card_num), 'N': rc.response_num,
+        '결정인': rc.determinants, '(2)': rc.pair, '내용인': rc.content,
+        '특수점수': _old_normalize_special_tokens(rc.special or ''),
+    } for rc in response_codes])
+    return df_raw.apply(_old_apply_pair_into_determinants, axis=1).drop(columns=['(2)'])
+
+
+def _old_projection_scores(response_codes, response_tokens, inquiry_tokens):
+    df_proc = _old_projection_frame(response_codes)
+    df_proc['RESPONSE_토큰'] = [list(set(t)) for t in response_tokens]
+    df_proc['INQUIRY_토큰'] = [list(set(t)) for t in inquiry_tokens]
+    sc_stats, idx_stats = _old_resource('score_stats'), _old_resource('index_stats')
+
+    df_sc = _old_calculate_token_score(df_proc.copy(), _old_resource('response_score'), 'RESPONSE_토큰', 'RESPONSE_점수')
+    df_sc = _old_calculate_token_score(df_sc, _old_resource('inquiry_score'), 'INQUIRY_토큰', 'INQUIRY_점수')
+    df_sc = _old_apply_symbol_score(df_sc, _old_resource('symbol_score'))
+
+    mean_df = sc_stats.pivot(index='카드', columns='채점영역', values='mean')
+    std_df = sc_stats.pivot(index='카드', columns='채점영역', values='std')
+    for a in ['RESPONSE_점수', 'INQUIRY_점수', '결정인_점수', '내용인_점수', '특수점수_점수']:
+        colz = f'{a}_z'
+        if a in df_sc.columns and a in mean_df.columns:
+            def _z(r, aa=a):
+                c = str(r['카드'])
+                try:
+                    m = float(mean_df.loc[c, aa]); s = float(std_df.loc[c, aa])
+                    return (r[aa] - m) / s if s else 0.0
+                except Exception:
+                    return 0.0
+            df_sc[colz] = df_sc.apply(_z, axis=1)
+        else:
+            df_sc[colz] = 0.0
+    z_cols = ['결정인_점수_z', '내용인_점수_z', '특수점수_점수_z', 'INQUIRY_점수_z', 'RESPONSE_점수_z']
+    df_sc['투사지수_final'] = df_sc[z_cols].sum(axis=1)
+
+    df_sc = df_sc.merge(idx_stats, on='카드', how='left')
+    df_sc['std'] = df_sc['std'].replace(0, np.nan).fillna(1.0)
+    df_sc['mean'] = df_sc['mean'].fillna(0.0)
+    df_sc['투사지수_T'] = 50 + 10 * (df_sc['투사지수_final'] - df_sc['mean']) / df_sc['std']
+    return df_sc.drop(columns=['mean', 'std'])
+
+
+# 기호 구분자가 섞인 반응 ('.', 공백, ';', '+', '/'). (결정인, 쌍반응, 내용인, 특수점수)
+MIXED_CODES = [
+    ('Ma.CF', '2', 'H.Cg', 'DV AG'),
+    ('FC FT', '', 'H, Cg', 'DV;AG'),
+    ('CF/FY, Fr', None, 'A,Bt', 'DV.AG'),
+    ('F', '2', '(H), Hd ,Cg', 'dv+inc2/COP,  MOR'),
+    ("FMa.C'F", ' ', 'Ad', 'GHR'),
+    ('Mp', None, 'A.Bt.Cl', 'PHR; CP'),
+    ('FC FT', '2', 'Hd.An', 'MOR.COP.FAB'),
+    (None, None, None, None),
+    ('', '', '', ''),
+]
+
+
+def _mixed_responses(n=len(MIXED_CODES)):
+    return [
+        ResponseCode(id=i, client_id=1 + i // 12, card=str(i % 10 + 1), card_num=i % 10 + 1, response_num=i,
+                     determinants=det, pair=pair, content=content, special=special)
+        for i, (det, pair, content, special) in enumerate(MIXED_CODES[i % len(MIXED_CODES)] for i in range(n))
+    ]
+
+
+class ProjectionSymbolTests(SimpleTestCase):
+    """투사 점수의 기호 분해는 구조요약 채점과 달리 기존 규칙을 그대로 따른다."""
+
+    def test_symbols_match_original_split(self):
+        rcs = _mixed_responses(2 * len(MIXED_CODES))
+        old = _old_projection_frame(rcs)
+        for rc, (_i, row) in zip(rcs, old.iterrows()):
+            expected = {area: [t.strip() for t in str(row[area]).split(',') if t.strip()] if not pd.isna(row[area]) else []
+                        for area in ('결정인', '내용인', '특수점수')}
+            self.assertEqual(symbol_tokens(rc), expected, (rc.determinants, rc.content, rc.special))
+
+    def test_symbol_scores_match_original(self):
+        rcs = _mixed_responses(2 * len(MIXED_CODES))
+        df = _apply_symbol_score(response_frame(rcs), load_resources()['symbol_score'])
+        expected = _old_apply_symbol_score(_old_projection_frame(rcs), _old_resource('symbol_score'))
+        for area in ('결정인', '내용인', '특수점수'):
+            pd.testing.assert_series_equal(df[f'{area}_점수'], expected[f'{area}_점수'])
+
+
+class ProjectionScoreTests(SimpleTestCase):
+    """벡터화한 투사 점수 계산(score_tokenized)은 기존 행 단위 구현과 값과 dtype 이 같아야 한다."""
+
+    COLUMNS = [
+        'RESPONSE_점수', 'INQUIRY_점수', '결정인_점수', '내용인_점수', '특수점수_점수',
+        'RESPONSE_점수_z', 'INQUIRY_점수_z', '결정인_점수_z', '내용인_점수_z', '특수점수_점수_z',
+        '투사지수_final', '투사지수_T',
+    ]
+
+    def token_lists(self, resources, n, seed):
+        rng = random.Random(seed)
+        vocab = resources['response_score'].entries()[:300] + resources['inquiry_score'].entries()[:300]
+        extra = [('없는토큰', 'Noun'), (vocab[0][0], 'Adverb'), ('', 'Noun')]
+        return [rng.sample(vocab, rng.randint(0, 8)) + rng.sample(extra, rng.randint(0, 2)) for _ in range(n)]
+
+    def test_matches_row_wise_implementation(self):
+        paths = projection.resource_paths()
+        for compiled in (True, False):
+            resources = projection.build_resources(paths, use_compiled=compiled)
+            rcs = _mixed_responses(40)
+            response_tokens = self.token_lists(resources, len(rcs), 1)
+            inquiry_tokens = self.token_lists(resources, len(rcs), 2)
+            df = response_frame(rcs)
+            df['RESPONSE_토큰'] = response_tokens
+            df['INQUIRY_토큰'] = inquiry_tokens
+            out = projection.score_tokenized(df, resources)
+            expected = _old_projection_scores(rcs, response_tokens, inquiry_tokens)
+            for column in self.COLUMNS:
+                with self.subTest(compiled=compiled, column=column):
+                    pd.testing.assert_series_equal(out[column], expected[column], check_exact=True)
+            self.assertEqual(projection.card_t_summary(out), projection.card_t_summary(expected))
+
+
+class ColorShadingBlendTests(SimpleTestCase):
+    def test_separators(self):
+        codes = ['FC FT', 'CF/FY', "C;C'F", 'fc+t', 'Ma.CF.FD', 'FC.CF', 'FT', None]
+        rcs = [ResponseCode(determinants=det) for det in codes]
+        self.assertEqual(advanced._count_col_shd_blends(rcs), 4)
+
+
+class CompiledResourceTests(SimpleTestCase):
+    def test_compiled_matches_json(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        paths = projection.resource_paths()
+        with mock.patch.object(projection, 'COMPILED_DIR', Path(tmp.name)):
+            projection.compile_resources(tmp.name, paths)
+            with mock.patch.object(projection, '_read_json_df', side_effect=AssertionError("JSON 을 읽었습니다")):
+                compiled = projection.build_resources(paths)
+        expected = projection.build_resources(paths, use_compiled=False)
+
+        self.assertIsInstance(compiled['response_score'].tokens, np.memmap)
+        self.assertEqual((compiled['version'], compiled['token_version']), (expected['version'], expected['token_version']))
+        for key in ('score_mean', 'score_std', 'index_stats'):
+            pd.testing.assert_frame_equal(compiled[key], expected[key])
+        self.assertEqual(compiled['symbol_score'].integral, expected['symbol_score'].integral)
+
+        vocab = [token for token, _pos in expected['inquiry_score'].entries()[:50]]
+        tokens = vocab + [t[:-1] for t in vocab] + ['없는토큰', '', vocab[-1] + '가']
+        cards = [str(i % 10 + 1) for i in range(len(tokens))]
+        for key in projection.TOKEN_TABLES:
+            for pos in ('Noun', 'Verb'):
+                np.testing.assert_array_equal(
+                    compiled[key].lookup(cards, tokens, [pos] * len(tokens), default=2),
+                    expected[key].lookup(cards, tokens, [pos] * len(tokens), default=2),
+                )
+
+
+class TokenizedTextCacheTests(TestCase):
+    def test_hit_skips_analysis(self):
+        first = tokenizer.tokenize_texts(['하얀 나비가 날아가요', '하얀 나비가, 날아가요!'])
+        self.assertEqual(first[0], first[1])
+        self.assertEqual(TokenizedText.objects.count(), 1)
+        with mock.patch.object(tokenizer, '_analyze', side_effect=AssertionError("다시 분석했습니다")):
+            self.assertEqual(tokenizer.tokenize_texts(['하얀 나비가 날아가요']), first[:1])
+
+    def test_tokenizer_change_misses(self):
+        tokenizer.tokenize_texts(['하얀 나비가 날아가요'])
+        with mock.patch.object(tokenizer, 'local_tokenizer', return_value='whitespace-다른설정'), \
+                mock.patch.object(tokenizer, '_analyze', wraps=tokenizer._analyze) as analyze:
+            tokenizer.tokenize_texts(['하얀 나비가 날아가요'])
+        analyze.assert_called_once_with('하얀 나비가 날아가요')
+        self.assertEqual(TokenizedText.objects.count(), 2)
+
+    def test_evict_oldest(self):
+        now = datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc)
+        TokenizedText.objects.bulk_create([
+            TokenizedText(key=f'{i:040d}', tokens=[], used_at=now + datetime.timedelta(minutes=i)) for i in range(12)
+        ])
+        self.assertEqual(tokenizer.evict(20), 0)
+        self.assertEqual(tokenizer.evict(10), 3)
+        self.assertEqual(sorted(TokenizedText.objects.values_list('key', flat=True)), [f'{i:040d}' for i in range(3, 12)])
+
+
+class TokenizerServiceTests(SimpleTestCase):
+    TEXTS = ['하얀 나비가 날아가요', '무서운 박쥐 같아요', '']
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.address = str(Path(tmp.name) / 'tokenizer.sock')
+        for patcher in (mock.patch.object(tokenizer, 'SERVICE_ADDRESS', self.address),
+                        mock.patch.dict(tokenizer._service, {'tokenizer': None})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def serve(self, connections):
+        """connections 개의 요청만 받는 서비스를 띄운다. 반환: 분석에 쓴 worker 풀 (map 호출 기록용)"""
+        listener = Listener(self.address, authkey=tokenizer._authkey())
+        executor = ThreadPoolExecutor(2)
+        pool = mock.Mock(wraps=executor)
+
+        def run():
+            with listener:
+                for _ in range(connections):
+                    tokenizer._serve_connection(listener.accept(), pool, 2)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(thread.join, 5)
+        return pool
+
+    def test_round_trip(self):
+        pool = self.serve(2)
+        out = tokenizer.tokenize_texts(self.TEXTS, use_cache=False)
+        self.assertEqual(tokenizer._service['tokenizer'], tokenizer.local_tokenizer())
+        self.assertEqual(pool.map.call_count, 1)
+        self.assertEqual(out, tokenizer.tokenize_with(tokenizer.LOCAL_TOKENIZER, self.TEXTS))
+
+    def test_unreachable_service_falls_back_to_local(self):
+        with self.assertLogs(level='WARNING') as logs, \
+                mock.patch.object(tokenizer, '_analyze', wraps=tokenizer._analyze) as analyze:
+            out = tokenizer.tokenize_texts(self.TEXTS, use_cache=False)
+        self.assertIn('연결할 수 없어', logs.output[0])
+        self.assertIsNone(tokenizer._service['tokenizer'])
+        self.assertEqual(analyze.call_count, len(self.TEXTS))
+        self.assertEqual(out, tokenizer.tokenize_with(tokenizer.LOCAL_TOKENIZER, self.TEXTS))
+
+    def test_lost_service_with_other_tokenizer_stops(self):
+        # 서비스가 다른 분석기(okt)였으면 현재 프로세스에서 분석해 같은 키로 저장하면 안 된다
+        tokenizer._service['tokenizer'] = 'okt'
+        with self.assertLogs(level='WARNING'), \
+                mock.patch.object(tokenizer, '_analyze', side_effect=AssertionError("현재 프로세스에서 분석했습니다")):
+            with self.assertRaisesMessage(RuntimeError, '형태소 분석 서비스(okt)'):
+                tokenizer.tokenize_texts(self.TEXTS, use_cache=False)
+
+
+class DictionaryTokenizerTests(SimpleTestCase):
+    ENTRIES = [('나비', 'Noun'), ('날개', 'Noun'), ('무섭다', 'Adjective'), ('날다', 'Verb'), ('춤추다', 'Verb'),
+               ('하얗다', 'Adjective'), ('걷다', 'Verb'), ('사람', 'Noun')]
+
+    def test_analyze(self):
+        trie = token_dictionary.build_trie(self.ENTRIES, {'것'})
+        cases = {
+            '무서운 사람들이에요': [('무섭다', 'Adjective'), ('사람', 'Noun')],
+            '하얀 나비': [('하얗다', 'Adjective'), ('나비', 'Noun')],
+            '춤추는 사람': [('춤추다', 'Verb'), ('사람', 'Noun')],
+            '걸어가는 박쥐': [('걷다', 'Verb'), ('박쥐', 'Noun')],
+            '날아가는 나비처럼 보여요': [('날다', 'Verb'), ('나비', 'Noun')],
+            '사람이 걸어요': [('사람', 'Noun'), ('걷다', 'Verb')],
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(token_dictionary.analyze(trie, text), expected)
+
+    def test_tokenize_with_token_score_tables(self):
+        out = tokenizer.tokenize_with('dictionary', ['하얀 나비가 날아가는 것 같아요!', '무서운 박쥐', None])
+        self.assertEqual(out, [
+            [('하얗다', 'Adjective'), ('나비', 'Noun'), ('날아가다', 'Verb')],
+            [('무섭다', 'Adjective'), ('박쥐', 'Noun')],
+            [],
+        ])
+
+    def test_tokenizer_name_follows_token_tables(self):
+        with mock.patch.object(tokenizer, 'LOCAL_TOKENIZER', 'dictionary'):
+            name = tokenizer.local_tokenizer()
+        self.assertEqual(name, f"dictionary-{load_resources()['token_version'][:12]}")
+
+
+class ScoreTableLookupTests(SimpleTestCase):
+    def token_tables(self, **frames):
+        tokens, pos, cards, tables = projection._build_token_tables({
+            key: pd.DataFrame(rows, columns=['카드', '토큰', '품사', '점수']) for key, rows in frames.items()
+        })
+        return {key: projection.TokenScoreTable(tokens, pos, cards, scores) for key, scores in tables.items()}
+
+    def test_token_lookup(self):
+        tables = self.token_tables(
+            ints=[('1', '나비', 'Noun', 3), ('1', '나비', 'Noun', -2), ('10', '박쥐', 'Noun', 0), ('2', '날다', 'Verb', 1)],
+            floats=[('1', '나비', 'Noun', 0.5), ('2', '사람', 'Noun', 1.25)],
+        )
+        self.assertEqual(tables['ints'].scores.dtype, np.int8)
+        self.assertEqual(tables['floats'].scores.dtype, np.float64)
+
+        cards = ['1', '10', '2', '2', '3', '1', '1', '1']
+        tokens = ['나비', '박쥐', '날다', '사람', '나비', '나', '나비나비', '']
+        pos = ['Noun', 'Noun', 'Verb', 'Noun', 'Noun', 'Noun', 'Noun', 'Noun']
+        # 같은 키는 마지막 값, 0 점은 점수로 본다. 없는 카드·토큰·품사 조합은 default
+        np.testing.assert_array_equal(tables['ints'].lookup(cards, tokens, pos, default=9), [-2, 0, 1, 9, 9, 9, 9, 9])
+        np.testing.assert_array_equal(tables['floats'].lookup(cards, tokens, pos, default=9), [0.5, 9, 9, 1.25, 9, 9, 9, 9])
+        np.testing.assert_array_equal(tables['ints'].lookup(['1'], ['나비'], ['Verb'], default=np.nan), [np.nan])
+        self.assertEqual(len(tables['ints'].lookup([], [], [], default=1)), 0)
+        self.assertEqual(sorted(tables['floats'].entries()), [('나비', 'Noun'), ('사람', 'Noun')])
+
+    def test_symbol_lookup(self):
+        table = projection.SymbolScoreTable(pd.DataFrame(
+            [('1', 'A', 'F', 2), ('1', 'A', 'F', 5), ('10', 'A', 'M', 1), ('2', 'B', 'F', 3)],
+            columns=['카드', '채점영역', '기호', '점수'],
+        ))
+        self.assertTrue(table.integral)
+        np.testing.assert_array_equal(
+            table.lookup(['1', '10', '1', '3', '10'], 'A', ['F', 'M', 'M', 'F', 'F'], default=0), [5, 1, 0, 0, 0],
+        )
+        np.testing.assert_array_equal(table.lookup(['2'], 'B', ['F'], default=0), [3])
+        np.testing.assert_array_equal(table.lookup(['2'], '없는영역', ['F'], default=-1), [-1])
+
+
+class RecomputeProjectionTests(ScoringTestCase):
+    def setUp(self):
+        self.client_obj = self.make_client(BASELINE[1]['rows'], age=BASELINE[1]['age'])
+        self.summary = StructuralSummary.current_for(self.client_obj)
+        self.before = {p.pk: p.t_score for p in ProjectionScore.objects.all()}
+        self.card_one = set(ResponseCode.objects.filter(card_num=1).values_list('pk', flat=True))
+        self.assertTrue(self.card_one and self.before.keys() - self.card_one)
+
+        # 카드 1 의 투사지수 평균만 바꾼 새 자료
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.new_dir = Path(tmp.name)
+        for name in RESOURCE_FILENAMES.values():
+            shutil.copy(RESOURCE_DIR / name, self.new_dir / name)
+        stats_path = self.new_dir / RESOURCE_FILENAMES['index_stats']
+        stats = json.loads(stats_path.read_text(encoding='utf-8'))
+        stats['1']['mean'] += 1.0
+        stats_path.write_text(json.dumps(stats), encoding='utf-8')
+
+    def recompute(self, **opts):
+        out = io.StringIO()
+        call_command('recompute_projection', stdout=out, **opts)
+        return out.getvalue()
+
+    def test_report_only_changed_card(self):
+        report = Path(self.new_dir) / 'report.xlsx'
+        out = self.recompute(new=str(self.new_dir), output=str(report))
+        n = len(self.before)
+        self.assertIn("바뀐 카드: 1\n", out)
+        self.assertIn(f"바뀐 카드 {len(self.card_one)}개 재계산, 그 밖의 카드 {n - len(self.card_one)}개 저장값 사용 / 0개 계산", out)
+        self.assertIn("T 가 바뀐 수검자 1명", out)
+
+        rows = list(load_workbook(report)['카드별'].values)
+        header, rows = rows[0], rows[1:]
+        delta = {row[header.index('카드')]: row[header.index('T_변화')] for row in rows}
+        self.assertLess(delta.pop('1'), 0)
+        self.assertTrue(delta and all(abs(d) < 1e-9 for d in delta.values()))
+        # 보고만 하고 저장하지 않는다
+        self.assertEqual({p.pk: p.t_score for p in ProjectionScore.objects.all()}, self.before)
+
+    def test_apply_requires_deployed_resources(self):
+        with self.assertRaisesMessage(CommandError, '--apply'):
+            self.recompute(new=str(self.new_dir), apply=True)
+
+    def test_apply_persists_new_scores(self):
+        with mock.patch.object(projection, 'RESOURCE_DIR', self.new_dir):
+            out = self.recompute(old=str(RESOURCE_DIR), apply=True)
+            self.assertIn(f"저장: 반응 {len(self.before)}개, 수검자 1명", out)
+            after = {p.pk: p.t_score for p in ProjectionScore.objects.all()}
+            for pk, t in self.before.items():
+                if pk in self.card_one:
+                    self.assertLess(after[pk], t)
+                else:
+                    self.assertEqual(after[pk], t)
+
+            # 저장한 값이 요약의 투사 점수 갱신과 같아 다시 계산할 것이 없다
+            summary = StructuralSummary.objects.get(pk=self.summary.pk)
+            saved = (summary.projection_t, summary.projection_card_t)
+            self.assertNotEqual(saved, (self.summary.projection_t, self.summary.projection_card_t))
+            with mock.patch('scoring.models.score_frame', side_effect=AssertionError("다시 계산했습니다")):
+                summary.refresh_projection()
+            ProjectionScore.objects.all().delete()
+            summary.refresh_projection()
+        self.assertEqual((summary.projection_t, summary.projection_card_t), saved)
+
+
+class _ThreadPool(ThreadPoolExecutor):
+    """process_pool 대신 쓰는 스레드 풀. breaks[수검자 id] 번만큼 그 수검자의 작업을 BrokenProcessPool 로 끝낸다."""
+
+    def __init__(self, workers, breaks):
+        super().__init__(workers)
+        self.breaks = breaks
+
+    def submit(self, fn, client_id, *args):
+        if self.breaks.get(client_id):
+            self.breaks[client_id] -= 1
+            future = Future()
+            future.set_exception(BrokenProcessPool("worker 종료"))
+            return future
+        return super().submit(fn, client_id, *args)
+
+
+def _fake_build_by_id(client_id, include_info_sheet):
+    if client_id == 3:
+        return None, None, "ValueError: 실패"
+    return f"수검자{client_id}.xlsx", f"{client_id}:{include_info_sheet}".encode(), None
+
+
+class BulkExportPoolTests(SimpleTestCase):
+    def build(self, n, breaks):
+        pools = []
+
+        def make_pool(workers, initializer):
+            self.assertEqual(initializer, 'scoring.bulk_export._init_worker')
+            pools.append(_ThreadPool(workers, breaks))
+            return pools[-1]
+
+        clients = [Client(pk=i, name=f'수검자{i}') for i in range(1, n + 1)]
+        with mock.patch.object(bulk_export, 'process_pool', side_effect=make_pool), \
+                mock.patch.object(bulk_export, '_build_by_id', _fake_build_by_id):
+            out = {client.pk: (name, data, error) for client, name, data, error in
+                   bulk_export.build_client_files(clients, include_info_sheet=True, workers=2)}
+        return out, pools
+
+    def test_results_and_failures(self):
+        out, pools = self.build(6, {})
+        self.assertEqual(len(pools), 1)
+        self.assertEqual(sorted(out), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(out[3], (None, None, "ValueError: 실패"))
+        self.assertEqual(out[5], ("수검자5.xlsx", b"5:True", None))
+
+    def test_broken_pool_retries_each_client(self):
+        # 2 는 다시 만들면 성공, 4 는 다시 만들어도 worker 가 죽는다
+        out, pools = self.build(6, {2: 1, 4: 2})
+        self.assertEqual(len(pools), 3)
+        self.assertEqual(sorted(out), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(out[2], ("수검자2.xlsx", b"2:True", None))
+        self.assertEqual(out[4], (None, None, "작업 프로세스가 비정상 종료했습니다."))
+        self.assertEqual(out[3], (None, None, "ValueError: 실패"))
+
+    def test_single_client_builds_in_process(self):
+        with mock.patch.object(bulk_export, 'process_pool', side_effect=AssertionError("풀을 만들었습니다")), \
+                mock.patch.object(bulk_export, '_build', return_value=("a.xlsx", b"a", None)) as build:
+            out = list(bulk_export.build_client_files([Client(pk=1, name='a')], workers=4))
+        build.assert_called_once()
+        self.assertEqual(out[0][1:], ("a.xlsx", b"a", None))
+
+
+class ClientZipTests(SimpleTestCase):
+    def setUp(self):
+        self.built = []
+
+        def build(client, include_info_sheet):
+            self.built.append(client.pk)
+            if client.name == '실패':
+                raise ValueError("통합 문서 작성 실패")
+            return f"{client.name}.xlsx", f"{client.pk}".encode() * 1000
+
+        patcher = mock.patch.object(advanced, 'build_client_xlsx_bytes', side_effect=build)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_streams_entries_and_reports_failures(self):
+        clients = [Client(pk=1, name='가'), Client(pk=2, name='실패'), Client(pk=3, name='가'), Client(pk=4, name='나')]
+        progress = []
+        with self.assertLogs(level='ERROR'):
+            chunks = bulk_export.client_zip_chunks(clients, workers=1, progress=lambda c, e: progress.append((c.pk, e)))
+            first = next(chunks)
+            # 첫 수검자의 통합 문서만 만들고 압축해 내보낸다
+            self.assertEqual(self.built, [1])
+            self.assertTrue(first.startswith(b'PK'))
+            rest = list(chunks)
+
+        self.assertEqual(len(rest), 4)  # 항목마다 한 조각 + 중앙 디렉터리
+        self.assertTrue(all(len(chunk) < 1000 for chunk in [first] + rest))
+        with zipfile.ZipFile(io.BytesIO(first + b''.join(rest))) as zf:
+            self.assertEqual(zf.namelist(), ['가.xlsx', '가 (1).xlsx', '나.xlsx', 'errors.txt'])
+            self.assertEqual(zf.read('가 (1).xlsx'), b'3' * 1000)
+            self.assertEqual(zf.read('errors.txt').decode(), "실패 (id=2): ValueError: 통합 문서 작성 실패\n")
+        self.assertEqual(progress, [(1, None), (2, "ValueError: 통합 문서 작성 실패"), (3, None), (4, None)])
+
+    def test_no_errors_file_without_failures(self):
+        data = b''.join(bulk_export.client_zip_chunks([Client(pk=1, name='가')], workers=1))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(zf.namelist(), ['가.xlsx'])
+
+    def test_unique_name(self):
+        used = set()
+        names = [bulk_export.unique_name(n, used) for n in ['a.xlsx', 'a.xlsx', 'a.xlsx', 'b', 'b']]
+        self.assertEqual(names, ['a.xlsx', 'a (1).xlsx', 'a (2).xlsx', 'b', 'b (1)'])
+
+
+class ExportJobTests(ScoringTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(export_jobs, 'JOB_DIR', Path(tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clients = [self.make_client([], name=f'수검자{i}') for i in range(2)]
+        self.user = self.clients[0].tester
+
+    def enqueue(self, n=1):
+        return [export_jobs.enqueue(self.user, self.clients) for _ in range(n)]
+
+    def test_claim_respects_max_running(self):
+        jobs = self.enqueue(3)
+        first = export_jobs.claim_next(max_running=1)
+        self.assertEqual((first.pk, first.status), (jobs[0].pk, ExportJob.RUNNING))
+        self.assertTrue(first.owner and first.heartbeat_at)
+        self.assertIsNone(export_jobs.claim_next(max_running=1))
+        self.assertEqual(export_jobs.claim_next(max_running=2).pk, jobs[1].pk)
+        self.assertIsNone(export_jobs.claim_next(max_running=2))
+        ExportJob.objects.filter(pk=first.pk).update(status=ExportJob.DONE)
+        self.assertEqual(export_jobs.claim_next(max_running=2).pk, jobs[2].pk)
+        self.assertIsNone(export_jobs.claim_next(max_running=5))
+
+    def test_requeue_stale(self):
+        self.enqueue(2)
+        stale, fresh = export_jobs.claim_next(max_running=2), export_jobs.claim_next(max_running=2)
+        ExportJob.objects.filter(pk=stale.pk).update(
+            done=1, heartbeat_at=datetime.datetime.now(datetime.timezone.utc) - export_jobs.STALE_AFTER * 2,
+        )
+        self.assertEqual(export_jobs.requeue_stale(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.done, stale.owner, stale.heartbeat_at), (ExportJob.QUEUED, 0, '', None))
+        self.assertEqual(ExportJob.objects.get(pk=fresh.pk).status, ExportJob.RUNNING)
+        self.assertEqual(export_jobs.claim_next(max_running=2).pk, stale.pk)
+
+    def test_run_job(self):
+        export_jobs.enqueue(self.user, self.clients + [Client(pk=self.clients[-1].pk + 100)])
+        job = export_jobs.claim_next()
+        with mock.patch.object(advanced, 'build_client_xlsx_bytes',
+                               side_effect=lambda c, include_info_sheet: (f"{c.name}.xlsx", b"xlsx")):
+            export_jobs.run_job(job, workers=1)
+        self.assertEqual((job.status, job.done, job.total), (ExportJob.DONE, 3, 3))
+        self.assertIn(f"id={self.clients[-1].pk + 100}: 수검자를 찾을 수 없습니다.", job.error)
+        with zipfile.ZipFile(export_jobs.artifact_path(job)) as zf:
+            self.assertEqual(zf.namelist(), ['수검자0.xlsx', '수검자1.xlsx'])
+        self.assertEqual([p.name for p in export_jobs.JOB_DIR.iterdir()], [f"{job.pk}.zip"])
+
+    def test_lost_job_is_left_to_new_owner(self):
+        self.enqueue()
+        job = export_jobs.claim_next()
+
+        def chunks(clients, include_info_sheet, workers, progress):
+            yield b'PK'
+            # 이 worker 가 멈춘 사이 다른 worker 가 다시 가져갔다
+            ExportJob.objects.filter(pk=job.pk).update(owner='다른worker', done=0)
+            progress(clients[0], None)
+            raise AssertionError("JobLost 뒤에도 계속 만들었습니다")
+
+        with mock.patch.object(export_jobs, 'client_zip_chunks', chunks), self.assertLogs(level='WARNING'):
+            export_jobs.run_job(job, workers=1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.owner, job.done, job.finished_at), (ExportJob.RUNNING, '다른worker', 0, None))
+        self.assertEqual(list(export_jobs.JOB_DIR.iterdir()), [])
+
+    def test_job_visible_to_requester_and_staff_only(self):
+        job, = self.enqueue()
+        other = User.objects.create(username='other', phone='01000000001')
+        staff = User.objects.create(username='staff', phone='01000000002', is_staff=True)
+        url = reverse('scoring:export_job_status', args=[job.pk])
+        for user, status in ((self.user, 200), (other, 404), (staff, 200)):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                if status == 200:
+                    self.assertEqual(response.json()['id'], job.pk)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('scoring:download_export_job', args=[job.pk])).status_code, 404)
+
+
+class SyntheticCohortTests(TestCase):
+    def test_deterministic_and_valid(self):
+        cohort = synthetic.generate_cohort(seed=7, clients=6, r_min=10, r_max=30)
+        self.assertEqual(cohort, synthetic.generate_cohort(seed=7, clients=6, r_min=10, r_max=30))
+        self.assertNotEqual(cohort, synthetic.generate_cohort(seed=8, clients=6, r_min=10, r_max=30))
+        for i, (fields, rows) in enumerate(cohort):
+            self.assertEqual(fields['name'], f'synthetic-{i:05d}')
+            self.assertTrue(10 <= len(rows) <= 30)
+            self.assertEqual({r['card'] for r in rows}, set(CARD_ROMANS))
+            for row in rows:
+                form = ResponseCodeForm(row)
+                self.assertTrue(form.is_valid(), (row, dict(form.errors)))
+            score_protocol(30, ordered(rows))
+
+    def test_mix(self):
+        rows = synthetic.generate_protocol(random.Random(0), 200, {'pure_f': 1.0, 'special': 0.0, 'pair': 1.0})
+        self.assertEqual({r['determinants'] for r in rows}, {'F'})
+        self.assertEqual({r['special'] for r in rows}, {''})
+        self.assertEqual({r['pair'] for r in rows}, {'2'})
+
+    def test_benchmark_command(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        output = Path(tmp.name) / 'bench.json'
+        with mock.patch.object(export_cache, 'CACHE_MAX_BYTES'):
+            call_command('benchmark_scoring', clients=2, r_min=10, r_max=12, repeat=1, output=str(output), stdout=io.StringIO())
+        report = json.loads(output.read_text(encoding='utf-8'))
+        self.assertEqual(set(report['results']), {
+            'calculate_values', 'projection', 'advanced_workbook', 'intermediate_export', 'advanced_upload',
+        })
+        self.assertEqual(report['meta']['clients'], 2)
+        # 만든 데이터는 되돌린다
+        self.assertFalse(Client.objects.exists())
+        self.assertFalse(User.objects.filter(username='__benchmark__').exists())
+
+
+class ResourceCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        for name in RESOURCE_FILENAMES.values():
+            shutil.copy(RESOURCE_DIR / name, self.dir / name)
+        for patcher in (mock.patch.object(projection, 'RESOURCE_DIR', self.dir),
+                        mock.patch.object(projection, 'COMPILED_DIR', self.dir / 'compiled'),
+                        mock.patch.dict(projection._cache, {'signature': None, 'resources': None})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reused_until_file_changes(self):
+        with mock.patch.object(projection, 'build_resources', wraps=projection.build_resources) as build:
+            first = load_resources()
+            self.assertIs(load_resources(), first)
+            self.assertEqual(build.call_count, 1)
+
+            # 내용이 같아도 수정 시각이 바뀌면 다시 만든다
+            path = self.dir / RESOURCE_FILENAMES['index_stats']
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            second = load_resources()
+            self.assertIsNot(second, first)
+            self.assertEqual(second['version'], first['version'])
+
+            stats = json.loads(path.read_text(encoding='utf-8'))
+            stats['1']['std'] *= 2
+            path.write_text(json.dumps(stats), encoding='utf-8')
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000))
+            third = load_resources()
+            self.assertIs(load_resources(), third)
+            self.assertEqual(build.call_count, 3)
+        self.assertNotEqual(third['version'], first['version'])
+        self.assertEqual(third['index_stats'].set_index('카드').loc['1', 'std'], stats['1']['std'])
+
+    def test_missing_file(self):
+        (self.dir / RESOURCE_FILENAMES['symbol_score']).unlink()
+        with self.assertRaisesMessage(FileNotFoundError, RESOURCE_FILENAMES['symbol_score']):
+            load_resources()
+
+
+class ContentValidationTests(SimpleTestCase):
+    def test_contents_match_engine_codes(self):
+        self.assertEqual(validate_contents('H, (Hd), Fd, Id'), 'H, (Hd), Fd, Id')
+        for value in ('H, Zz', 'Fd_l', '(Id)'):
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                validate_contents(value)
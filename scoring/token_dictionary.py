@@ -0,0 +1,153 @@
+# 토큰 점수표 사전 기반 형태소 분석 (JVM 없이 Okt 와 비슷한 토큰을 만든다)
+#
+# 점수표의 모든 (토큰, 품사) 를 표면형으로 펼쳐 trie 에 넣고, 어절마다 왼쪽부터 가장 긴 표면형을
+# 찾는다. 동사/형용사는 어간과 흔한 활용형(받침 ㄴ/ㄹ/ㅁ/ㅂ/ㅆ 결합, 모음 축약, ㅂ/ㅎ/ㄹ/ㄷ 불규칙)을
+# 기본형으로 되돌리고 나머지 어미는 버린다. 명사 뒤의 조사/서술격 어미는 떼어낸다.
+# 사전에 없는 부분은 Okt 처럼 명사로 남긴다 (점수표에 없는 토큰은 기본 점수를 받으므로).
+# trie 깊이는 가장 긴 표면형 길이로 제한되어 문장 길이에 선형이다.
+
+HANGUL_BASE = 0xAC00
+HANGUL_LAST = 0xD7A3
+JONG_N, JONG_L, JONG_D, JONG_M, JONG_B, JONG_SS, JONG_H = 4, 8, 7, 16, 17, 20, 27
+# 모음 축약: 중성 → 축약 중성 (ㅣ→ㅕ, ㅗ→ㅘ, ㅜ→ㅝ, ㅡ→ㅓ, ㅚ→ㅙ)
+VOWEL_CONTRACTION = {20: 6, 8: 9, 13: 14, 18: 4, 11: 10}
+JUNG_A, JUNG_AE, CHO_H = 0, 1, 18
+
+# 명사 뒤에 붙는 조사/서술격 어미 (긴 것부터 맞춘다)
+SUFFIXES = sorted({
+    '이', '가', '은', '는', '을', '를', '의', '에', '에서', '에게', '한테', '께', '로', '으로', '와', '과',
+    '도', '만', '처럼', '보다', '이나', '나', '이랑', '랑', '하고', '까지', '부터', '마다', '밖에', '씩',
+    '요', '이요', '예요', '이에요', '에요', '이다', '다', '인데', '인데요', '이고', '고', '이며', '며',
+    '이네요', '네요', '인가', '인가요', '이죠', '죠', '이지', '지', '들', '들이', '들은', '들을', '들의', '들도',
+}, key=len, reverse=True)
+
+# 불용 동사/형용사: 활용형을 알아보고 출력에서는 뺀다
+STOP_VERBS = [('같다', 'Adjective'), ('하다', 'Verb'), ('있다', 'Adjective'), ('보이다', 'Verb'),
+              ('보다', 'Verb'), ('그렇다', 'Adjective'), ('어떻다', 'Adjective'), ('이다', 'Adjective')]
+
+# 표면형 종류 (같은 표면형이면 앞쪽 우선). _MERGED 는 관형형/명사형 어미(ㄴ/ㄹ/ㅁ)까지 합쳐진 형태라
+# 바로 뒤에 다른 토큰이 올 수 있고, 나머지 어간 형태 뒤에는 어미가 한 글자 이상 온다.
+_EXACT, _STEM, _MERGED, _VARIANT = 0, 1, 2, 3
+_END = ''
+
+
+def _split(ch):
+    code = ord(ch) - HANGUL_BASE
+    return code // 588, (code // 28) % 21, code % 28
+
+
+def _join(cho, jung, jong=0):
+    return chr(HANGUL_BASE + (cho * 21 + jung) * 28 + jong)
+
+
+def _is_hangul(ch):
+    return HANGUL_BASE <= ord(ch) <= HANGUL_LAST
+
+
+def stem_forms(stem):
+    """어간 → 활용에서 나타나는 [(어간 표면형, 어미까지 합쳐졌는지), ...] (어간 자신 제외)."""
+    if not stem or not _is_hangul(stem[-1]):
+        return []
+    head = stem[:-1]
+    cho, jung, jong = _split(stem[-1])
+    forms = []
+    if jong == 0:
+        forms += [(head + _join(cho, jung, j), True) for j in (JONG_N, JONG_L, JONG_M)]
+        forms += [(head + _join(cho, jung, j), False) for j in (JONG_B, JONG_SS)]
+        contracted = JUNG_AE if (cho == CHO_H and jung == JUNG_A) else VOWEL_CONTRACTION.get(jung)
+        if contracted is not None:
+            forms += [(head + _join(cho, contracted), False), (head + _join(cho, contracted, JONG_SS), False)]
+    elif jong in (JONG_B, JONG_H, JONG_L):  # 무섭→무서(운), 하얗→하야/하얀, 살→사(는)/산
+        forms += [(head + _join(cho, jung), False), (head + _join(cho, jung, JONG_N), jong != JONG_B)]
+    elif jong == JONG_D:  # 걷→걸(어)
+        forms.append((head + _join(cho, jung, JONG_L), False))
+    return forms
+
+
+def _surfaces(token, pos):
+    if pos in ('Verb', 'Adjective') and len(token) > 1 and token.endswith('다'):
+        stem = token[:-1]
+        yield stem, _STEM
+        for form, merged in stem_forms(stem):
+            yield form, _MERGED if merged else _VARIANT
+    else:
+        yield token, _EXACT
+
+
+def build_trie(entries, stopwords=()):
+    """
+    (토큰, 품사) 목록 → trie (문자 → 자식 dict, '' 키에 (우선순위, 토큰, 품사, 불용 여부)).
+    stopwords 에 있는 토큰과 STOP_VERBS 는 알아보되 출력하지 않도록 표시한다.
+    """
+    root = {}
+    entries = [(t, p, t in stopwords) for t, p in entries] + [(t, p, True) for t, p in STOP_VERBS]
+    for token, pos, stop in entries:
+        for surface, rank in _surfaces(token, pos):
+            node = root
+            for ch in surface:
+                node = node.setdefault(ch, {})
+            value = (rank, token, pos, stop)
+            if _END not in node or value < node[_END]:
+                node[_END] = value
+    return root
+
+
+def _longest(trie, word, i):
+    """word[i:] 앞부분과 맞는 가장 긴 표면형 → (끝 위치, 값) 또는 None."""
+    node, found = trie, None
+    for j in range(i, len(word)):
+        node = node.get(word[j])
+        if node is None:
+            break
+        if _END in node:
+            found = (j + 1, node[_END])
+    return found
+
+
+_SUFFIX_SET = set(SUFFIXES)
+
+
+def _only_suffix(rest, depth=3):
+    """rest 가 비었거나 조사/어미를 depth 개까지 이은 것이면 True (예: 들 + 이에요)."""
+    if not rest or rest in _SUFFIX_SET:
+        return True
+    return depth > 1 and any(
+        rest.startswith(suffix) and _only_suffix(rest[len(suffix):], depth - 1) for suffix in SUFFIXES
+    )
+
+
+def analyze(trie, text):
+    """정규화한 문장 → [(토큰, 품사), ...] (등장 순, 불용어 제외 전)."""
+    out = []
+    for word in text.split():
+        start = i = 0
+        ending = False  # 앞 토큰이 어간이면 start 부터는 어미 (명사로 남기지 않는다)
+        while i < len(word):
+            match = _longest(trie, word, i)
+            if match:
+                end, (rank, token, pos, stop) = match
+                # 어미는 적어도 한 글자. 한 글자 표면형은 어절/앞 토큰 경계에서만, 명사면 뒤가 조사일 때만 받는다
+                if ending and i == start:
+                    match = None
+                elif end - i == 1 and (ending or i != start or (rank == _EXACT and not _only_suffix(word[end:]))):
+                    match = None
+            if not match:
+                i += 1
+                continue
+            if i > start and not ending:
+                out.append((word[start:i], 'Noun'))
+            if not stop:
+                out.append((token, pos))
+            if rank == _EXACT and _only_suffix(word[end:]):
+                break  # 명사 뒤가 조사뿐이면 어절 끝
+            ending = rank in (_STEM, _VARIANT)
+            start = i = end
+        else:
+            rest = word[start:]
+            for suffix in SUFFIXES:
+                if len(rest) > len(suffix) and rest.endswith(suffix):
+                    rest = rest[:-len(suffix)]
+                    break
+            if rest and not ending and not _only_suffix(rest):
+                out.append((rest, 'Noun'))
+    return out
@@ -0,0 +1,317 @@
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.utils import timezone
+
+from . import token_dictionary
+
+# 반응/질문 문장의 형태소 분석 (투사지표용)
+#
+# 분석기는 SCORING_TOKENIZER 설정으로 고른다.
+#   okt        : konlpy Okt (JVM)
+#   dictionary : 토큰 점수표 사전 기반 분석 (token_dictionary, 순수 파이썬)
+#   whitespace : 공백 단위
+#   auto       : Okt 를 쓸 수 있으면 okt, 아니면 whitespace (기본)
+# Okt 를 쓸 수 없을 때 dictionary 로 바꾸면 투사 점수가 달라지므로, 사전 기반 분석은 설정으로만 켠다.
+# 분석 결과는 정규화한 문장의 해시로
+# DB(TokenizedText)에 저장해 두어, 바뀌지 않은 프로토콜을 다시 내보낼 때는 분석하지 않는다.
+#
+# SCORING_TOKENIZER_ADDRESS 가 설정되어 있으면 분석은 형태소 분석 서비스(run_tokenizer_service,
+# Okt 를 띄워 둔 worker 프로세스 풀)에 문장 묶음 단위로 맡기므로, 웹 프로세스는 JVM 을 띄우지 않는다.
+# 서비스에 연결할 수 없으면 같은 분석기를 쓸 수 있을 때만 현재 프로세스에서 분석한다.
+
+STOPWORDS = set([
+    '이','그','저','나','너','그것','이것','저것','들','\n','때','것','그리고','하지만','또는','즉','그렇지','그래서','그러므로',
+    '대해','대하여','위해','때문에','그런데','근데','이런','저런','그런','같은','처럼','듯','도','만','또','조차','까지',
+    '네','예','수검자','검사자','있다','보이다','Q','A','반응반복','같다','하다','반응','반복','부분','여기','이렇게','거','그렇다','어떻다','얘','보다'
+])
+TARGET_POS = {'Noun', 'Verb', 'Adjective', 'Adverb'}
+
+# 캐시 최대 항목 수. 넘으면 오래 안 쓴 항목부터 지운다.
+CACHE_MAX_ENTRIES = getattr(settings, 'SCORING_TOKEN_CACHE_MAX_ENTRIES', 200_000)
+_TOUCH_INTERVAL = timedelta(days=1)  # 사용 시각은 이 간격보다 오래됐을 때만 갱신
+_QUERY_CHUNK = 500
+
+
+def _preprocess_text(text: str) -> str:
+    text = re.sub(r'[^\w\sㄱ-ㅎㅏ-ㅣ가-힣]', ' ', str(text))
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def okt_available():
+    try:
+        import jpype
+        import konlpy  # noqa: F401
+        jpype.getDefaultJVMPath()
+        return True
+    except Exception:
+        return False
+
+
+TOKENIZERS = ('okt', 'dictionary', 'whitespace')
+
+
+def _choose_tokenizer():
+    name = getattr(settings, 'SCORING_TOKENIZER', 'auto')
+    if name not in ('auto',) + TOKENIZERS:
+        raise ImproperlyConfigured(f"SCORING_TOKENIZER 는 auto, {', '.join(TOKENIZERS)} 중 하나여야 합니다: {name}")
+    if name in ('auto', 'okt'):
+        if okt_available():
+            return 'okt'
+        logging.warning(
+            "konlpy/JVM 을 쓸 수 없어 공백 단위로 분석합니다. "
+            "사전 기반 분석기를 쓰려면 SCORING_TOKENIZER = 'dictionary' 로 설정하세요."
+        )
+        return 'whitespace'
+    return name
+
+
+# 현재 프로세스의 분석기. Okt 는 처음 분석할 때 띄운다.
+LOCAL_TOKENIZER = _choose_tokenizer()
+_OKT = None
+_dictionary = {'current': (None, None)}
+
+
+def _get_okt():
+    global _OKT
+    if _OKT is None:
+        from konlpy.tag import Okt
+        _OKT = Okt()
+    return _OKT
+
+
+def _get_dictionary():
+    """(토큰 점수표 버전, trie). 토큰 점수표가 바뀌면 다시 만든다."""
+    from .projection import TOKEN_TABLES, load_resources
+
+    resources = load_resources()
+    version, trie = _dictionary['current']
+    if version != resources['token_version']:
+        entries = set().union(*(resources[key].entries() for key in TOKEN_TABLES))
+        trie = token_dictionary.build_trie(sorted(entries), STOPWORDS)
+        version = resources['token_version']
+        _dictionary['current'] = (version, trie)
+    return version, trie
+
+
+def local_tokenizer():
+    """현재 프로세스 분석기의 이름. 사전 기반은 사전이 된 토큰 점수표 버전을 붙인다."""
+    if LOCAL_TOKENIZER == 'dictionary':
+        return f"dictionary-{_get_dictionary()[0][:12]}"
+    return LOCAL_TOKENIZER
+
+
+def _analyze(text: str, mode=None):
+    mode = mode or LOCAL_TOKENIZER
+    if mode == 'okt':
+        tokens = _get_okt().pos(text, stem=True)
+    elif mode == 'dictionary':
+        tokens = token_dictionary.analyze(_get_dictionary()[1], text)
+    else:
+        tokens = [(t, 'Noun') for t in re.split(r'\s+', text) if len(t) >= 2]
+    return [(w, p) for (w, p) in tokens if (p in TARGET_POS and w not in STOPWORDS)]
+
+
+def tokenize_with(mode, texts):
+    """지정한 분석기로 문장 목록을 분석한다 (캐시/서비스 없이, 분석기 비교용)."""
+    if mode not in TOKENIZERS:
+        raise ValueError(f"알 수 없는 분석기: {mode}")
+    if mode == 'okt' and not okt_available():
+        raise RuntimeError("konlpy/JVM 을 쓸 수 없습니다.")
+    return [_unique(_analyze(_preprocess_text('' if t is None else t), mode)) for t in texts]
+
+
+def _parse_address(value):
+    """'host:port' → (host, port), 그 밖의 문자열은 unix socket 경로."""
+    if value is None or isinstance(value, (tuple, list)):
+        return tuple(value) if value else None
+    host, sep, port = str(value).rpartition(':')
+    if sep and port.isdigit() and '/' not in value:
+        return host or '127.0.0.1', int(port)
+    return str(value)
+
+
+SERVICE_ADDRESS = _parse_address(getattr(settings, 'SCORING_TOKENIZER_ADDRESS', None))
+SERVICE_TIMEOUT = getattr(settings, 'SCORING_TOKENIZER_TIMEOUT', 60)
+_SERVICE_ERRORS = (OSError, EOFError, TimeoutError, AuthenticationError)
+_service = {'tokenizer': None}
+
+
+def _authkey():
+    return hashlib.sha256(f'scoring-tokenizer:{settings.SECRET_KEY}'.encode()).digest()
+
+
+def _request(address, op, payload=None):
+    with Client(address, authkey=_authkey()) as conn:
+        conn.send((op, payload))
+        if not conn.poll(SERVICE_TIMEOUT):
+            raise TimeoutError(f"형태소 분석 서비스 응답 시간 초과 ({SERVICE_TIMEOUT}s)")
+        ok, result = conn.recv()
+    if not ok:
+        raise RuntimeError(f"형태소 분석 서비스 오류: {result}")
+    return result
+
+
+def current_tokenizer():
+    """분석 결과를 만드는 분석기 이름 (서비스를 쓰면 서비스의 분석기)."""
+    if SERVICE_ADDRESS is None:
+        return local_tokenizer()
+    if _service['tokenizer'] is None:
+        try:
+            _service['tokenizer'] = _request(SERVICE_ADDRESS, 'tokenizer')
+        except _SERVICE_ERRORS:
+            logging.warning("형태소 분석 서비스(%s)에 연결할 수 없어 현재 프로세스의 분석기를 씁니다.", SERVICE_ADDRESS)
+            return local_tokenizer()
+    return _service['tokenizer']
+
+
+def analyze_batch(texts):
+    """정규화한 문장 목록 → 문장별 (토큰, 품사) 목록. 서비스가 있으면 한 번의 요청으로 보낸다."""
+    texts = list(texts)
+    tokenizer = current_tokenizer()
+    if _service['tokenizer'] is not None and texts:
+        try:
+            return [[tuple(t) for t in tokens] for tokens in _request(SERVICE_ADDRESS, 'analyze', texts)]
+        except _SERVICE_ERRORS as e:
+            logging.warning("형태소 분석 서비스(%s) 요청 실패: %r", SERVICE_ADDRESS, e)
+    if tokenizer != local_tokenizer():
+        # 다른 분석기 결과를 같은 키로 캐시/저장하지 않도록 멈춘다
+        raise RuntimeError(f"형태소 분석 서비스({tokenizer})에 연결할 수 없습니다.")
+    return [_analyze(text) for text in texts]
+
+
+def tokenize_with_pos(text: str):
+    return _analyze(_preprocess_text(text))
+
+
+def text_key(normalized: str, tokenizer=None) -> str:
+    """캐시 키: 분석기 이름 + 정규화한 문장의 sha1."""
+    tokenizer = tokenizer or current_tokenizer()
+    return hashlib.sha1(f'{tokenizer}\0{normalized}'.encode('utf-8')).hexdigest()
+
+
+def _unique(tokens):
+    return list(dict.fromkeys((w, p) for w, p in tokens))
+
+
+def tokenize_texts(texts, use_cache=True):
+    """
+    문장 목록 → 문장별 (토큰, 품사) 목록 (중복 제거). 캐시에 없는 문장만 분석하고 결과를 저장한다.
+    """
+    normalized = [_preprocess_text('' if t is None else t) for t in texts]
+    tokenizer = current_tokenizer()
+    keys = {text: text_key(text, tokenizer) for text in set(normalized)}
+    found = _cache_get(set(keys.values())) if use_cache else {}
+
+    missing = {key: text for text, key in keys.items() if key not in found}
+    analyzed = dict(zip(missing, (_unique(tokens) for tokens in analyze_batch(missing.values()))))
+    if use_cache and analyzed:
+        _cache_put(analyzed)
+    found.update(analyzed)
+    return [list(found[keys[text]]) for text in normalized]
+
+
+def _cache_get(keys):
+    from .models import TokenizedText
+
+    out, stale = {}, []
+    touch_before = timezone.now() - _TOUCH_INTERVAL
+    keys = list(keys)
+    try:
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            rows = TokenizedText.objects.filter(key__in=keys[i:i + _QUERY_CHUNK]).values_list('key', 'tokens', 'used_at')
+            for key, tokens, used_at in rows:
+                out[key] = [tuple(t) for t in tokens]
+                if used_at < touch_before:
+                    stale.append(key)
+        for i in range(0, len(stale), _QUERY_CHUNK):
+            TokenizedText.objects.filter(key__in=stale[i:i + _QUERY_CHUNK]).update(used_at=timezone.now())
+    except DatabaseError:
+        logging.exception("형태소 분석 캐시 조회 실패")
+        return {}
+    return out
+
+
+def _cache_put(analyzed):
+    from .models import TokenizedText
+
+    now = timezone.now()
+    try:
+        TokenizedText.objects.bulk_create(
+            [TokenizedText(key=key, tokens=[list(t) for t in tokens], used_at=now) for key, tokens in analyzed.items()],
+            batch_size=_QUERY_CHUNK, ignore_conflicts=True,
+        )
+        evict(CACHE_MAX_ENTRIES)
+    except DatabaseError:
+        logging.exception("형태소 분석 캐시 저장 실패")
+
+
+def evict(max_entries):
+    """항목 수가 max_entries 를 넘으면 오래 안 쓴 항목부터 지워 90% 로 줄인다. 반환: 지운 수"""
+    from .models import TokenizedText
+
+    count = TokenizedText.objects.count()
+    if count <= max_entries:
+        return 0
+    oldest = list(TokenizedText.objects.order_by('used_at').values_list('key', flat=True)[:count - int(max_entries * 0.9)])
+    for i in range(0, len(oldest), _QUERY_CHUNK):
+        TokenizedText.objects.filter(key__in=oldest[i:i + _QUERY_CHUNK]).delete()
+    return len(oldest)
+
+
+# ---- 형태소 분석 서비스 (run_tokenizer_service) ----
+
+def _warm_up():
+    _analyze('준비')
+
+
+def _analyze_chunk(texts):
+    return [_analyze(text) for text in texts]
+
+
+def _serve_connection(conn, pool, chunk_size):
+    with conn:
+        try:
+            op, payload = conn.recv()
+        except EOFError:
+            return
+        try:
+            if op == 'tokenizer':
+                result = local_tokenizer()
+            elif op == 'analyze':
+                chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+                result = [tokens for part in pool.map(_analyze_chunk, chunks) for tokens in part]
+            else:
+                raise ValueError(f"알 수 없는 요청: {op}")
+            conn.send((True, result))
+        except Exception as e:
+            logging.exception("형태소 분석 요청 처리 실패")
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+def serve(address, workers=1, chunk_size=50, on_ready=None):
+    """
+    Okt 를 띄워 둔 worker 프로세스 workers 개로 분석 요청을 받는다 (중지될 때까지).
+    요청 하나의 문장 묶음은 chunk_size 개씩 나누어 worker 들에 나눠 준다.
+    """
+    with ProcessPoolExecutor(workers, initializer=_warm_up) as pool:
+        list(pool.map(_analyze_chunk, [[]] * workers))  # worker 를 미리 띄운다
+        with Listener(_parse_address(address), authkey=_authkey()) as listener:
+            if on_ready:
+                on_ready(listener.address)
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logging.warning("형태소 분석 서비스: 인증 실패한 연결을 무시합니다.")
+                    continue
+                threading.Thread(target=_serve_connection, args=(conn, pool, chunk_size), daemon=True).start()
@@ -31,6 +31,13 @@ urlpatterns = [
         views.export_structural_summary_xlsx_advanced,
         name='export_structural_summary_xlsx_advanced',
     ),
+    path(
+        'advanced/<int:client_id>/summary-job/',
+        views.create_advanced_export_job,
+        name='create_advanced_export_job',
+    ),
+    path('export-jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export-jobs/<int:job_id>/download/', views.download_export_job, name='download_export_job'),
     path(
         'templates/response/advanced.xlsx',
         views.download_response_template_advanced,
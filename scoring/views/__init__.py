@@ -18,6 +18,11 @@ from .advanced import (
     advanced_entry,
     advanced_edit_responses,
 )
+from .export_jobs import (
+    create_advanced_export_job,
+    export_job_status,
+    download_export_job,
+)
 export_structural_summary_xlsx = export_structural_summary_xlsx_intermediate
 download_response_template_intermediate = download_response_template
 download_response_template_advanced = download_response_template
@@ -32,4 +37,6 @@ __all__ = [
     # advanced
     "advanced_entry", "advanced_upload", "advanced_edit_responses",
     "download_response_template_advanced", "export_structural_summary_xlsx_advanced",
+    # export jobs
+    "create_advanced_export_job", "export_job_status", "download_export_job",
 ]
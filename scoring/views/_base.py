@@ -1,9 +1,11 @@
 from functools import wraps
-import re
 
 from django.contrib.auth.decorators import login_required
+from django.db.models import QuerySet
 from django.http import HttpResponseForbidden
 
+from ..engine import ROW_FIELDS, UNICODE_ROMAN, card_number
+
 GROUP_LEVEL = {'beginner': 1, 'intermediate': 2, 'advanced': 3}
 GROUP_LABEL = {'beginner': '초급', 'intermediate': '중급', 'advanced': '고급'}
 
@@ -23,11 +25,6 @@ def group_min_required(min_group_name: str):
     return decorator
 
 
-UNICODE_ROMAN = {
-    'Ⅰ': 'I', 'Ⅱ': 'II', 'Ⅲ': 'III', 'Ⅳ': 'IV', 'Ⅴ': 'V',
-    'Ⅵ': 'VI', 'Ⅶ': 'VII', 'Ⅷ': 'VIII', 'Ⅸ': 'IX', 'Ⅹ': 'X'
-}
-
 ROMAN_TO_NUM = {'I': '1', 'II': '2', 'III': '3', 'IV': '4', 'V': '5',
                 'VI': '6', 'VII': '7', 'VIII': '8', 'IX': '9', 'X': '10'}
 NUM_TO_ROMAN = {v: k for k, v in ROMAN_TO_NUM.items()}
@@ -36,26 +33,32 @@ NUM_TO_ROMAN = {v: k for k, v in ROMAN_TO_NUM.items()}
 def normalize_card_to_num(val: str) -> str:
     if val is None:
         return ''
-    s = str(val).strip()
+    n = card_number(val)
+    if n is not None:
+        return str(n)
 
+    s = str(val).strip()
     for u, r in UNICODE_ROMAN.items():
         s = s.replace(u, r)
-
-    su = s.upper()
-    if su in ROMAN_TO_NUM:
-        return ROMAN_TO_NUM[su]
-
-    su = re.sub(r'[^IVX0-9]', '', su)
-
-    if su in ROMAN_TO_NUM:
-        return ROMAN_TO_NUM[su]
-
-    if re.fullmatch(r'([1-9]|10)', su):
-        return su
-
     return s
 
 
 def to_roman(val: str) -> str:
     n = normalize_card_to_num(val)
     return NUM_TO_ROMAN.get(str(n), str(val).strip())
+
+
+def scoring_record_before(form):
+    """formset 의 기존 반응이 수정되기 전 채점 레코드 (새 반응이면 None)."""
+    if not form.instance.pk:
+        return None
+    return {f: form.initial.get(f) for f in ROW_FIELDS}
+
+
+def missing_cards(response_codes):
+    """1~10번 카드 중 반응이 하나도 없는 카드 번호 목록 (queryset 또는 이미 불러온 반응 목록)."""
+    if isinstance(response_codes, QuerySet):
+        found = set(response_codes.values_list('card_num', flat=True))
+    else:
+        found = {rc.card_num for rc in response_codes}
+    return [n for n in range(1, 11) if n not in found]
@@ -1,9 +1,7 @@
 import logging
-from pathlib import Path
 from functools import wraps
 from collections import Counter
 from io import BytesIO
-import json
 import re
 import math
 import io
@@ -13,12 +11,12 @@ import pandas as pd
 import numpy as np
 from urllib.parse import quote
 
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.forms import modelformset_factory
 from django.http import (
+    FileResponse,
     HttpResponse,
     HttpResponseForbidden,
     HttpResponseNotFound,
@@ -35,6 +33,10 @@ from openpyxl.utils import get_column_letter
 
 from ..filters import CardImagesFilter, PResponseFilter, SearchReferenceFilter
 from ..forms import BulkResponseUploadForm, ResponseCodeForm
+from ..export_cache import open_export
+from ..projection import PROJECTION_FIELDS, card_key, card_t_summary, response_frame, score_frame
+from ..skeleton import SheetSkeleton
+from ..snapshot import ProtocolSnapshot, load_responses
 from ..models import (
     CardImages,
     Client,
@@ -46,7 +48,8 @@ from ..models import (
 
 from ._base import (
     group_min_required,
-    normalize_card_to_num,
+    missing_cards,
+    scoring_record_before,
     to_roman,
 )
 
@@ -286,6 +289,12 @@ def advanced_upload(request, client_id):
                 obj.save()
                 created += 1
 
+        if created:
+            try:
+                StructuralSummary.current_for(client)
+            except Exception:
+                logging.exception("업로드 후 구조요약 계산 실패: client_id=%s", client.id)
+
         if trimmed:
             messages.warning(request, f"총 {TOTAL_CAP}행 제한으로 앞 {allow}행만 처리했습니다.")
         if errors:
@@ -300,267 +309,38 @@ def advanced_upload(request, client_id):
         'form': form,
         'has_existing': has_existing, 'existing_count': existing_count,
     })
-RESOURCE_DIR = Path(getattr(settings, 'SCORING_RESOURCE_DIR',
-                            Path(__file__).resolve().parent.parent / 'resources')).resolve()
-
-DEFAULT_RESOURCE_FILENAMES = {
-    'symbol_score':   'symbol_score_mapping.json',
-    'response_score': 'response_token_scores_mapping.json',
-    'inquiry_score':  'inquiry_token_scores_mapping.json',
-    'score_stats':    'scoring_area_card_stats.json',
-    'index_stats':    'projection_index_card_stats.json',
-}
-RESOURCE_FILENAMES = getattr(settings, 'SCORING_RESOURCE_FILENAMES', DEFAULT_RESOURCE_FILENAMES)
-
-def _read_json_df(path: Path, required_cols=None) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(f"필요한 JSON 데이터 파일이 없습니다: {path}")
 
-    def _ensure_required(df: pd.DataFrame) -> pd.DataFrame:
-        if not required_cols:
-            return df
-        missing = [c for c in required_cols if c not in df.columns]
-        if missing:
-            raise ValueError(
-                f"{path.name} 에 필요한 열이 없습니다: {', '.join(missing)} "
-                f"(사용 가능한 열: {', '.join(map(str, getattr(df, 'columns', [])))} )"
-            )
-        return df
-
-    for kwargs in ({}, {'lines': True}):
-        try:
-            df_try = pd.read_json(path, dtype=False, **kwargs)
-            if isinstance(df_try, pd.DataFrame) and not df_try.empty:
-                rename = {
-                    'card':'카드','Card':'카드','card_id':'카드',
-                    'token':'토큰','Token':'토큰',
-                    'pos':'품사','POS':'품사',
-                    'score':'점수','Score':'점수'
-                }
-                df_try = df_try.rename(columns=rename)
-                return _ensure_required(df_try)
-        except Exception:
-            pass
-
-    raw = json.loads(path.read_text(encoding='utf-8'))
-
-    if isinstance(raw, dict):
-        rows = []
-
-        if all(isinstance(v, dict) and set(v.keys()) & {'mean', 'std'} for v in raw.values()):
-            for card, obj in raw.items():
-                rows.append({'카드': str(card), 'mean': obj.get('mean'), 'std': obj.get('std')})
-            return _ensure_required(pd.DataFrame(rows))
-
-        is_area_stats = any(
-            isinstance(areas, dict) and any(isinstance(v, dict) and {'mean','std'} <= set(v.keys())
-                                            for v in areas.values())
-            for areas in raw.values()
-        )
-        if is_area_stats:
-            for card, areas in raw.items():
-                if not isinstance(areas, dict):
-                    continue
-                for area_name, stat in areas.items():
-                    if isinstance(stat, dict) and {'mean','std'} <= set(stat.keys()):
-                        rows.append({'카드': str(card), '채점영역': str(area_name),
-                                     'mean': stat.get('mean'), 'std': stat.get('std')})
-            return _ensure_required(pd.DataFrame(rows))
-
-        is_symbol_scores = any(isinstance(areas, dict) and any(isinstance(v, dict) for v in areas.values())
-                               for areas in raw.values())
-        if is_symbol_scores:
-            for card, areas in raw.items():
-                if not isinstance(areas, dict):
-                    continue
-                for area_name, symbols in areas.items():
-                    if isinstance(symbols, dict):
-                        for sym, sc in symbols.items():
-                            rows.append({'카드': str(card), '채점영역': str(area_name),
-                                         '기호': str(sym), '점수': sc})
-            return _ensure_required(pd.DataFrame(rows))
-
-        for key in ('records','data','rows'):
-            if isinstance(raw.get(key), list):
-                df = pd.DataFrame(raw[key])
-                return _ensure_required(df)
-
-        raise ValueError(f"{path.name} 을(를) DataFrame으로 변환할 수 없습니다.")
-
-    if isinstance(raw, list):
-        df = pd.DataFrame(raw)
-        rename = {
-            'card':'카드','Card':'카드','card_id':'카드',
-            'token':'토큰','Token':'토큰',
-            'pos':'품사','POS':'품사',
-            'score':'점수','Score':'점수'
-        }
-        df = df.rename(columns=rename)
-        return _ensure_required(df)
-
-    raise ValueError(f"{path.name} 을(를) DataFrame으로 변환할 수 없습니다.")
-
-STOPWORDS = set([
-    '이','그','저','나','너','그것','이것','저것','들','\n','때','것','그리고','하지만','또는','즉','그렇지','그래서','그러므로',
-    '대해','대하여','위해','때문에','그런데','근데','이런','저런','그런','같은','처럼','듯','도','만','또','조차','까지',
-    '네','예','수검자','검사자','있다','보이다','Q','A','반응반복','같다','하다','반응','반복','부분','여기','이렇게','거','그렇다','어떻다','얘','보다'
-])
-
-try:
-    from konlpy.tag import Okt
-    _OKT = Okt()
-
-    def _preprocess_text(text: str) -> str:
-        text = re.sub(r'[^\w\sㄱ-ㅎㅏ-ㅣ가-힣]', ' ', str(text))
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-
-    def tokenize_with_pos(text: str):
-        text = _preprocess_text(text)
-        target_pos = {'Noun','Verb','Adjective','Adverb'}
-        return [(w, p) for (w, p) in _OKT.pos(text, stem=True) if (p in target_pos and w not in STOPWORDS)]
-except Exception:
-    def _preprocess_text(text: str) -> str:
-        text = re.sub(r'[^\w\sㄱ-ㅎㅏ-ㅣ가-힣]', ' ', str(text))
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    def tokenize_with_pos(text: str):
-        text = _preprocess_text(text)
-        toks = [t for t in re.split(r'\s+', text) if t and t not in STOPWORDS]
-        toks = [t for t in toks if len(t) >= 2]
-        return [(t, 'Noun') for t in toks]
-
-def _apply_pair_into_determinants(row):
-    det = str(row.get('결정인') or '').strip()
-    val2 = row.get('(2)')
-    val2 = (str(int(val2)).strip() if (val2 not in (None, '', ' ') and not pd.isna(val2)) else '')
-    det_tokens = [x.strip() for x in re.split(r'[,.]', det) if x.strip()]
-    if val2 and val2 not in det_tokens:
-        det_tokens.append(val2)
-    row['결정인'] = ', '.join(det_tokens) if det_tokens else np.nan
-    return row
-
-def _calculate_token_score(df, token_freq_df, token_column_name, score_column_name):
-    tf = token_freq_df.copy()
-    tf['토큰_튜플'] = list(zip(tf['토큰'], tf['품사']))
-    token_score_map = tf.set_index(['카드', '토큰_튜플'])['점수'].to_dict()
-
-    def compute_row(row):
-        card = str(row['카드'])
-        tokens = row.get(token_column_name) or []
-        uniq = set(tokens)
-        total = 0
-        for tok in uniq:
-            total += token_score_map.get((card, tok), 2)
-        return total
-
-    df[score_column_name] = df.apply(compute_row, axis=1)
-    return df
-
-def _apply_symbol_score(df, score_table_df):
-    areas = ['결정인', '내용인', '특수점수']
-    score_dict = {col: [] for col in areas}
-    lookup = score_table_df.set_index(['카드','채점영역','기호'])['점수'].to_dict()
-
-    for _, row in df.iterrows():
-        card = str(row['카드'])
-        for area in areas:
-            score = 0
-            cell = row.get(area)
-            if pd.isna(cell) or cell in (None, ''):
-                score_dict[area].append(0)
-                continue
-            symbols = [s.strip() for s in str(cell).split(',') if s.strip()]
-            for sym in symbols:
-                score += lookup.get((card, area, sym), 2)
-            score_dict[area].append(score)
-
-    for area in areas:
-        df[f'{area}_점수'] = score_dict[area]
-    return df
+_BLEND_COLOR = {'FC', 'CF', 'C'}
+_BLEND_SHADING = {"FC'", "C'F", "C'", 'FT', 'TF', 'T', 'FV', 'VF', 'V', 'FY', 'YF', 'Y'}
 
 def _count_col_shd_blends(codes):
-    color = {'FC', 'CF', 'C'}
-    shading = {"FC'", "C'F", "C'", 'FT', 'TF', 'T', 'FV', 'VF', 'V', 'FY', 'YF', 'Y'}
+    # 결정인 저장값(det_mask, split_codes)과 달리 공백과 ';' '+' '/' 도 구분자로 본다 ('FC FT', 'CF/FY')
     cnt = 0
     for rc in codes:
-        det_raw = (getattr(rc, 'determinants', '') or '')
-        toks = [t.strip().upper() for t in re.split(r"[.,\s;+/]+", det_raw) if t.strip()]
-        if any(t in color for t in toks) and any(t in shading for t in toks):
+        toks = {t.upper() for t in re.split(r"[.,\s;+/]+", rc.determinants or '') if t}
+        if toks & _BLEND_COLOR and toks & _BLEND_SHADING:
             cnt += 1
     return cnt
 
-def compute_projection_metrics(response_codes):
-    df_raw = pd.DataFrame([{
-        'ID': getattr(rc.client, 'id', None),
-        '카드': normalize_card_to_num(rc.card),
+def _projection_raw_frame(response_codes):
+    return pd.DataFrame([{
+        'ID': rc.client_id,
+        '카드': card_key(rc.card_num, rc.card),
         'N': rc.response_num,
         '반응': rc.response,
         '질문': rc.inquiry,
         '결정인': rc.determinants,
         '(2)': rc.pair,
         '내용인': rc.content,
-        '특수점수': (special := _normalize_special_tokens(rc.special or '')),
+        '특수점수': _normalize_special_tokens(rc.special or ''),
         'Card': to_roman(rc.card),
         'time': rc.time, 'V': rc.rotation, 'Location': rc.location, 'loc_num': rc.loc_num,
         'Dev Qual': rc.dev_qual, 'Form Quality': rc.form_qual,
         'P': rc.popular, 'Z': rc.Z,
     } for rc in response_codes])
 
-    df_proc = df_raw[['ID','카드','N','반응','질문','결정인','(2)','내용인','특수점수']].copy()
-    df_proc = df_proc.apply(_apply_pair_into_determinants, axis=1).drop(columns=['(2)'])
-
-    rsp_score = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES['response_score'],
-                              required_cols=['카드','토큰','품사','점수'])
-    inq_score = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES['inquiry_score'],
-                              required_cols=['카드','토큰','품사','점수'])
-    sym_score = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES['symbol_score'],
-                              required_cols=['카드','채점영역','기호','점수'])
-    sc_stats  = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES['score_stats'],
-                              required_cols=['카드','채점영역','mean','std'])
-    idx_stats = _read_json_df(RESOURCE_DIR / RESOURCE_FILENAMES['index_stats'],
-                              required_cols=['카드','mean','std'])
-    for _df in (rsp_score, inq_score, sym_score, sc_stats, idx_stats):
-        _df['카드'] = _df['카드'].astype(str)
-
-    df_proc['RESPONSE_토큰'] = df_raw['반응'].apply(lambda x: list(set(tokenize_with_pos(x))))
-    df_proc['INQUIRY_토큰']  = df_raw['질문'].apply(lambda x: list(set(tokenize_with_pos(x))))
-
-    df_sc = _calculate_token_score(df_proc.copy(), rsp_score, 'RESPONSE_토큰', 'RESPONSE_점수')
-    df_sc = _calculate_token_score(df_sc,          inq_score,  'INQUIRY_토큰',  'INQUIRY_점수')
-    df_sc  = _apply_symbol_score(df_sc, sym_score)
-
-    mean_df = sc_stats.pivot(index='카드', columns='채점영역', values='mean')
-    std_df  = sc_stats.pivot(index='카드', columns='채점영역', values='std')
-    for a in ['RESPONSE_점수','INQUIRY_점수','결정인_점수','내용인_점수','특수점수_점수']:
-        colz = f'{a}_z'
-        if a in df_sc.columns and a in mean_df.columns:
-            def _z(r, aa=a):
-                c = str(r['카드'])
-                try:
-                    m = float(mean_df.loc[c, aa]); s = float(std_df.loc[c, aa])
-                    return (r[aa]-m)/s if s else 0.0
-                except Exception:
-                    return 0.0
-            df_sc[colz] = df_sc.apply(_z, axis=1)
-        else:
-            df_sc[colz] = 0.0
-    z_cols = ['결정인_점수_z','내용인_점수_z','특수점수_점수_z','INQUIRY_점수_z','RESPONSE_점수_z']
-    df_sc['투사지수_final'] = df_sc[z_cols].sum(axis=1)
-
-    df_sc = df_sc.merge(idx_stats, on='카드', how='left')
-    df_sc['std']  = df_sc['std'].replace(0, np.nan).fillna(1.0)
-    df_sc['mean'] = df_sc['mean'].fillna(0.0)
-    df_sc['투사지수_T'] = 50 + 10*(df_sc['투사지수_final'] - df_sc['mean'])/df_sc['std']
-    df_sc = df_sc.drop(columns=['mean','std'])
-
-    df_card_avg = (df_sc.groupby(['ID','카드'], as_index=False)
-                      .agg(투사지수_T평균=('투사지수_T','mean')))
-    df_card_avg['카드'] = pd.to_numeric(df_card_avg['카드'], errors='coerce').fillna(0).astype(int)
-    df_card_avg = df_card_avg.sort_values(['ID','카드'])
-    t_map = {int(k): float(v) for k, v in zip(df_card_avg['카드'], df_card_avg['투사지수_T평균'])}
-    overall_t = float(df_card_avg['투사지수_T평균'].mean()) if not df_card_avg.empty else float(df_sc['투사지수_T'].mean())
-
+def _projection_output(df_sc, df_raw):
+    """반응별 점수 표 + 원자료 열 → '반응별 정보' 시트용 표 (카드, N 순)."""
     df_sc['카드']  = df_sc['카드'].astype(str)
     df_raw['카드'] = df_raw['카드'].astype(str)
     df_sc['N']    = pd.to_numeric(df_sc['N'], errors='coerce')
@@ -573,13 +353,33 @@ def compute_projection_metrics(response_codes):
     df_sc = df_sc.merge(df_raw[right_cols], on=['카드','N'], how='left')
 
     df_sc['카드'] = pd.to_numeric(df_sc['카드'], errors='coerce').fillna(0).astype(int)
-    df_sc = df_sc.sort_values(['카드','N'], kind='mergesort')
-    df_out = df_sc
-
-    return overall_t, t_map, df_out
+    return df_sc.sort_values(['카드','N'], kind='mergesort')
 
-def _add_upper_sheet(wb, structural_summary):
-    ws = wb.create_sheet(title='상단부')
+def compute_projection_metrics(response_codes):
+    """투사지표를 처음부터 계산. 반환: (전체 T 평균, {카드: T 평균}, 반응별 표)"""
+    response_codes = list(response_codes)
+    df_raw = _projection_raw_frame(response_codes)
+    df_sc = score_frame(response_frame(response_codes))
+    overall_t, t_map = card_t_summary(df_sc)
+    return overall_t, t_map, _projection_output(df_sc, df_raw)
+
+def stored_projection_metrics(snapshot):
+    """
+    스냅숏의 반응별 투사 점수(ProjectionScore)와 요약의 카드별 T 평균으로 compute_projection_metrics 와
+    같은 결과를 만든다 (ProtocolSnapshot.load 가 없거나 오래된 점수를 미리 다시 계산해 둔다).
+    """
+    if snapshot.projection_scores is None:
+        raise ValueError("투사 점수가 없습니다.")
+    response_codes, structural_summary = snapshot.responses, snapshot.summary
+    scores = snapshot.projection_scores
+    df_raw = _projection_raw_frame(response_codes)
+    df_sc = df_raw[['ID','카드','N','반응','질문']].copy()
+    for column, field in PROJECTION_FIELDS.items():
+        df_sc[column] = [getattr(scores[rc.pk], field) for rc in response_codes]
+    card_t = {int(k): v for k, v in (structural_summary.projection_card_t or {}).items()}
+    return structural_summary.projection_t, card_t, _projection_output(df_sc, df_raw)
+
+def _draw_upper_layout(ws):
     ws.sheet_view.showGridLines = False
     ws.merge_cells('A4:B4'); ws.merge_cells('A14:B14'); ws.merge_cells('A20:D20')
     ws.merge_cells('F4:H4'); ws.merge_cells('G5:H5'); ws.merge_cells('J4:K4')
@@ -606,10 +406,46 @@ def _add_upper_sheet(wb, structural_summary):
     ws['A15']='+'; ws['A16']='o'; ws['A17']='v/+'; ws['A18']='v'
     ws['B21']='FQx'; ws['C21']='MQual'; ws['D21']='W+D'
     ws['A22']='+'; ws['A23']='o'; ws['A24']='u'; ws['A25']='-'; ws['A26']='none'
+    ws['B6'].number_format = '0.0'; ws['B7'].number_format = '0.0'
+
+    fields = ['M','FM','m',"FC","CF","C","Cn","FC'","C'F","C'",
+              'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','(2)']
+    for r, name in enumerate(fields, start=6):
+        ws.cell(row=r, column=7, value=name)
+
+    cont_names = ['H','(H)','Hd','(Hd)','Hx','A','(A)','Ad','(Ad)','An',
+                  'Art','Ay','Bl','Bt','Cg','Cl','Ex','Fd','Fi','Ge','Hh','Ls',
+                  'Na','Sc','Sx','Xy','Id']
+    for r, name in enumerate(cont_names, start=5):
+        ws.cell(row=r, column=10, value=name)
+
+    for i, label in enumerate(['I','II','III','IV','V','VI','VII','VIII','IX','X'], start=5):
+        ws.cell(row=i, column=13, value=label)
 
+    ws['N17']='Lvl-1'
+    ws['O17']='Lvl-2'
+    for i, name in enumerate(['DV','INC','DR','FAB','ALOG','CON'], start=18):
+        ws.cell(row=i, column=13, value=name)  # M열 라벨
+        ws.cell(row=i, column=14).number_format = '0'  # N열 값 포맷
+    for i in range(18, 22):
+        ws.cell(row=i, column=15).number_format = '0'  # O열 값 포맷
+    ws['M24'] = 'Raw Sum6'; ws['M25'] = 'Weighted Sum6'
+    ws['M26'] = 'AB';       ws['M27'] = 'AG'
+    ws['M28'] = 'COP';      ws['M29'] = 'CP'
+    for r in range(24, 30):
+        ws.cell(row=r, column=14).number_format = '0'  # N열 값 포맷
+
+    ws['O26'] = 'GHR'; ws['O27'] = 'PHR'; ws['O28'] = 'MOR'; ws['O29'] = 'PER'; ws['O30'] = 'PSV'
+    for r in range(26, 31):
+        ws.cell(row=r, column=16).number_format = '0'  # P열 값 포맷
+
+UPPER_SHEET = SheetSkeleton('상단부', _draw_upper_layout)
+
+def _add_upper_sheet(wb, structural_summary):
+    ws = UPPER_SHEET.create_sheet(wb)
     ws['B5']  = structural_summary.Zf
-    ws['B6']  = structural_summary.Zsum; ws['B6'].number_format = '0.0'
-    ws['B7']  = structural_summary.Zest; ws['B7'].number_format = '0.0'
+    ws['B6']  = structural_summary.Zsum
+    ws['B7']  = structural_summary.Zest
     ws['B9']  = structural_summary.W;   ws['B10'] = structural_summary.D
     ws['B11'] = structural_summary.Dd;  ws['B12'] = structural_summary.S
 
@@ -644,76 +480,48 @@ def _add_upper_sheet(wb, structural_summary):
         ws.cell(row=row, column=6, value=b)  # column=6 → 'F'
         row += 1
 
-    fields = ['M','FM','m',"FC","CF","C","Cn","FC'","C'F","C'",
-              'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','(2)']
     real_field = ['M','FM','m_l','FC','CF','C','Cn','FCa','CaF','Ca',
                   'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','pair']
     r = 6
-    for name in fields:
-        ws.cell(row=r, column=7, value=name); r += 1
-    r = 6
     for fname in real_field:
         ws.cell(row=r, column=8, value=getattr(structural_summary, fname)); r += 1
 
-    cont_names = ['H','(H)','Hd','(Hd)','Hx','A','(A)','Ad','(Ad)','An',
-                  'Art','Ay','Bl','Bt','Cg','Cl','Ex','Fd','Fi','Ge','Hh','Ls',
-                  'Na','Sc','Sx','Xy','Id']
     cont_real  = ['H','H_paren','Hd','Hd_paren','Hx','A','A_paren','Ad','Ad_paren','An',
                   'Art','Ay','Bl','Bt','Cg','Cl','Ex','Fd_l','Fi','Ge','Hh','Ls',
                   'Na','Sc','Sx','Xy','Idio']
     r = 5
-    for name in cont_names:
-        ws.cell(row=r, column=10, value=name); r += 1
-    r = 5
     for fname in cont_real:
         ws.cell(row=r, column=11, value=getattr(structural_summary, fname)); r += 1
 
-    header_cell(ws, 'M4', 'approach')
-    for i, label in enumerate(['I','II','III','IV','V','VI','VII','VIII','IX','X'], start=5):
-        ws.cell(row=i, column=13, value=label)
     ws['N5']=structural_summary.app_I;   ws['N6']=structural_summary.app_II
     ws['N7']=structural_summary.app_III; ws['N8']=structural_summary.app_IV
     ws['N9']=structural_summary.app_V;   ws['N10']=structural_summary.app_VI
     ws['N11']=structural_summary.app_VII;ws['N12']=structural_summary.app_VIII
     ws['N13']=structural_summary.app_IX; ws['N14']=structural_summary.app_X
 
-    header_cell(ws, 'M16', 'Special Scores')
-    ws['N17']='Lvl-1'
-    ws['O17']='Lvl-2'
-    for i, name in enumerate(['DV','INC','DR','FAB','ALOG','CON'], start=18):
-        ws.cell(row=i, column=13, value=name)  # M열 라벨
-
     for i, fn in enumerate(['sp_dv','sp_inc','sp_dr','sp_fab','sp_alog','sp_con'], start=18):
-        c = ws.cell(row=i, column=14, value=getattr(structural_summary, fn))  # N열 값
-        c.number_format = '0'
-
+        ws.cell(row=i, column=14, value=getattr(structural_summary, fn))  # N열 값
     for i, fn in enumerate(['sp_dv2','sp_inc2','sp_dr2','sp_fab2'], start=18):
-        c = ws.cell(row=i, column=15, value=getattr(structural_summary, fn))  # O열 값
-        c.number_format = '0'
-    ws['M24'] = 'Raw Sum6';      ws['N24'] = structural_summary.sum6
-    ws['M25'] = 'Weighted Sum6'; ws['N25'] = structural_summary.wsum6
-    ws['M26'] = 'AB';            ws['N26'] = structural_summary.sp_ab
-    ws['M27'] = 'AG';            ws['N27'] = structural_summary.sp_ag
-    ws['M28'] = 'COP';           ws['N28'] = structural_summary.sp_cop
-    ws['M29'] = 'CP';            ws['N29'] = structural_summary.sp_cp
-    for r in range(24, 30):
-        ws.cell(row=r, column=14).number_format = '0'  # N열 값 포맷
-
-    ws['O26'] = 'GHR'; ws['P26'] = structural_summary.sp_ghr
-    ws['O27'] = 'PHR'; ws['P27'] = structural_summary.sp_phr
-    ws['O28'] = 'MOR'; ws['P28'] = structural_summary.sp_mor
-    ws['O29'] = 'PER'; ws['P29'] = structural_summary.sp_per
-    ws['O30'] = 'PSV'; ws['P30'] = structural_summary.sp_psv
-    for r in range(26, 31):
-        ws.cell(row=r, column=16).number_format = '0'  # P열 값 포맷
+        ws.cell(row=i, column=15, value=getattr(structural_summary, fn))  # O열 값
+    ws['N24'] = structural_summary.sum6
+    ws['N25'] = structural_summary.wsum6
+    ws['N26'] = structural_summary.sp_ab
+    ws['N27'] = structural_summary.sp_ag
+    ws['N28'] = structural_summary.sp_cop
+    ws['N29'] = structural_summary.sp_cp
+
+    ws['P26'] = structural_summary.sp_ghr
+    ws['P27'] = structural_summary.sp_phr
+    ws['P28'] = structural_summary.sp_mor
+    ws['P29'] = structural_summary.sp_per
+    ws['P30'] = structural_summary.sp_psv
 
     for col_cells in ws.columns:
         length = max(len(str(c.value)) for c in col_cells)
         ws.column_dimensions[col_cells[0].column_letter].width = max(8, min(32, int(length*1.2)))
     return ws
 
-def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None):
-    wsd = wb.create_sheet(title='하단부')
+def _draw_lower_layout(wsd):
     wsd.sheet_view.showGridLines = False
     wsd.merge_cells('A3:F3'); wsd.merge_cells('H3:I3'); wsd.merge_cells('K3:N3')
     wsd.merge_cells('A14:D14'); wsd.merge_cells('F14:G14'); wsd.merge_cells('I14:J14'); wsd.merge_cells('L14:M14')
@@ -737,6 +545,39 @@ def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None)
     wsd['A8']='FM'; wsd['A9']='m'; wsd['C8']="SumC'"; wsd['C9']='SumV'
     wsd['E8']='SumT'; wsd['E9']='SumY'
 
+    wsd['H4']='FC:CF+C'; wsd['H5']='Pure C'; wsd['H6']="SumC':WsumC"
+    wsd['H7']='Afr';     wsd['H8']='S';       wsd['H9']='Blends:R'; wsd['H10']='CP'
+    wsd['I7'].number_format="0.##;-0.##;0"
+
+    wsd['K4']='COP'; wsd['M4']='AG'
+    wsd['K5']='GHR:PHR'; wsd['K6']='a:p'; wsd['K7']='Food'
+    wsd['K8']='SumT';    wsd['K9']='Human Content'; wsd['K10']='Pure H'
+    wsd['K11']='PER';    wsd['K12']='Isolation Index'
+
+    wsd['A15']='a:p'; wsd['A16']='Ma:Mp'; wsd['A17']='Intel(2AB+Art+Ay)'; wsd['A18']='MOR'
+    wsd['C15']='Sum6'; wsd['C16']='Lvl-2'; wsd['C17']='Wsum6'; wsd['C18']='M-'; wsd['C19']='M none'
+
+    med_labels  = ['XA%','WDA%','X-%','S-','P','X+%','Xu%']                # F열(6)
+    proc_labels = ['Zf','W:D:Dd','W:M','Zd','PSV','DQ+','DQv']             # I열(9)
+    self_labels = ['Ego[3r+(2)/R]','Fr+rF','SumV','FD','An+Xy','MOR','H:(H)+Hd+(Hd)']  # L열(12)
+    for r, lbl in enumerate(med_labels, start=15):  wsd.cell(row=r, column=6, value=lbl)
+    for r, lbl in enumerate(proc_labels, start=15): wsd.cell(row=r, column=9, value=lbl)
+    for r, lbl in enumerate(self_labels, start=15): wsd.cell(row=r, column=12, value=lbl)
+
+    for rr in range(15, 22):
+        for cc in (6, 7, 9, 10, 12, 13):
+            wsd.cell(row=rr, column=cc).alignment = Alignment(horizontal='center', vertical='center')
+
+    for col in (1,3,6,9,12,15):
+        c = wsd.cell(row=LOWER_INDEX_ROW, column=col)
+        c.font = HDR_FONT
+        c.alignment = Alignment(horizontal='center')
+
+LOWER_INDEX_ROW = 22
+LOWER_SHEET = SheetSkeleton('하단부', _draw_lower_layout)
+
+def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None):
+    wsd = LOWER_SHEET.create_sheet(wb)
     wsd['B4']=structural_summary.R;         wsd['D4']=structural_summary.L
     wsd['B5']=structural_summary.ErleBnistypus
     wsd['B6']=structural_summary.eb
@@ -747,37 +588,22 @@ def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None)
     wsd['D8']=structural_summary.sum_Ca;    wsd['D9']=structural_summary.sum_V
     wsd['F8']=structural_summary.sum_T;     wsd['F9']=structural_summary.sum_Y
 
-    wsd['H4']='FC:CF+C'; wsd['H5']='Pure C'; wsd['H6']="SumC':WsumC"
-    wsd['H7']='Afr';     wsd['H8']='S';       wsd['H9']='Blends:R'; wsd['H10']='CP'
     wsd['I4']=structural_summary.f_c_prop;    wsd['I5']=structural_summary.pure_c
-    wsd['I6']=structural_summary.ca_c_prop;   wsd['I7']=structural_summary.afr; wsd['I7'].number_format="0.##;-0.##;0"
+    wsd['I6']=structural_summary.ca_c_prop;   wsd['I7']=structural_summary.afr
     wsd['I8']=structural_summary.S;          wsd['I9']=structural_summary.blends_r
     wsd['I10']=structural_summary.sp_cp
 
-    wsd['K4']='COP'; wsd['M4']='AG'
-    wsd['K5']='GHR:PHR'; wsd['K6']='a:p'; wsd['K7']='Food'
-    wsd['K8']='SumT';    wsd['K9']='Human Content'; wsd['K10']='Pure H'
-    wsd['K11']='PER';    wsd['K12']='Isolation Index'
     wsd['L4']=structural_summary.sp_cop;   wsd['N4']=structural_summary.sp_ag
     wsd['M5']=structural_summary.GHR_PHR;  wsd['M6']=structural_summary.a_p
     wsd['M7']=structural_summary.Fd_l;     wsd['M8']=structural_summary.sum_T
     wsd['M9']=structural_summary.human_cont; wsd['M10']=structural_summary.H
     wsd['M11']=structural_summary.sp_per;    wsd['M12']=structural_summary.Isol
 
-    wsd['A15']='a:p'; wsd['A16']='Ma:Mp'; wsd['A17']='Intel(2AB+Art+Ay)'; wsd['A18']='MOR'
-    wsd['C15']='Sum6'; wsd['C16']='Lvl-2'; wsd['C17']='Wsum6'; wsd['C18']='M-'; wsd['C19']='M none'
     wsd['B15']=structural_summary.a_p;   wsd['B16']=structural_summary.Ma_Mp
     wsd['B17']=structural_summary.intel; wsd['B18']=structural_summary.sp_mor
     wsd['D15']=structural_summary.sum6;  wsd['D16']=structural_summary.Lvl_2
     wsd['D17']=structural_summary.wsum6; wsd['D18']=structural_summary.mq_minus; wsd['D19']=structural_summary.mq_none
 
-    med_labels  = ['XA%','WDA%','X-%','S-','P','X+%','Xu%']                # F열(6)
-    proc_labels = ['Zf','W:D:Dd','W:M','Zd','PSV','DQ+','DQv']             # I열(9)
-    self_labels = ['Ego[3r+(2)/R]','Fr+rF','SumV','FD','An+Xy','MOR','H:(H)+Hd+(Hd)']  # L열(12)
-    for r, lbl in enumerate(med_labels, start=15):  wsd.cell(row=r, column=6, value=lbl)
-    for r, lbl in enumerate(proc_labels, start=15): wsd.cell(row=r, column=9, value=lbl)
-    for r, lbl in enumerate(self_labels, start=15): wsd.cell(row=r, column=12, value=lbl)
-
     for i, (lbl, attr) in enumerate(
         [('XA%','xa_per'),('WDA%','wda_per'),('X-%','x_minus_per'),('S-','s_minus'),
          ('P','popular'),('X+%','x_plus_per'),('Xu%','xu_per')], start=15):
@@ -790,11 +616,7 @@ def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None)
     for i, attr in enumerate(['ego','fr_rf','sum_V','fdn','an_xy','sp_mor','h_prop'], start=15):
         wsd.cell(row=i, column=13, value=getattr(structural_summary, attr))
 
-    for rr in range(15, 22):
-        for cc in (6, 7, 9, 10, 12, 13):
-            wsd.cell(row=rr, column=cc).alignment = Alignment(horizontal='center', vertical='center')
-
-    row0 = 22
+    row0 = LOWER_INDEX_ROW
     def cb(txt, pos): return f"☑ {txt}" if pos else txt
     pti_pos  = (structural_summary.sumPTI >= 3)
     depi_pos = (structural_summary.sumDEPI >= 5)
@@ -804,15 +626,12 @@ def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None)
     obs_pos  = bool(structural_summary.OBS_posi)
     obs_score = sum(1 for ch in (structural_summary.OBS or '') if ch == 'o')
 
-    wsd.cell(row=row0, column=1,  value=cb(f"PTI={structural_summary.sumPTI}", pti_pos)).font = HDR_FONT
-    hvi_cell = wsd.cell(row=row0, column=3, value=cb(f"HVI={structural_summary.sumHVI}", hvi_pos))
-    hvi_cell.font = HDR_FONT
-    wsd.cell(row=row0, column=6,  value=cb(f"DEPI={structural_summary.sumDEPI}", depi_pos)).font = HDR_FONT
-    wsd.cell(row=row0, column=9,  value=cb(f"OBS={obs_score}", obs_pos)).font = HDR_FONT
-    wsd.cell(row=row0, column=12, value=cb(f"CDI={structural_summary.sumCDI}", cdi_pos)).font = HDR_FONT
-    wsd.cell(row=row0, column=15, value=cb(f"S-CON={structural_summary.sumSCON}", scon_pos)).font = HDR_FONT
-    for col in (1,3,6,9,12,15):
-        wsd.cell(row=row0, column=col).alignment = Alignment(horizontal='center')
+    wsd.cell(row=row0, column=1,  value=cb(f"PTI={structural_summary.sumPTI}", pti_pos))
+    wsd.cell(row=row0, column=3,  value=cb(f"HVI={structural_summary.sumHVI}", hvi_pos))
+    wsd.cell(row=row0, column=6,  value=cb(f"DEPI={structural_summary.sumDEPI}", depi_pos))
+    wsd.cell(row=row0, column=9,  value=cb(f"OBS={obs_score}", obs_pos))
+    wsd.cell(row=row0, column=12, value=cb(f"CDI={structural_summary.sumCDI}", cdi_pos))
+    wsd.cell(row=row0, column=15, value=cb(f"S-CON={structural_summary.sumSCON}", scon_pos))
 
     if (overall_t is not None) and (card_t_map is not None):
         row1 = row0 + 2
@@ -837,62 +656,79 @@ def _add_lower_sheet(wb, structural_summary, *, overall_t=None, card_t_map=None)
         wsd.column_dimensions[col_cells[0].column_letter].width = max(8, min(40, int(length*1.2)))
     return wsd
 
-def _add_special_indices_sheet(wb, structural_summary):
-    wsi = wb.create_sheet(title='특수지표')
+def _draw_special_indices_layout(wsi):
     header_cell(wsi, 'A1', "PTI"); header_cell(wsi, 'A9', "DEPI"); header_cell(wsi, 'A20', "CDI")
     header_cell(wsi, 'D1', "S-CON"); header_cell(wsi, 'D17', "HVI"); header_cell(wsi, 'A29', "OBS")
 
     wsi['A2']="XA%<.70 AND WDA%<.75"; wsi['A3']="X-%>0.29"; wsi['A4']="LVL2>2 AND FAB2>0"
     wsi['A5']="R<17 AND Wsum6>12 OR R>16 AND Wsum6>17*"; wsi['A6']="M- > 1 OR X-% > 0.40"; wsi['A7']="TOTAL"
-    r = 2
-    for i in range(0,5):
-        wsi.cell(row=r, column=2, value=("✔" if structural_summary.PTI[i] == "o" else "")); r += 1
-    wsi['B7'] = structural_summary.sumPTI
 
     wsi['A10']="SumV>0 OR FD>2"; wsi['A11']="Col-shd blends>0 OR S>2"
     wsi['A12']="ego sup AND Fr+rF=0 OR ego inf"; wsi['A13']="Afr<0.46 OR Blends<4"
     wsi['A14']="SumShd>FM+m OR SumC'>2"; wsi['A15']="MOR>2 OR INTELL>3"; wsi['A16']="COP<2 OR ISOL>0.24"
     wsi['A17']="TOTAL"; wsi['A18']="POSITIVE?"
-    r = 10
-    for i in range(0,7):
-        wsi.cell(row=r, column=2, value=("✔" if structural_summary.DEPI[i] == "o" else "")); r += 1
-    wsi['B17']=structural_summary.sumDEPI; wsi['B18']=structural_summary.sumDEPI >= 5
 
     wsi['A21']="EA<6 OR Daj<0"; wsi['A22']="COP<2 AND AG<2"; wsi['A23']="WSumC<2.5 OR Afr<0.46"
     wsi['A24']="p > a+1 OR pure H<2"; wsi['A25']="SumT>1 OR ISOL>0.24 OR Fd>0"
     wsi['A26']="TOTAL"; wsi['A27']="POSITIVE?"
-    r = 21
-    for i in range(0,5):
-        wsi.cell(row=r, column=2, value=("✔" if structural_summary.CDI[i] == "o" else "")); r += 1
-    wsi['B26']=structural_summary.sumCDI; wsi['B27']=structural_summary.sumCDI >= 4
 
     labels = ["SumV+FD>2","col-shd blends>0","ego <0.31 ou >0.44","mor>3","Zd>3.5 ou <-3.5",
               "es>EA","CF+C>FC","X+%<0.70","S>3","P<3 OU P>8","PURE H<2","R<17"]
     for i, txt in enumerate(labels, start=2):
         wsi.cell(row=i, column=4, value=txt)
-        wsi.cell(row=i, column=5, value=("✔" if structural_summary.SCON[i-2] == "o" else ""))
-
-    wsi['D14'] = "TOTAL";      wsi['E14']=structural_summary.sumSCON
-    wsi['D15'] = "POSITIVE?";  wsi['E15']=structural_summary.sumSCON >= 8
+    wsi['D14'] = "TOTAL"
+    wsi['D15'] = "POSITIVE?"
 
     hvi_txt = ['SumT = 0','Zf>12','Zd>3.5','S>3','H+(H)+Hd+(Hd)>6','(H)+(A)+(Hd)+(Ad)>3','H+A : 4:1','Cg>3']
-    wsi['D18'] = hvi_txt[0]; wsi['E18']=structural_summary.HVI_premise
+    wsi['D18'] = hvi_txt[0]
     for i, txt in enumerate(hvi_txt[1:], start=19):  # 19~25
         wsi.cell(row=i, column=4, value=txt)
-        wsi.cell(row=i, column=5, value=("✔" if structural_summary.HVI[i-19] == "o" else ""))
-
-    wsi['D26'] = "TOTAL";      wsi['E26']=structural_summary.sumHVI
-    wsi['D27'] = "POSITIVE?";  wsi['E27']=(structural_summary.sumHVI >= 4) and bool(structural_summary.HVI_premise)
+    wsi['D26'] = "TOTAL"
+    wsi['D27'] = "POSITIVE?"
 
     obs_l = [(1,"Dd>3"),(2,"Zf>12"),(3,"Zd>3.0"),(4,"P>7"),(5,"FQ+>1")]
     for i,(n,txt) in enumerate(obs_l, start=30):
         wsi.cell(row=i, column=1, value=n); wsi.cell(row=i, column=2, value=txt)
-        wsi.cell(row=i, column=3, value=("✔" if structural_summary.OBS[i-30] == "o" else ""))
     obs2 = ["1-5 are true","FQ+>3 AND 2 items 1-4","X+%>0,89 et 3 items","FQ+>3 et X+%>0,89"]
     for i, txt in enumerate(obs2, start=30):
         wsi.cell(row=i, column=4, value=txt)
+    wsi['D34'] = "POSITIVE?"
+
+SPECIAL_INDICES_SHEET = SheetSkeleton('특수지표', _draw_special_indices_layout)
+
+def _add_special_indices_sheet(wb, structural_summary):
+    wsi = SPECIAL_INDICES_SHEET.create_sheet(wb)
+    r = 2
+    for i in range(0,5):
+        wsi.cell(row=r, column=2, value=("✔" if structural_summary.PTI[i] == "o" else "")); r += 1
+    wsi['B7'] = structural_summary.sumPTI
+
+    r = 10
+    for i in range(0,7):
+        wsi.cell(row=r, column=2, value=("✔" if structural_summary.DEPI[i] == "o" else "")); r += 1
+    wsi['B17']=structural_summary.sumDEPI; wsi['B18']=structural_summary.sumDEPI >= 5
+
+    r = 21
+    for i in range(0,5):
+        wsi.cell(row=r, column=2, value=("✔" if structural_summary.CDI[i] == "o" else "")); r += 1
+    wsi['B26']=structural_summary.sumCDI; wsi['B27']=structural_summary.sumCDI >= 4
+
+    for i in range(2, 14):
+        wsi.cell(row=i, column=5, value=("✔" if structural_summary.SCON[i-2] == "o" else ""))
+    wsi['E14']=structural_summary.sumSCON
+    wsi['E15']=structural_summary.sumSCON >= 8
+
+    wsi['E18']=structural_summary.HVI_premise
+    for i in range(19, 26):
+        wsi.cell(row=i, column=5, value=("✔" if structural_summary.HVI[i-19] == "o" else ""))
+    wsi['E26']=structural_summary.sumHVI
+    wsi['E27']=(structural_summary.sumHVI >= 4) and bool(structural_summary.HVI_premise)
+
+    for i in range(30, 35):
+        wsi.cell(row=i, column=3, value=("✔" if structural_summary.OBS[i-30] == "o" else ""))
+    for i in range(30, 34):
         wsi.cell(row=i, column=5, value=("✔" if structural_summary.OBS[i+5-30] == "o" else ""))
-    wsi['D34'] = "POSITIVE?";  wsi['E34']=structural_summary.OBS_posi
+    wsi['E34']=structural_summary.OBS_posi
 
     for col_cells in wsi.columns:
         length = max(len(str(c.value)) for c in col_cells)
@@ -933,8 +769,71 @@ def _add_raw_responses_sheet(wb, df_out):
         ws_raw.column_dimensions[get_column_letter(col)].width = max(8, min(80, int(max_len * 1.1)))
     return ws_raw
 
-def _add_deviation_sheet(wb, structural_summary, response_codes):
-    wsdev = wb.create_sheet(title='이탈정도')
+# 국제규준 (변인, 평균, 표준편차)
+NORM_SPECS = [
+    ('R', 22.31, 7.90), ('W', 9.08, 4.54), ('D', 9.89, 5.81), ('Dd', 3.33, 3.37),
+    ('S', 2.49, 2.15),
+    ('DQ+', 6.24, 3.54), ('DQo', 14.68, 6.74), ('DQv', 1.09, 1.50), ('DQv/+', 0.29, 0.67),
+    ('FQ+', 0.21, 0.68), ('FQo', 11.11, 3.74), ('FQu', 6.20, 3.93), ('FQ-', 4.43, 3.23), ('FQnone', 0.33, 0.71),
+    ('MQ+', 0.12, 0.43), ('Mqo', 2.26, 1.66), ('Mqu', 0.69, 0.99), ('MQ-', 0.63, 1.05), ('Mqnone', 0.03, 0.20),
+    ('S-', 0.87, 1.15),
+
+    ('M', 3.73, 2.66), ('FM', 3.37, 2.18), ('m', 1.50, 1.54), ('FM+m', 4.87, 2.89),
+    ('FC', 1.91, 1.70), ('CF', 1.65, 1.55), ('C', 0.34, 0.66), ('Cn', 0.02, 0.14),
+    ('SumC', 3.91, 2.53), ('WSumC', 3.11, 2.17), ("SumC'", 1.75, 1.71),
+    ('SumT', 0.65, 0.91), ('SumV', 0.52, 0.92), ('SumY', 1.34, 1.63), ('SumSh', 4.29, 3.48),
+
+    ('Fr+rF', 0.41, 0.88), ('FD', 1.02, 1.19), ('F', 8.92, 5.34), ('2', 7.04, 3.83),
+    ('3r+2/R', 0.38, 0.16), ('Lambda', 0.86, 0.95), ('EA', 6.84, 3.76), ('es', 9.09, 5.04),
+    ('D score', -0.68, 1.48), ('Adj D', -0.20, 1.23),
+
+    ('active', 4.96, 3.08), ('passive', 3.73, 2.65), ('Ma', 2.09, 1.83), ('Mp', 1.67, 1.61),
+    ('Intellect', 2.35, 2.57),
+
+    ('Zf', 12.50, 4.92), ('Zd', -0.67, 4.72),
+
+    ('Blends', 4.01, 2.97), ('Blends/R', 0.18, 0.13), ('Col-Shd Blends', 0.60, 0.92),
+    ('Afr', 0.53, 0.20),
+
+    ('Popular', 5.36, 1.84), ('XA%', 0.79, 0.11), ('WDA%', 0.82, 0.11), ('X+%', 0.52, 0.13), ('X-%', 0.19, 0.11), ('Xu%', 0.27, 0.11),
+    ('Isolate/R', 0.20, 0.14),
+
+    ('H', 2.43, 1.89), ('(H)', 1.22, 1.24), ('Hd', 1.52, 1.71), ('(Hd)', 0.64, 0.92), ('Hx', 0.41, 0.98),
+    ('All H cont', 5.83, 3.51), ('A', 7.71, 3.18), ('(A)', 0.42, 0.73), ('Ad', 2.41, 1.97), ('(Ad)', 0.16, 0.45),
+    ('An', 1.16, 1.42), ('Art', 1.22, 1.45), ('Ay', 0.52, 0.87), ('Bl', 0.25, 0.55), ('Bt', 1.41, 1.44),
+    ('Cg', 1.89, 1.77), ('Cl', 0.18, 0.46), ('Ex', 0.19, 0.48), ('Fi', 0.50, 0.80), ('Fd', 1.02, 1.19),
+    ('Ge', 0.26, 0.62), ('Hh', 0.84, 1.03), ('Ls', 0.87, 1.12), ('Na', 0.75, 1.11), ('Sc', 1.11, 1.35),
+    ('Sx', 0.47, 0.94), ('Xy', 0.19, 0.52), ('Id', 0.89, 1.21),
+
+    ('DV', 0.65, 0.99), ('INC', 0.73, 0.97), ('DR', 0.49, 0.96), ('FAB', 0.45, 0.76),
+    ('DV2', 0.01, 0.14), ('INC2', 0.10, 0.33), ('DR2', 0.06, 0.31), ('FAB2', 0.08, 0.31),
+    ('ALOG', 0.16, 0.46), ('CONTAM', 0.02, 0.13),
+
+    ('Sum6', 2.75, 2.39), ('Lvl 2 Sp Sc', 0.25, 0.62), ('Wsum6', 7.63, 7.75),
+    ('AB', 0.32, 0.82), ('AG', 0.54, 0.86), ('COP', 1.07, 1.18), ('CP', 0.02, 0.15),
+    ('GHR', 3.70, 2.18), ('PHR', 2.86, 2.52), ('MOR', 1.26, 1.43), ('PER', 0.75, 1.12), ('PSV', 0.23, 0.56),
+]
+
+DEC2_KEYS = {
+    "Blends/R","Afr","XA%","WDA%","X+%","X-%","Xu%","Isolate/R",
+    "3r+2/R","Lambda","Zd","active","passive","Ma","Mp"
+}
+
+GRADE_COLOR = {
+    '매우낮음': '92CDDC',
+    '낮음'   : 'B7DEE8',
+    '평균하' : 'DAEEF3',
+    '평균'   : 'E4DFEC',
+    '평균상' : 'F2DCDB',
+    '높음'   : 'E6B8B7',
+    '매우높음': 'DA9694',
+}
+GRADE_FILLS = {
+    label: PatternFill(start_color=color, end_color=color, fill_type='solid')
+    for label, color in GRADE_COLOR.items()
+}
+
+def _draw_deviation_layout(wsdev):
     wsdev.sheet_view.showGridLines = False
 
     TITLE = "규준자료 대비 지표별 백분위 이탈정도 계산파일(국제규준)"
@@ -954,6 +853,49 @@ def _add_deviation_sheet(wb, structural_summary, response_codes):
         c.alignment = Alignment(horizontal='center', vertical='center')
         c.border = Border(top=THIN_EDGE, bottom=THIN_EDGE, left=THIN_EDGE, right=THIN_EDGE)
 
+    for r, (name, mean, std) in enumerate(NORM_SPECS, start=3):
+        wsdev.cell(row=r, column=1, value=r - 2)
+        wsdev.cell(row=r, column=2, value=name)
+        wsdev.cell(row=r, column=4, value=float(mean)).number_format = '0.00'
+        wsdev.cell(row=r, column=5, value=float(std)).number_format = '0.00'
+        wsdev.cell(row=r, column=3).number_format = '0.00' if name in DEC2_KEYS else '0'
+        wsdev.cell(row=r, column=6).number_format = '0.00'
+        wsdev.cell(row=r, column=7).number_format = '0.0%'
+
+    last_row = 2 + len(NORM_SPECS)
+    IDX_FILL  = PatternFill(start_color="EEECE1", end_color="EEECE1", fill_type="solid")
+    META_FILL = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
+    POINT_FILL= PatternFill(start_color="FABF8F", end_color="FABF8F", fill_type="solid")
+
+    for rr in range(3, last_row + 1):
+        wsdev.cell(row=rr, column=1).fill = IDX_FILL
+        for cc in (2, 4, 5, 6, 7):
+            wsdev.cell(row=rr, column=cc).fill = META_FILL
+        wsdev.cell(row=rr, column=3).fill = POINT_FILL
+
+    for rr in range(2, last_row + 1):
+        for cc in range(1, 9):
+            cell = wsdev.cell(row=rr, column=cc)
+            cell.border = Border(left=THIN_EDGE, right=THIN_EDGE, top=THIN_EDGE, bottom=THIN_EDGE)
+            if rr >= 3 and cc in (1, 3, 4, 5, 6, 7):
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+            elif rr >= 3 and cc == 2:
+                cell.alignment = Alignment(horizontal='left', vertical='center')
+            else:
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+
+    widths = [6, 14, 9, 12, 10, 7, 8, 12]
+    for i, w in enumerate(widths, start=1):
+        wsdev.column_dimensions[get_column_letter(i)].width = w
+
+    wsdev.auto_filter.ref = f"A2:H{last_row}"
+    wsdev.freeze_panes = "A3"
+
+DEVIATION_SHEET = SheetSkeleton('이탈정도', _draw_deviation_layout)
+
+def _add_deviation_sheet(wb, structural_summary, response_codes):
+    wsdev = DEVIATION_SHEET.create_sheet(wb)
+
     def _safe_get(obj, name, default=0.0):
         try:
             v = getattr(obj, name)
@@ -991,15 +933,6 @@ def _add_deviation_sheet(wb, structural_summary, response_codes):
         a, b = _parse_ratio_pair(getattr(ss, 'W_M', None))
         return b
 
-    CAT_COLOR = {
-        '매우낮음': '92CDDC',
-        '낮음'   : 'B7DEE8',
-        '평균하' : 'DAEEF3',
-        '평균'   : 'E4DFEC',
-        '평균상' : 'F2DCDB',
-        '높음'   : 'E6B8B7',
-        '매우높음': 'DA9694',
-    }
     def _grade_label(p: float):
         if p < 0.05:  return '매우낮음'
         if p < 0.12:  return '낮음'
@@ -1126,7 +1059,7 @@ def _add_deviation_sheet(wb, structural_summary, response_codes):
 
         'Blends':   _get_blends_count,
         'Blends/R': _get_blends_ratio,
-        'Col-Shd Blends': lambda ss, v=_count_col_shd_blends(response_codes): v,
+        'Col-Shd Blends': lambda ss, v=col_shd_blends_total: v,
 
         'Afr':      lambda ss: _safe_get(ss, 'afr', 0),
 
@@ -1193,52 +1126,7 @@ def _add_deviation_sheet(wb, structural_summary, response_codes):
         'PSV':      lambda ss: _safe_get(ss, 'sp_psv', 0),
     }
 
-    NORM_SPECS = [
-        ('R', 22.31, 7.90), ('W', 9.08, 4.54), ('D', 9.89, 5.81), ('Dd', 3.33, 3.37),
-        ('S', 2.49, 2.15),
-        ('DQ+', 6.24, 3.54), ('DQo', 14.68, 6.74), ('DQv', 1.09, 1.50), ('DQv/+', 0.29, 0.67),
-        ('FQ+', 0.21, 0.68), ('FQo', 11.11, 3.74), ('FQu', 6.20, 3.93), ('FQ-', 4.43, 3.23), ('FQnone', 0.33, 0.71),
-        ('MQ+', 0.12, 0.43), ('Mqo', 2.26, 1.66), ('Mqu', 0.69, 0.99), ('MQ-', 0.63, 1.05), ('Mqnone', 0.03, 0.20),
-        ('S-', 0.87, 1.15),
-
-        ('M', 3.73, 2.66), ('FM', 3.37, 2.18), ('m', 1.50, 1.54), ('FM+m', 4.87, 2.89),
-        ('FC', 1.91, 1.70), ('CF', 1.65, 1.55), ('C', 0.34, 0.66), ('Cn', 0.02, 0.14),
-        ('SumC', 3.91, 2.53), ('WSumC', 3.11, 2.17), ("SumC'", 1.75, 1.71),
-        ('SumT', 0.65, 0.91), ('SumV', 0.52, 0.92), ('SumY', 1.34, 1.63), ('SumSh', 4.29, 3.48),
-
-        ('Fr+rF', 0.41, 0.88), ('FD', 1.02, 1.19), ('F', 8.92, 5.34), ('2', 7.04, 3.83),
-        ('3r+2/R', 0.38, 0.16), ('Lambda', 0.86, 0.95), ('EA', 6.84, 3.76), ('es', 9.09, 5.04),
-        ('D score', -0.68, 1.48), ('Adj D', -0.20, 1.23),
-
-        ('active', 4.96, 3.08), ('passive', 3.73, 2.65), ('Ma', 2.09, 1.83), ('Mp', 1.67, 1.61),
-        ('Intellect', 2.35, 2.57),
-
-        ('Zf', 12.50, 4.92), ('Zd', -0.67, 4.72),
-
-        ('Blends', 4.01, 2.97), ('Blends/R', 0.18, 0.13), ('Col-Shd Blends', 0.60, 0.92),
-        ('Afr', 0.53, 0.20),
-
-        ('Popular', 5.36, 1.84), ('XA%', 0.79, 0.11), ('WDA%', 0.82, 0.11), ('X+%', 0.52, 0.13), ('X-%', 0.19, 0.11), ('Xu%', 0.27, 0.11),
-        ('Isolate/R', 0.20, 0.14),
-
-        ('H', 2.43, 1.89), ('(H)', 1.22, 1.24), ('Hd', 1.52, 1.71), ('(Hd)', 0.64, 0.92), ('Hx', 0.41, 0.98),
-        ('All H cont', 5.83, 3.51), ('A', 7.71, 3.18), ('(A)', 0.42, 0.73), ('Ad', 2.41, 1.97), ('(Ad)', 0.16, 0.45),
-        ('An', 1.16, 1.42), ('Art', 1.22, 1.45), ('Ay', 0.52, 0.87), ('Bl', 0.25, 0.55), ('Bt', 1.41, 1.44),
-        ('Cg', 1.89, 1.77), ('Cl', 0.18, 0.46), ('Ex', 0.19, 0.48), ('Fi', 0.50, 0.80), ('Fd', 1.02, 1.19),
-        ('Ge', 0.26, 0.62), ('Hh', 0.84, 1.03), ('Ls', 0.87, 1.12), ('Na', 0.75, 1.11), ('Sc', 1.11, 1.35),
-        ('Sx', 0.47, 0.94), ('Xy', 0.19, 0.52), ('Id', 0.89, 1.21),
-
-        ('DV', 0.65, 0.99), ('INC', 0.73, 0.97), ('DR', 0.49, 0.96), ('FAB', 0.45, 0.76),
-        ('DV2', 0.01, 0.14), ('INC2', 0.10, 0.33), ('DR2', 0.06, 0.31), ('FAB2', 0.08, 0.31),
-        ('ALOG', 0.16, 0.46), ('CONTAM', 0.02, 0.13),
-
-        ('Sum6', 2.75, 2.39), ('Lvl 2 Sp Sc', 0.25, 0.62), ('Wsum6', 7.63, 7.75),
-        ('AB', 0.32, 0.82), ('AG', 0.54, 0.86), ('COP', 1.07, 1.18), ('CP', 0.02, 0.15),
-        ('GHR', 3.70, 2.18), ('PHR', 2.86, 2.52), ('MOR', 1.26, 1.43), ('PER', 0.75, 1.12), ('PSV', 0.23, 0.56),
-    ]
-
-    r = 3
-    for idx, (name, mean, std) in enumerate(NORM_SPECS, start=1):
+    for r, (name, mean, std) in enumerate(NORM_SPECS, start=3):
         getter = GET.get(name, lambda ss: None)
         score = getter(structural_summary)
         try:
@@ -1253,69 +1141,21 @@ def _add_deviation_sheet(wb, structural_summary, response_codes):
             z = (score - float(mean)) / float(std)
             p = _norm_cdf(z)
 
-        wsdev.cell(row=r, column=1, value=idx)
-        wsdev.cell(row=r, column=2, value=name)
-        wsdev.cell(row=r, column=3, value=score)
-        wsdev.cell(row=r, column=4, value=float(mean))
-        wsdev.cell(row=r, column=5, value=float(std))
-        wsdev.cell(row=r, column=6, value=(0.0 if z is None else z))
-        pct_cell = wsdev.cell(row=r, column=7, value=(0.0 if p is None else p))
-        grade_cell = wsdev.cell(row=r, column=8)
-
-        DEC2_KEYS = {
-            "Blends/R","Afr","XA%","WDA%","X+%","X-%","Xu%","Isolate/R",
-            "3r+2/R","Lambda","Zd","active","passive","Ma","Mp"
-        }
+        score_cell = wsdev.cell(row=r, column=3)
         if score is None:
-            wsdev.cell(row=r, column=3).number_format = '@'
+            score_cell.number_format = '@'
+        elif name in DEC2_KEYS:
+            score_cell.value = round(score, 2)
         else:
-            if name in DEC2_KEYS:
-                wsdev.cell(row=r, column=3, value=round(score, 2)).number_format = '0.00'
-            else:
-                wsdev.cell(row=r, column=3, value=int(round(score))).number_format = '0'
-
-        wsdev.cell(row=r, column=4).number_format = '0.00'
-        wsdev.cell(row=r, column=5).number_format = '0.00'
-        wsdev.cell(row=r, column=6).number_format = '0.00'
-        pct_cell.number_format = '0.0%'
+            score_cell.value = int(round(score))
+        wsdev.cell(row=r, column=6, value=(0.0 if z is None else z))
+        wsdev.cell(row=r, column=7, value=(0.0 if p is None else p))
 
         if p is not None:
             label = _grade_label(p)
-            grade_cell.value = label
-            color = CAT_COLOR.get(label)
-            if color:
-                grade_cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-
-        r += 1
-
-    last_row = wsdev.max_row
-    IDX_FILL  = PatternFill(start_color="EEECE1", end_color="EEECE1", fill_type="solid")
-    META_FILL = PatternFill(start_color="FDE9D9", end_color="FDE9D9", fill_type="solid")
-    POINT_FILL= PatternFill(start_color="FABF8F", end_color="FABF8F", fill_type="solid")
-
-    for rr in range(3, last_row + 1):
-        wsdev.cell(row=rr, column=1).fill = IDX_FILL
-        for cc in (2, 4, 5, 6, 7):
-            wsdev.cell(row=rr, column=cc).fill = META_FILL
-        wsdev.cell(row=rr, column=3).fill = POINT_FILL
+            grade_cell = wsdev.cell(row=r, column=8, value=label)
+            grade_cell.fill = GRADE_FILLS[label]
 
-    for rr in range(2, last_row + 1):
-        for cc in range(1, 9):
-            cell = wsdev.cell(row=rr, column=cc)
-            cell.border = Border(left=THIN_EDGE, right=THIN_EDGE, top=THIN_EDGE, bottom=THIN_EDGE)
-            if rr >= 3 and cc in (1, 3, 4, 5, 6, 7):
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            elif rr >= 3 and cc == 2:
-                cell.alignment = Alignment(horizontal='left', vertical='center')
-            else:
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    widths = [6, 14, 9, 12, 10, 7, 8, 12]
-    for i, w in enumerate(widths, start=1):
-        wsdev.column_dimensions[get_column_letter(i)].width = w
-
-    wsdev.auto_filter.ref = f"A2:H{last_row}"
-    wsdev.freeze_panes = "A3"
     return wsdev
 
 def _append_client_info_sheet(wb, client):
@@ -1366,15 +1206,22 @@ def _append_client_info_sheet(wb, client):
         ws.cell(row=rr, column=2).alignment = Alignment(horizontal='left', vertical='center')
     return ws
 
-def create_advanced_workbook(client, response_codes, structural_summary, *, include_info_sheet=False):
+def create_advanced_workbook(snapshot, *, include_info_sheet=False):
+    """
+    ProtocolSnapshot (10장 카드가 모두 있는) → (고급 내보내기 통합 문서, 완전한지 여부). DB 는 조회하지 않는다.
+    투사지표를 계산하지 못하면 투사지수 열과 T 값을 비운 통합 문서와 False 를 돌려준다.
+    """
+    structural_summary = snapshot.summary
     wb = Workbook()
     if 'Sheet' in wb.sheetnames:
         wb.remove(wb['Sheet'])
 
+    complete = True
     try:
-        overall_t, card_t_map, df_out = compute_projection_metrics(response_codes)
+        overall_t, card_t_map, df_out = stored_projection_metrics(snapshot)
     except Exception:
         logging.exception("투사지표 계산 실패")
+        complete = False
         overall_t, card_t_map, df_out = None, None, pd.DataFrame(columns=[
             '카드','Card','N','time','반응','질문','V','Location','Dev Qual','loc_num',
             '결정인','Form Quality','(2)','내용인','P','Z','특수점수','투사지수_T'
@@ -1384,34 +1231,25 @@ def create_advanced_workbook(client, response_codes, structural_summary, *, incl
     _add_lower_sheet(wb, structural_summary, overall_t=overall_t, card_t_map=card_t_map)
     _add_special_indices_sheet(wb, structural_summary)
     _add_raw_responses_sheet(wb, df_out)
-    _add_deviation_sheet(wb, structural_summary, response_codes)
+    _add_deviation_sheet(wb, structural_summary, snapshot.responses)
 
     if include_info_sheet:
-        _append_client_info_sheet(wb, client)
-    return wb
+        _append_client_info_sheet(wb, snapshot.client)
+    return wb, complete
 
 @group_min_required('advanced')
 def export_structural_summary_xlsx_advanced(request, client_id):
     try:
-        client = Client.objects.get(id=client_id)
+        client = Client.objects.select_related('tester').get(id=client_id)
         if client.tester != request.user:
             return HttpResponse("액세스 거부: 해당 정보를 볼 수 있는 권한이 없습니다.", status=403)
 
-        response_codes = ResponseCode.objects.filter(client_id=client_id)
-
-        numbers_found = {normalize_card_to_num(rc.card) for rc in response_codes if rc.card}
-        required = {str(i) for i in range(1, 11)}
-        missing = sorted(required - numbers_found, key=int)
+        responses = load_responses(client)
+        missing = missing_cards(responses)
         if missing:
             missing_roman = [to_roman(n) for n in missing]
             return HttpResponse("다음 카드의 반응이 없습니다: " + ", ".join(missing_roman))
 
-        structural_summary, _ = StructuralSummary.objects.get_or_create(client_id=client_id)
-        try:
-            structural_summary.calculate_values()
-        except Exception:
-            structural_summary.save()
-
     except Client.DoesNotExist:
         logging.error("해당 ID의 클라이언트를 찾을 수 없음")
         return HttpResponseNotFound("클라이언트 정보를 찾을 수 없습니다.")
@@ -1419,21 +1257,15 @@ def export_structural_summary_xlsx_advanced(request, client_id):
         logging.error(f"예기치 못한 오류 발생: {e}")
         return JsonResponse({'error': f"{type(e).__name__}: {str(e)}"}, status=500)
 
-    wb = create_advanced_workbook(
-        client,
-        response_codes,
-        structural_summary,
+    output = advanced_xlsx_file(
+        client, responses,
         include_info_sheet=(request.user.is_staff),  # 관리자는 정보 시트 포함
     )
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
     safe_name = f"{client.name}_{client.testDate:%Y-%m-%d}.xlsx"
     fallback  = f"{slugify(client.name)}_{client.testDate:%Y-%m-%d}.xlsx"
 
-    response = HttpResponse(
-        output.getvalue(),
+    response = FileResponse(
+        output,
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = (
@@ -1441,12 +1273,22 @@ def export_structural_summary_xlsx_advanced(request, client_id):
     )
     return response
 
-def build_client_xlsx_bytes(client, *, include_info_sheet=False):
-    response_codes = ResponseCode.objects.filter(client=client)
+def advanced_xlsx_file(client, responses, *, include_info_sheet=False):
+    """반응 목록(프로토콜 순, 10장 카드가 모두 있는) → 고급 내보내기 xlsx 파일 객체. 내보내기 캐시를 거친다."""
+    def build():
+        wb, complete = create_advanced_workbook(
+            ProtocolSnapshot.load(client, responses), include_info_sheet=include_info_sheet,
+        )
+        bio = BytesIO()
+        wb.save(bio)
+        return bio.getvalue(), complete  # 투사지표가 빠진 파일은 캐시하지 않는다
 
-    numbers_found = {normalize_card_to_num(rc.card) for rc in response_codes if rc.card}
-    required = {str(i) for i in range(1, 11)}
-    missing = sorted(required - numbers_found, key=int)
+    variant = 'advanced-info' if include_info_sheet else 'advanced'
+    return open_export(client, responses, variant, build)
+
+def build_client_xlsx_bytes(client, *, include_info_sheet=False):
+    responses = load_responses(client)
+    missing = missing_cards(responses)
     if missing:
         missing_roman = [to_roman(n) for n in missing]
         wb = Workbook()
@@ -1462,16 +1304,8 @@ def build_client_xlsx_bytes(client, *, include_info_sheet=False):
         
         return safe_name, bio.getvalue()
 
-    structural_summary, _ = StructuralSummary.objects.get_or_create(client=client)
-    try:
-        structural_summary.calculate_values()
-    except Exception:
-        structural_summary.save()
-
-    wb = create_advanced_workbook(
-        client, response_codes, structural_summary, include_info_sheet=include_info_sheet
-    )
-    bio = BytesIO(); wb.save(bio); bio.seek(0)
+    with advanced_xlsx_file(client, responses, include_info_sheet=include_info_sheet) as f:
+        data = f.read()
 
     if getattr(client, "testDate", None):
         safe_name = f"{client.name}_{client.testDate:%Y-%m-%d}.xlsx"
@@ -1479,7 +1313,7 @@ def build_client_xlsx_bytes(client, *, include_info_sheet=False):
     else:
         safe_name = f"{client.name}.xlsx"
         fallback  = f"{slugify(client.name)}.xlsx"
-    return safe_name, bio.getvalue()
+    return safe_name, data
 
 @group_min_required('advanced')
 def advanced_edit_responses(request, client_id):
@@ -1496,19 +1330,18 @@ def advanced_edit_responses(request, client_id):
         formset = FormSet(request.POST, queryset=qs)
         if formset.is_valid():
             saved = 0
+            changes = []
             for form in formset:
                 if form.cleaned_data.get('card') and form.cleaned_data.get('response'):
+                    before = scoring_record_before(form)
                     inst = form.save(commit=False)
                     inst.client = client
                     inst.card = to_roman(inst.card)
                     inst.save()
+                    changes.append((inst.pk, before, inst.scoring_record()))
                     saved += 1
 
-            structural_summary, _ = StructuralSummary.objects.get_or_create(client=client)
-            try:
-                structural_summary.calculate_values()
-            except Exception:
-                structural_summary.save()
+            StructuralSummary.apply_edits(client, changes)
 
             messages.success(request, f"{saved}건 저장되었습니다.")
             return redirect('scoring:client_detail', client_id=client.id)
@@ -0,0 +1,61 @@
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from ..export_jobs import artifact_path, enqueue, worker_running
+from ..models import Client, ExportJob, ResponseCode
+from ._base import group_min_required, missing_cards, to_roman
+
+
+def job_payload(job):
+    """진행 상황 조회 응답 (완료되면 download_url 포함)."""
+    payload = {
+        'id': job.pk,
+        'status': job.status,
+        'status_label': job.get_status_display(),
+        'done': job.done,
+        'total': job.total,
+        'error': job.error,
+        'status_url': reverse('scoring:export_job_status', args=[job.pk]),
+    }
+    if job.status == ExportJob.DONE:
+        payload['download_url'] = reverse('scoring:download_export_job', args=[job.pk])
+    return payload
+
+
+@group_min_required('advanced')
+@require_POST
+def create_advanced_export_job(request, client_id):
+    client = get_object_or_404(Client, id=client_id, tester=request.user)
+    missing = missing_cards(ResponseCode.objects.filter(client=client))
+    if missing:
+        return JsonResponse(
+            {'error': "다음 카드의 반응이 없습니다: " + ", ".join(to_roman(n) for n in missing)}, status=400,
+        )
+    if not worker_running():
+        # 작업을 처리할 worker 가 없으면 기존 다운로드 주소로 바로 내려받게 한다
+        return JsonResponse({'download_url': reverse('scoring:export_structural_summary_xlsx_advanced', args=[client.pk])})
+    job = enqueue(request.user, [client], include_info_sheet=request.user.is_staff)  # 관리자는 정보 시트 포함
+    return JsonResponse(job_payload(job), status=202)
+
+
+@login_required
+def export_job_status(request, job_id):
+    return JsonResponse(job_payload(_get_job(request, job_id)))
+
+
+@login_required
+def download_export_job(request, job_id):
+    job = _get_job(request, job_id)
+    path = artifact_path(job)
+    if job.status != ExportJob.DONE or not path.exists():
+        raise Http404("내려받을 파일이 없습니다 (아직 진행 중이거나 보관 기간이 지났습니다).")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.file_name)
+
+
+def _get_job(request, job_id):
+    # 관리자는 모든 작업, 그 밖에는 본인이 요청한 작업만
+    jobs = ExportJob.objects.all() if request.user.is_staff else ExportJob.objects.filter(requested_by=request.user)
+    return get_object_or_404(jobs, pk=job_id)
@@ -11,6 +11,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.forms import formset_factory, modelformset_factory
 from django.http import (
+    FileResponse,
     HttpResponse,
     HttpResponseForbidden,
     HttpResponseNotFound,
@@ -27,8 +28,11 @@ from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.styles.borders import Border, Side
 from openpyxl.utils import get_column_letter
 
+from ..export_cache import open_export
 from ..filters import CardImagesFilter, PResponseFilter, SearchReferenceFilter
 from ..forms import ClientForm, ResponseCodeForm
+from ..skeleton import SheetSkeleton
+from ..snapshot import load_responses
 from ..models import (
     CardImages,
     Client,
@@ -39,7 +43,7 @@ from ..models import (
 )
 from ._base import (
     group_min_required, GROUP_LEVEL, GROUP_LABEL,
-    normalize_card_to_num, to_roman,
+    missing_cards, normalize_card_to_num, scoring_record_before, to_roman,
 )
 
 TOTAL_CAP = 100
@@ -445,8 +449,10 @@ def update_response_codes(request, client_id):
             formset = ResponseCodeFormSet(request.POST, queryset=response_codes)
             if formset.is_valid():
                 fix_count, saved = 0, 0
+                changes = []
                 for form in formset:
                     if form.cleaned_data.get('card') and form.cleaned_data.get('response'):
+                        before = scoring_record_before(form)
                         form.instance.client = client
                         form.instance.card = to_roman(form.cleaned_data.get('card', ''))
                         det_before = (form.instance.determinants or '')
@@ -455,13 +461,10 @@ def update_response_codes(request, client_id):
                             fix_count += 1
                         form.instance.special = _normalize_special_tokens(form.instance.special or '')
                         form.save()
+                        changes.append((form.instance.pk, before, form.instance.scoring_record()))
                         saved += 1
 
-                structural_summary, _ = StructuralSummary.objects.get_or_create(client=client)
-                try:
-                    structural_summary.calculate_values()
-                except Exception:
-                    structural_summary.save()
+                StructuralSummary.apply_edits(client, changes)
 
                 if fix_count:
                     messages.info(request, f"자동 보정 적용 {fix_count}행 (m'p→mp, 특수점수 정규화 등)")
@@ -580,73 +583,37 @@ def client_detail(request, client_id):
     )
     return render(request, 'client_detail.html', {'client': client_obj, 'response_codes': response_codes})
 
-@group_min_required('intermediate')
-def export_structural_summary_xlsx(request, client_id):
-    try:
-        client = Client.objects.get(id=client_id)
-        if client.tester != request.user:
-            return HttpResponse("액세스 거부: 해당 정보를 볼 수 있는 권한이 없습니다.", status=403)
-
-        response_codes = ResponseCode.objects.filter(client_id=client_id)
-
-        numbers_found = {normalize_card_to_num(rc.card) for rc in response_codes if rc.card}
-        required = {str(i) for i in range(1, 11)}
-        missing = sorted(required - numbers_found, key=int)
-        if missing:
-            missing_roman = [to_roman(n) for n in missing]
-            return HttpResponse("다음 카드의 반응이 없습니다: " + ", ".join(missing_roman))
-
-        structural_summary, _ = StructuralSummary.objects.get_or_create(client_id=client_id)
-        try:
-            structural_summary.calculate_values()
-        except Exception:
-            structural_summary.save()
-    except Client.DoesNotExist:
-        logging.error("해당 ID의 클라이언트를 찾을 수 없음")
-        return HttpResponseNotFound("클라이언트 정보를 찾을 수 없습니다.")
-    except Exception as e:
-        logging.error(f"예기치 못한 오류 발생: {e}")
-        error_message = f"예기치 못한 오류 발생: {type(e).__name__}, {str(e)}"
-        return JsonResponse({'error': error_message}, status=500)
-
-    PASTEL_FILL = PatternFill(start_color="FCD5B4", end_color="FCD5B4", fill_type="solid")
-    LINE_COLOR  = "FFB7B7B7"
-    THIN_EDGE   = Side(border_style='thin', color=LINE_COLOR)
-    HDR_FONT    = Font(bold=True)
-
-    def box_border(ws, cell_range, line_style="thin", color="FF000000"):
-        rows = list(ws[cell_range])
-        if not rows:
-            return
-
-        edge = Side(style=line_style, color=color)
-        max_y = len(rows) - 1
-
-        for y, row in enumerate(rows):
-            max_x = len(row) - 1
-            for x, cell in enumerate(row):
-                b = cell.border
-                cell.border = Border(
-                    left=edge if x == 0 else b.left,
-                    right=edge if x == max_x else b.right,
-                    top=edge if y == 0 else b.top,
-                    bottom=edge if y == max_y else b.bottom,
-                )
-
-    def header_cell(ws, addr: str, value: str):
-        ws[addr] = value
-        ws[addr].fill = PASTEL_FILL
-        ws[addr].font = HDR_FONT
-        ws[addr].alignment = Alignment(horizontal='center', vertical='center')
-
-    wb = Workbook()
-    if 'Sheet' in wb.sheetnames:
-        wb.remove(wb['Sheet'])
-
-    ws  = wb.create_sheet(title='상단부')
-    wsd = wb.create_sheet(title='하단부')
-    wsi = wb.create_sheet(title='특수지표')
-
+PASTEL_FILL = PatternFill(start_color="FCD5B4", end_color="FCD5B4", fill_type="solid")
+LINE_COLOR  = "FFB7B7B7"
+THIN_EDGE   = Side(border_style='thin', color=LINE_COLOR)
+HDR_FONT    = Font(bold=True)
+
+def box_border(ws, cell_range, line_style="thin", color="FF000000"):
+    rows = list(ws[cell_range])
+    if not rows:
+        return
+
+    edge = Side(style=line_style, color=color)
+    max_y = len(rows) - 1
+
+    for y, row in enumerate(rows):
+        max_x = len(row) - 1
+        for x, cell in enumerate(row):
+            b = cell.border
+            cell.border = Border(
+                left=edge if x == 0 else b.left,
+                right=edge if x == max_x else b.right,
+                top=edge if y == 0 else b.top,
+                bottom=edge if y == max_y else b.bottom,
+            )
+
+def header_cell(ws, addr: str, value: str):
+    ws[addr] = value
+    ws[addr].fill = PASTEL_FILL
+    ws[addr].font = HDR_FONT
+    ws[addr].alignment = Alignment(horizontal='center', vertical='center')
+
+def _draw_upper_layout(ws):
     ws.sheet_view.showGridLines = False
 
     ws.merge_cells('A4:B4'); ws.merge_cells('A14:B14'); ws.merge_cells('A20:D20')
@@ -672,6 +639,7 @@ def export_structural_summary_xlsx(request, client_id):
 
     ws['A5']  = 'Zf'; ws['A6'] = 'Zsum'; ws['A7'] = 'Zest'
     ws['A9']  = 'W';  ws['A10'] = 'D';    ws['A11'] = 'Dd'; ws['A12'] = 'S'
+    ws['B6'].number_format = '0.0'; ws['B7'].number_format = '0.0'
 
     ws['A15'] = '+'; ws['A16'] = 'o'; ws['A17'] = 'v/+'; ws['A18'] = 'v'
 
@@ -680,8 +648,6 @@ def export_structural_summary_xlsx(request, client_id):
 
     fields = ['M','FM','m',"FC","CF","C","Cn","FC'","C'F","C'",
               'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','(2)']
-    real_field = ['M','FM','m_l','FC','CF','C','Cn','FCa','CaF','Ca',
-                  'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','pair']
     s_row = 6
     for name in fields:
         ws.cell(row=s_row, column=7, value=name); s_row += 1
@@ -703,9 +669,154 @@ def export_structural_summary_xlsx(request, client_id):
     ws['M26'] = 'AB'; ws['M27'] = 'AG'; ws['M28'] = 'COP'; ws['M29'] = 'CP'
     ws['O26'] = 'GHR'; ws['O27'] = 'PHR'; ws['O28'] = 'MOR'; ws['O29'] = 'PER'; ws['O30'] = 'PSV'
 
+def _draw_lower_layout(wsd):
+    wsd.sheet_view.showGridLines = False
+    wsd.merge_cells('A3:F3'); wsd.merge_cells('H3:I3'); wsd.merge_cells('K3:N3')
+    wsd.merge_cells('A14:D14'); wsd.merge_cells('F14:G14'); wsd.merge_cells('I14:J14'); wsd.merge_cells('L14:M14')
+
+    header_cell(wsd, 'A3',  'Core')
+    header_cell(wsd, 'H3',  'Affect')
+    header_cell(wsd, 'K3',  'Interpersonal')
+    header_cell(wsd, 'A14', 'Ideation')
+    header_cell(wsd, 'F14', 'Mediation')
+    header_cell(wsd, 'I14', 'Processing')
+    header_cell(wsd, 'L14', 'Self')
+
+    for pos in ['A3:F3','A4:F4','A5:F7','A8:F9','H3:I3','H4:I10','K3:N3','K4:N12',
+                'A14:D14','A15:D19','F14:G14','F15:G21','I14:J14','I15:J21','L14:M14','L15:M21']:
+        box_border(wsd, pos)
+
+    wsd['A4'] = 'R'; wsd['C4'] = 'L'
+    wsd['A5'] = 'EB'; wsd['A6'] = 'eb'
+    wsd['C5'] = 'EA'; wsd['C6'] = 'es'; wsd['C7'] = 'Adj es'
+    wsd['E5'] = 'EBper'; wsd['E6'] = 'D'; wsd['E7'] = 'Adj D'
+    wsd['A8'] = 'FM'; wsd['A9'] = 'm'
+    wsd["C8"] = "SumC'"; wsd['C9'] = 'SumV'
+    wsd['E8'] = 'SumT'; wsd['E9'] = 'SumY'
+
+    wsd['H4'] = 'FC:CF+C'; wsd['H5'] = 'Pure C'; wsd["H6"] = "SumC':WsumC"
+    wsd['H7'] = 'Afr'; wsd['H8'] = 'S'; wsd['H9'] = 'Blends:R'; wsd['H10'] = 'CP'
+
+    wsd['K4'] = 'COP'; wsd['M4'] = 'AG'
+    wsd['K5'] = 'GHR:PHR'; wsd['K6'] = 'a:p'; wsd['K7'] = 'Food'
+    wsd['K8'] = 'SumT'; wsd['K9'] = 'Human Content'; wsd['K10'] = 'Pure H'
+    wsd['K11'] = 'PER'; wsd['K12'] = 'Isolation Index'
+
+    wsd['A15'] = 'a:p'; wsd['A16'] = 'Ma:Mp'; wsd['A17'] = 'Intel(2AB+Art+Ay)'; wsd['A18'] = 'MOR'
+    wsd['C15'] = 'Sum6'; wsd['C16'] = 'Lvl-2'; wsd['C17'] = 'Wsum6'; wsd['C18'] = 'M-'; wsd['C19'] = 'M none'
+
+    for i, f in enumerate(['XA%','WDA%','X-%','S-','P','X+%','Xu%'], start=15):
+        wsd.cell(row=i, column=6, value=f)
+    for i, f in enumerate(['Zf','W:D:Dd','W:M','Zd','PSV','DQ+','DQv'], start=15):
+        wsd.cell(row=i, column=9, value=f)
+        wsd.cell(row=i, column=10).alignment = Alignment(horizontal='right')
+    for i, f in enumerate(['Ego[3r+(2)/R]','Fr+rF','SumV','FD','An+Xy','MOR','H:(H)+Hd+(Hd)'], start=15):
+        wsd.cell(row=i, column=12, value=f)
+
+    for addr in ('I4', 'I6', 'I9', 'M5', 'M6', 'B15', 'B16'):
+        wsd[addr].alignment = Alignment(horizontal='right')
+    wsd['I7'].number_format = "0.##;-0.##;0"
+
+    for col in (1,3,6,9,12,15):
+        c = wsd.cell(row=LOWER_INDEX_ROW, column=col)
+        c.alignment = Alignment(horizontal='center')
+        c.font = Font(bold=True)
+
+def _draw_special_indices_layout(wsi):
+    header_cell(wsi, 'A1',  "PTI")
+    header_cell(wsi, 'A9',  "DEPI")
+    header_cell(wsi, 'A20', "CDI")
+    header_cell(wsi, 'D1',  "S-CON")
+    header_cell(wsi, 'D17', "HVI")
+    header_cell(wsi, 'A29', "OBS")
+
+    # PTI
+    wsi['A2'] = "XA%<.70 AND WDA%<.75"
+    wsi['A3'] = "X-%>0.29"
+    wsi['A4'] = "LVL2>2 AND FAB2>0"
+    wsi['A5'] = "R<17 AND Wsum6>12 OR R>16 AND Wsum6>17*"
+    wsi['A6'] = "M- > 1 OR X-% > 0.40"
+    wsi['A7'] = "TOTAL"
+
+    # DEPI
+    wsi['A10'] = "SumV>0 OR FD>2"
+    wsi['A11'] = "Col-shd blends>0 OR S>2"
+    wsi['A12'] = "ego sup AND Fr+rF=0 OR ego inf"
+    wsi['A13'] = "Afr<0.46 OR Blends<4"
+    wsi['A14'] = "SumShd>FM+m OR SumC'>2"
+    wsi['A15'] = "MOR>2 OR INTELL>3"
+    wsi['A16'] = "COP<2 OR ISOL>0.24"
+    wsi['A17'] = "TOTAL"
+    wsi['A18'] = "POSITIVE?"
+
+    # CDI
+    wsi['A21'] = "EA<6 OR Daj<0"
+    wsi['A22'] = "COP<2 AND AG<2"
+    wsi['A23'] = "WSumC<2.5 OR Afr<0.46"
+    wsi['A24'] = "p > a+1 OR pure H<2"
+    wsi['A25'] = "SumT>1 OR ISOL>0.24 OR Fd>0"
+    wsi['A26'] = "TOTAL"
+    wsi['A27'] = "POSITIVE?"
+
+    # S-CON
+    wsi['D2']  = "SumV+FD>2"
+    wsi['D3']  = "col-shd blends>0"
+    wsi['D4']  = "ego <0.31 ou >0.44"
+    wsi['D5']  = "mor>3"
+    wsi['D6']  = "Zd>3.5 ou <-3.5"
+    wsi['D7']  = "es>EA"
+    wsi['D8']  = "CF+C>FC"
+    wsi['D9']  = "X+%<0.70"
+    wsi['D10'] = "S>3"
+    wsi['D11'] = "P<3 OU P>8"
+    wsi['D12'] = "PURE H<2"
+    wsi['D13'] = "R<17"
+    wsi['D14'] = "TOTAL"
+    wsi['D15'] = "POSITIVE?"
+
+    # HVI
+    wsi['D18'] = 'SumT = 0'
+    wsi['D19'] = "Zf>12"
+    wsi['D20'] = "Zd>3.5"
+    wsi['D21'] = "S>3"
+    wsi['D22'] = "H+(H)+Hd+(Hd)>6"
+    wsi['D23'] = "(H)+(A)+(Hd)+(Ad)>3"
+    wsi['D24'] = "H+A : 4:1"
+    wsi['D25'] = "Cg>3"
+    wsi['D26'] = 'TOTAL'
+    wsi['D27'] = 'POSITIVE?'
+
+    # OBS
+    wsi['A30'] = 1; wsi['A31'] = 2; wsi['A32'] = 3; wsi['A33'] = 4; wsi['A34'] = 5
+    wsi['B30'] = "Dd>3"; wsi['B31'] = "Zf>12"; wsi['B32'] = "Zd>3.0"; wsi['B33'] = "P>7"; wsi['B34'] = "FQ+>1"
+    wsi['D30'] = "1-5 are true"
+    wsi['D31'] = "FQ+>3 AND 2 items 1-4"
+    wsi['D32'] = "X+%>0,89 et 3 items"
+    wsi['D33'] = "FQ+>3 et X+%>0,89"
+    wsi['D34'] = 'POSITIVE?'
+    wsi['E29'] = "TOTAL"
+
+LOWER_INDEX_ROW = 22
+UPPER_SHEET = SheetSkeleton('상단부', _draw_upper_layout)
+LOWER_SHEET = SheetSkeleton('하단부', _draw_lower_layout)
+SPECIAL_INDICES_SHEET = SheetSkeleton('특수지표', _draw_special_indices_layout)
+
+def create_intermediate_workbook(response_codes, structural_summary):
+    """반응 목록과 최신 StructuralSummary → 중급 내보내기 통합 문서. DB 는 조회하지 않는다."""
+    wb = Workbook()
+    if 'Sheet' in wb.sheetnames:
+        wb.remove(wb['Sheet'])
+
+    ws  = UPPER_SHEET.create_sheet(wb)
+    wsd = LOWER_SHEET.create_sheet(wb)
+    wsi = SPECIAL_INDICES_SHEET.create_sheet(wb)
+
+    real_field = ['M','FM','m_l','FC','CF','C','Cn','FCa','CaF','Ca',
+                  'FT','TF','T','FV','VF','V','FY','YF','Y','Fr','rF','FD','F','pair']
+
     ws['B5']  = structural_summary.Zf
-    ws['B6']  = structural_summary.Zsum; ws['B6'].number_format = '0.0'
-    ws['B7']  = structural_summary.Zest; ws['B7'].number_format = '0.0'
+    ws['B6']  = structural_summary.Zsum
+    ws['B7']  = structural_summary.Zest
     ws['B9']  = structural_summary.W; ws['B10'] = structural_summary.D
     ws['B11'] = structural_summary.Dd; ws['B12'] = structural_summary.S
 
@@ -781,55 +892,9 @@ def export_structural_summary_xlsx(request, client_id):
         length = max(len(str(cell.value)) * 1.1 for cell in column_cells)
         ws.column_dimensions[column_cells[0].column_letter].width = length
 
-    wsd.sheet_view.showGridLines = False
-    wsd.merge_cells('A3:F3'); wsd.merge_cells('H3:I3'); wsd.merge_cells('K3:N3')
-    wsd.merge_cells('A14:D14'); wsd.merge_cells('F14:G14'); wsd.merge_cells('I14:J14'); wsd.merge_cells('L14:M14')
-
-    header_cell(wsd, 'A3',  'Core')
-    header_cell(wsd, 'H3',  'Affect')
-    header_cell(wsd, 'K3',  'Interpersonal')
-    header_cell(wsd, 'A14', 'Ideation')
-    header_cell(wsd, 'F14', 'Mediation')
-    header_cell(wsd, 'I14', 'Processing')
-    header_cell(wsd, 'L14', 'Self')
-
-    for pos in ['A3:F3','A4:F4','A5:F7','A8:F9','H3:I3','H4:I10','K3:N3','K4:N12',
-                'A14:D14','A15:D19','F14:G14','F15:G21','I14:J14','I15:J21','L14:M14','L15:M21']:
-        box_border(wsd, pos)
-
-    wsd['A4'] = 'R'; wsd['C4'] = 'L'
-    wsd['A5'] = 'EB'; wsd['A6'] = 'eb'
-    wsd['C5'] = 'EA'; wsd['C6'] = 'es'; wsd['C7'] = 'Adj es'
-    wsd['E5'] = 'EBper'; wsd['E6'] = 'D'; wsd['E7'] = 'Adj D'
-    wsd['A8'] = 'FM'; wsd['A9'] = 'm'
-    wsd["C8"] = "SumC'"; wsd['C9'] = 'SumV'
-    wsd['E8'] = 'SumT'; wsd['E9'] = 'SumY'
-
-    wsd['H4'] = 'FC:CF+C'; wsd['H5'] = 'Pure C'; wsd["H6"] = "SumC':WsumC"
-    wsd['H7'] = 'Afr'; wsd['H8'] = 'S'; wsd['H9'] = 'Blends:R'; wsd['H10'] = 'CP'
-
-    wsd['K4'] = 'COP'; wsd['M4'] = 'AG'
-    wsd['K5'] = 'GHR:PHR'; wsd['K6'] = 'a:p'; wsd['K7'] = 'Food'
-    wsd['K8'] = 'SumT'; wsd['K9'] = 'Human Content'; wsd['K10'] = 'Pure H'
-    wsd['K11'] = 'PER'; wsd['K12'] = 'Isolation Index'
-
-    wsd['A15'] = 'a:p'; wsd['A16'] = 'Ma:Mp'; wsd['A17'] = 'Intel(2AB+Art+Ay)'; wsd['A18'] = 'MOR'
-    wsd['C15'] = 'Sum6'; wsd['C16'] = 'Lvl-2'; wsd['C17'] = 'Wsum6'; wsd['C18'] = 'M-'; wsd['C19'] = 'M none'
-
-    med_fields = ['XA%','WDA%','X-%','S-','P','X+%','Xu%']
     med_real   = ['xa_per','wda_per','x_minus_per','s_minus','popular','x_plus_per','xu_per']
-    for i, f in enumerate(med_fields, start=15):
-        wsd.cell(row=i, column=6, value=f)
-
-    pro_fields = ['Zf','W:D:Dd','W:M','Zd','PSV','DQ+','DQv']
     pro_real   = ['Zf','W_D_Dd','W_M','Zd','sp_psv','dev_plus','dev_v']
-    for i, f in enumerate(pro_fields, start=15):
-        wsd.cell(row=i, column=9, value=f)
-
-    self_fields = ['Ego[3r+(2)/R]','Fr+rF','SumV','FD','An+Xy','MOR','H:(H)+Hd+(Hd)']
     self_real   = ['ego','fr_rf','sum_V','fdn','an_xy','sp_mor','h_prop']
-    for i, f in enumerate(self_fields, start=15):
-        wsd.cell(row=i, column=12, value=f)
 
     wsd['B4']  = structural_summary.R; wsd['D4']  = structural_summary.L
     wsd['B5']  = structural_summary.ErleBnistypus
@@ -847,18 +912,18 @@ def export_structural_summary_xlsx(request, client_id):
     wsd['F8']  = structural_summary.sum_T
     wsd['F9']  = structural_summary.sum_Y
 
-    wsd['I4'] = structural_summary.f_c_prop; wsd['I4'].alignment = Alignment(horizontal='right')
+    wsd['I4'] = structural_summary.f_c_prop
     wsd['I5'] = structural_summary.pure_c
-    wsd['I6'] = structural_summary.ca_c_prop; wsd['I6'].alignment = Alignment(horizontal='right')
-    wsd['I7'] = structural_summary.afr; wsd['I7'].number_format = "0.##;-0.##;0"
+    wsd['I6'] = structural_summary.ca_c_prop
+    wsd['I7'] = structural_summary.afr
     wsd['I8'] = structural_summary.S
-    wsd['I9'] = structural_summary.blends_r; wsd['I9'].alignment = Alignment(horizontal='right')
+    wsd['I9'] = structural_summary.blends_r
     wsd['I10'] = structural_summary.sp_cp
 
     wsd['L4']  = structural_summary.sp_cop
     wsd['N4']  = structural_summary.sp_ag
-    wsd['M5']  = structural_summary.GHR_PHR; wsd['M5'].alignment = Alignment(horizontal='right')
-    wsd['M6']  = structural_summary.a_p;  wsd['M6'].alignment = Alignment(horizontal='right')
+    wsd['M5']  = structural_summary.GHR_PHR
+    wsd['M6']  = structural_summary.a_p
     wsd['M7']  = structural_summary.Fd_l
     wsd['M8']  = structural_summary.sum_T
     wsd['M9']  = structural_summary.human_cont
@@ -866,8 +931,8 @@ def export_structural_summary_xlsx(request, client_id):
     wsd['M11'] = structural_summary.sp_per
     wsd['M12'] = structural_summary.Isol
 
-    wsd['B15'] = structural_summary.a_p; wsd['B15'].alignment = Alignment(horizontal='right')
-    wsd['B16'] = structural_summary.Ma_Mp; wsd['B16'].alignment = Alignment(horizontal='right')
+    wsd['B15'] = structural_summary.a_p
+    wsd['B16'] = structural_summary.Ma_Mp
     wsd['B17'] = structural_summary.intel
     wsd['B18'] = structural_summary.sp_mor
     wsd['D15'] = structural_summary.sum6
@@ -883,12 +948,11 @@ def export_structural_summary_xlsx(request, client_id):
 
     for i, fname in enumerate(pro_real, start=15):
         wsd.cell(row=i, column=10, value=getattr(structural_summary, fname))
-        wsd.cell(row=i, column=10).alignment = Alignment(horizontal='right')
 
     for i, fname in enumerate(self_real, start=15):
         wsd.cell(row=i, column=13, value=getattr(structural_summary, fname))
 
-    summary_row = 22
+    summary_row = LOWER_INDEX_ROW
     def cb(text, positive):
         return f"☑ {text}" if positive else text
 
@@ -907,25 +971,7 @@ def export_structural_summary_xlsx(request, client_id):
     wsd.cell(row=summary_row, column=12, value=cb(f"CDI={structural_summary.sumCDI}", cdi_pos))
     wsd.cell(row=summary_row, column=15, value=cb(f"S-CON={structural_summary.sumSCON}", scon_pos))
 
-    for col in (1,3,6,9,12,15):
-        c = wsd.cell(row=summary_row, column=col)
-        c.alignment = Alignment(horizontal='center')
-        c.font = Font(bold=True)
-
-    header_cell(wsi, 'A1',  "PTI")
-    header_cell(wsi, 'A9',  "DEPI")
-    header_cell(wsi, 'A20', "CDI")
-    header_cell(wsi, 'D1',  "S-CON")
-    header_cell(wsi, 'D17', "HVI")
-    header_cell(wsi, 'A29', "OBS")
-
     # PTI
-    wsi['A2'] = "XA%<.70 AND WDA%<.75"
-    wsi['A3'] = "X-%>0.29"
-    wsi['A4'] = "LVL2>2 AND FAB2>0"
-    wsi['A5'] = "R<17 AND Wsum6>12 OR R>16 AND Wsum6>17*"
-    wsi['A6'] = "M- > 1 OR X-% > 0.40"
-    wsi['A7'] = "TOTAL"
     row = 2
     for i in range(0, 5):
         value = "✔" if structural_summary.PTI[i] == "o" else ''
@@ -933,16 +979,6 @@ def export_structural_summary_xlsx(request, client_id):
     wsi['B7'] = structural_summary.sumPTI
 
     # DEPI
-    wsi['A9']  = "DEPI"
-    wsi['A10'] = "SumV>0 OR FD>2"
-    wsi['A11'] = "Col-shd blends>0 OR S>2"
-    wsi['A12'] = "ego sup AND Fr+rF=0 OR ego inf"
-    wsi['A13'] = "Afr<0.46 OR Blends<4"
-    wsi['A14'] = "SumShd>FM+m OR SumC'>2"
-    wsi['A15'] = "MOR>2 OR INTELL>3"
-    wsi['A16'] = "COP<2 OR ISOL>0.24"
-    wsi['A17'] = "TOTAL"
-    wsi['A18'] = "POSITIVE?"
     row = 10
     for i in range(0, 7):
         value = "✔" if structural_summary.DEPI[i] == "o" else ''
@@ -951,14 +987,6 @@ def export_structural_summary_xlsx(request, client_id):
     wsi['B18'] = structural_summary.sumDEPI >= 5
 
     # CDI
-    wsi['A20'] = "CDI"
-    wsi['A21'] = "EA<6 OR Daj<0"
-    wsi['A22'] = "COP<2 AND AG<2"
-    wsi['A23'] = "WSumC<2.5 OR Afr<0.46"
-    wsi['A24'] = "p > a+1 OR pure H<2"
-    wsi['A25'] = "SumT>1 OR ISOL>0.24 OR Fd>0"
-    wsi['A26'] = "TOTAL"
-    wsi['A27'] = "POSITIVE?"
     row = 21
     for i in range(0, 5):
         value = "✔" if structural_summary.CDI[i] == "o" else ''
@@ -967,20 +995,6 @@ def export_structural_summary_xlsx(request, client_id):
     wsi['B27'] = structural_summary.sumCDI >= 4
 
     # S-CON
-    wsi['D2']  = "SumV+FD>2"
-    wsi['D3']  = "col-shd blends>0"
-    wsi['D4']  = "ego <0.31 ou >0.44"
-    wsi['D5']  = "mor>3"
-    wsi['D6']  = "Zd>3.5 ou <-3.5"
-    wsi['D7']  = "es>EA"
-    wsi['D8']  = "CF+C>FC"
-    wsi['D9']  = "X+%<0.70"
-    wsi['D10'] = "S>3"
-    wsi['D11'] = "P<3 OU P>8"
-    wsi['D12'] = "PURE H<2"
-    wsi['D13'] = "R<17"
-    wsi['D14'] = "TOTAL"
-    wsi['D15'] = "POSITIVE?"
     row = 2
     for i in range(0, 12):
         value = "✔" if structural_summary.SCON[i] == "o" else ''
@@ -989,16 +1003,6 @@ def export_structural_summary_xlsx(request, client_id):
     wsi['E15'] = structural_summary.sumSCON >= 8
 
     # HVI
-    wsi['D18'] = 'SumT = 0'
-    wsi['D19'] = "Zf>12"
-    wsi['D20'] = "Zd>3.5"
-    wsi['D21'] = "S>3"
-    wsi['D22'] = "H+(H)+Hd+(Hd)>6"
-    wsi['D23'] = "(H)+(A)+(Hd)+(Ad)>3"
-    wsi['D24'] = "H+A : 4:1"
-    wsi['D25'] = "Cg>3"
-    wsi['D26'] = 'TOTAL'
-    wsi['D27'] = 'POSITIVE?'
     wsi['E18'] = structural_summary.HVI_premise
     row = 19
     for i in range(0, 7):
@@ -1008,13 +1012,6 @@ def export_structural_summary_xlsx(request, client_id):
     wsi['E27'] = (structural_summary.sumHVI >= 4) and bool(structural_summary.HVI_premise)
 
     # OBS
-    wsi['A30'] = 1; wsi['A31'] = 2; wsi['A32'] = 3; wsi['A33'] = 4; wsi['A34'] = 5
-    wsi['B30'] = "Dd>3"; wsi['B31'] = "Zf>12"; wsi['B32'] = "Zd>3.0"; wsi['B33'] = "P>7"; wsi['B34'] = "FQ+>1"
-    wsi['D30'] = "1-5 are true"
-    wsi['D31'] = "FQ+>3 AND 2 items 1-4"
-    wsi['D32'] = "X+%>0,89 et 3 items"
-    wsi['D33'] = "FQ+>3 et X+%>0,89"
-    wsi['D34'] = 'POSITIVE?'
     row = 30
     for i in range(0, 5):
         value = "✔" if structural_summary.OBS[i] == "o" else ''
@@ -1025,7 +1022,7 @@ def export_structural_summary_xlsx(request, client_id):
         wsi.cell(row=row, column=5, value=value); row += 1
 
     obs_score = sum(1 for ch in (structural_summary.OBS or '') if ch == 'o')
-    wsi['E29'] = "TOTAL"; wsi['F29'] = obs_score
+    wsi['F29'] = obs_score
     wsi['E34'] = structural_summary.OBS_posi
 
     for column_cells in wsi.columns:
@@ -1033,14 +1030,11 @@ def export_structural_summary_xlsx(request, client_id):
         wsi.column_dimensions[column_cells[0].column_letter].width = length
 
     def _card_num(rc):
-        try:
-            return int(normalize_card_to_num(rc.card))
-        except Exception:
-            return 999
+        return rc.card_num or 999
     def _n(rc):
         return rc.response_num or 0
 
-    response_codes_sorted = sorted(response_codes, key=lambda rc: (_card_num(rc), _n(rc)))
+    response_codes_sorted = sorted(response_codes, key=lambda rc: (_card_num(rc), _n(rc), rc.pk))
     rows_for_raw = []
     for rc in response_codes_sorted:
         special_s = _normalize_special_tokens(rc.special or "")
@@ -1087,16 +1081,41 @@ def export_structural_summary_xlsx(request, client_id):
                 v = ws_raw.cell(row=row, column=col).value
                 max_len = max(max_len, len(str(v)) if v is not None else 0)
             ws_raw.column_dimensions[get_column_letter(col)].width = max(8, min(60, int(max_len * 1.1)))
+    return wb
 
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+@group_min_required('intermediate')
+def export_structural_summary_xlsx(request, client_id):
+    try:
+        client = Client.objects.get(id=client_id)
+        if client.tester != request.user:
+            return HttpResponse("액세스 거부: 해당 정보를 볼 수 있는 권한이 없습니다.", status=403)
+
+        response_codes = load_responses(client)
+
+        missing = missing_cards(response_codes)
+        if missing:
+            missing_roman = [to_roman(n) for n in missing]
+            return HttpResponse("다음 카드의 반응이 없습니다: " + ", ".join(missing_roman))
+    except Client.DoesNotExist:
+        logging.error("해당 ID의 클라이언트를 찾을 수 없음")
+        return HttpResponseNotFound("클라이언트 정보를 찾을 수 없습니다.")
+    except Exception as e:
+        logging.error(f"예기치 못한 오류 발생: {e}")
+        error_message = f"예기치 못한 오류 발생: {type(e).__name__}, {str(e)}"
+        return JsonResponse({'error': error_message}, status=500)
+
+    def build():
+        # 중급 양식에는 투사 점수가 없으므로 형태소 분석/투사 점수 계산은 하지 않는다
+        structural_summary = StructuralSummary.current_for(client, response_codes, projection=False)
+        output = BytesIO()
+        create_intermediate_workbook(response_codes, structural_summary).save(output)
+        return output.getvalue(), True
 
     safe_name = f"{client.name}_{client.testDate:%Y-%m-%d}.xlsx"
     fallback  = f"{slugify(client.name)}_{client.testDate:%Y-%m-%d}.xlsx"
 
-    resp = HttpResponse(
-        output.getvalue(),
+    resp = FileResponse(
+        open_export(client, response_codes, 'intermediate', build),
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     resp['Content-Disposition'] = (
@@ -1121,8 +1140,10 @@ def edit_responses(request, client_id):
         formset = ResponseCodeFormSet(request.POST, queryset=response_codes)
         if formset.is_valid():
             fix_count = 0
+            changes = []
             for form in formset:
                 if form.cleaned_data.get('card') and form.cleaned_data.get('response'):
+                    before = scoring_record_before(form)
                     form.instance.client_id = client_id
                     form.instance.card = to_roman(form.cleaned_data.get('card', ''))
                     det_before = (form.instance.determinants or '')
@@ -1131,13 +1152,10 @@ def edit_responses(request, client_id):
                         fix_count += 1
                     form.instance.special = _normalize_special_tokens(form.instance.special or '')
                     form.save()
+                    changes.append((form.instance.pk, before, form.instance.scoring_record()))
             if fix_count:
                 messages.info(request, f"자동 보정 적용 {fix_count}행 (m'p→mp, 특수점수 정규화 등)")
-            structural_summary, _ = StructuralSummary.objects.get_or_create(client_id=client_id)
-            try:
-                structural_summary.calculate_values()
-            except Exception:
-                structural_summary.save()
+            StructuralSummary.apply_edits(Client.objects.get(id=client_id), changes)
             return redirect('scoring:client_list')
         else:
             details = []